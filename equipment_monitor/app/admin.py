@@ -1,67 +1,47 @@
-from fastapi import APIRouter, Request, Depends, HTTPException, status
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Request, Depends, HTTPException, status, Form
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
 from typing import List, Optional
-from .models import User, Role, Permission, dummy_users
+from .models import User, Role, Permission, user_directory
+from .principal import require_permission
+from .passwords import auth_stats
+from .serialization import json_response
+from .templating import templates, fragments
+from .loop_watchdog import loop_watchdog
+from .profiler import ProfilerBusy, all_threads, profile_loop, profile_monitor, sample
+from .templates.monitoring.monitor import monitor
+from .templates.monitoring.snapshot_store import COLLECTOR_MODE
 from datetime import datetime
 import secrets
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/admin")
-templates = Jinja2Templates(directory="app/templates")
+
+_require_manage_users = require_permission(Permission.MANAGE_USERS)
 
 # Admin middleware to check if user has admin access
 async def require_admin(request: Request):
-    print("\n=== Admin Access Check ===")
-    session_id = request.cookies.get("session_id")
-    print(f"Session ID: {session_id}")
-    
-    if not session_id or session_id not in request.app.state.sessions:
-        print("No valid session found")
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-    
-    user_data = request.app.state.sessions[session_id]
-    print(f"User data from session: {user_data}")
-    
-    user = next((u for u in dummy_users.values() if str(u.id) == str(user_data.get("id"))), None)
-    print(f"Found user: {user}")
-    
+    """Check the session's principal can manage users and return the user."""
+    principal = await _require_manage_users(request)
+    user = user_directory.get(principal.id)
     if not user:
-        print("User not found in dummy_users")
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
-    
-    print(f"User role: {user.role}")
-    print(f"User permissions: {user.permissions}")
-    
-    has_permission = user.has_permission(Permission.MANAGE_USERS.value)
-    print(f"Has MANAGE_USERS permission: {has_permission}")
-    
-    if not has_permission:
-        print("User doesn't have required permission")
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
-    
-    print("Access granted to admin dashboard\n")
     return user
 
 @router.get("/dashboard", response_class=HTMLResponse)
 async def admin_dashboard(request: Request, user: User = Depends(require_admin)):
-    print("\n=== Admin Dashboard Debug ===")
-    print(f"Current User: {user}")
-    print(f"User Role: {user.role}")
-    print(f"User Permissions: {user.permissions}")
-    print(f"All Users: {[u.username for u in dummy_users.values()]}")
+    logger.debug("Admin dashboard accessed by %s", user.username)
     
-    # Prepare context with additional debug info
     context = {
         "request": request,
-        "users": list(dummy_users.values()),
+        "users": user_directory.values(),
         "roles": [{"name": role.value["name"], "permissions": list(role.value["permissions"])} for role in Role],
         "permissions": [p.value for p in Permission],
         "current_user": user  # Make sure current_user is available in the template
     }
     
-    print(f"Template context: {context.keys()}")
-    print("Rendering admin dashboard...\n")
-    
     return templates.TemplateResponse("admin/dashboard.html", context)
 
 @router.post("/users/create", response_class=RedirectResponse)
@@ -74,12 +54,12 @@ async def create_user(
     password: str,
     user: User = Depends(require_admin)
 ):
-    if email in dummy_users:
+    if user_directory.get_by_email(email) or user_directory.get_by_username(username):
         return RedirectResponse("/admin/dashboard?error=User+already+exists", status_code=303)
     
     # Create new user
     new_user = User(
-        id=max(u.id for u in dummy_users.values()) + 1,
+        id=user_directory.next_id(),
         name=name,
         email=email,
         username=username,
@@ -90,12 +70,12 @@ async def create_user(
         is_active=True
     )
     
-    dummy_users[email] = new_user
+    user_directory.add(new_user)
     return RedirectResponse("/admin/dashboard?message=User+created+successfully", status_code=303)
 
 @router.post("/users/{user_id}/delete", response_class=RedirectResponse)
 async def delete_user(user_id: int, request: Request, user: User = Depends(require_admin)):
-    user_to_delete = next((u for u in dummy_users.values() if u.id == user_id), None)
+    user_to_delete = user_directory.get(user_id)
     if not user_to_delete:
         return RedirectResponse("/admin/dashboard?error=User+not+found", status_code=303)
     
@@ -104,18 +84,119 @@ async def delete_user(user_id: int, request: Request, user: User = Depends(requi
         return RedirectResponse("/admin/dashboard?error=Cannot+delete+your+own+account", status_code=303)
     
     # In a real app, you might want to soft delete
-    del dummy_users[user_to_delete.email]
+    user_directory.remove(user_to_delete.id)
     return RedirectResponse("/admin/dashboard?message=User+deleted+successfully", status_code=303)
 
 @router.post("/users/{user_id}/toggle-active", response_class=RedirectResponse)
 async def toggle_user_active(user_id: int, request: Request, user: User = Depends(require_admin)):
-    user_to_toggle = next((u for u in dummy_users.values() if u.id == user_id), None)
+    user_to_toggle = user_directory.get(user_id)
     if not user_to_toggle:
         return RedirectResponse("/admin/dashboard?error=User+not+found", status_code=303)
     
     if user_to_toggle.id == user.id:
         return RedirectResponse("/admin/dashboard?error=Cannot+deactivate+your+own+account", status_code=303)
     
-    user_to_toggle.is_active = not user_to_toggle.is_active
+    # Updating through the directory invalidates the user's cached principals
+    user_directory.update(user_to_toggle.id, is_active=not user_to_toggle.is_active)
     action = "activated" if user_to_toggle.is_active else "deactivated"
     return RedirectResponse(f"/admin/dashboard?message=User+{action}+successfully", status_code=303)
+
+@router.post("/users/{user_id}/role", response_class=RedirectResponse)
+async def set_user_role(user_id: int, request: Request, role: str = Form(...), user: User = Depends(require_admin)):
+    user_to_update = user_directory.get(user_id)
+    if not user_to_update:
+        return RedirectResponse("/admin/dashboard?error=User+not+found", status_code=303)
+    
+    if user_to_update.id == user.id:
+        return RedirectResponse("/admin/dashboard?error=Cannot+change+your+own+role", status_code=303)
+    
+    if role not in {r.value["name"] for r in Role}:
+        return RedirectResponse("/admin/dashboard?error=Unknown+role", status_code=303)
+    
+    user_directory.update(user_to_update.id, role=role)
+    return RedirectResponse("/admin/dashboard?message=User+role+updated+successfully", status_code=303)
+
+@router.get("/metrics/auth")
+async def get_auth_metrics(user: User = Depends(require_admin)):
+    """Password pool depth and rejected login attempts."""
+    return json_response(auth_stats())
+
+@router.get("/metrics/templates")
+async def get_template_metrics(user: User = Depends(require_admin)):
+    """Dashboard fragment cache entries, hits and misses."""
+    return json_response(fragments.stats())
+
+@router.get("/metrics/loop")
+async def get_loop_metrics(user: User = Depends(require_admin)):
+    """Most recent event loop stalls, with the route and stack they were caught in."""
+    return json_response(loop_watchdog.stats())
+
+@router.get("/metrics/slow-devices")
+async def get_slow_devices(limit: int = 10, phase: Optional[str] = None, user: User = Depends(require_admin)):
+    """Slowest devices and check phases (ICMP, each SNMP request, ...) over the rolling window.
+
+    With an external collector the timings live in the collector process,
+    which serves the same report at /timings on its metrics port.
+    """
+    if COLLECTOR_MODE != "embedded":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Timings are served by the collector at /timings")
+    return json_response(monitor.timings.report(max(1, min(limit, 1000)), phase))
+
+@router.get("/metrics/anomalies")
+async def get_anomalies(user: User = Depends(require_admin)):
+    """Devices with metrics out of their baseline, with the baseline and z-score of each metric."""
+    if COLLECTOR_MODE != "embedded":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Baselines live in the collector, anomalies are listed in /api/devices/status")
+    devices = [
+        {
+            'name': record['name'],
+            'status': record['status'],
+            'anomalies': record['anomalies'],
+            'baseline': monitor.anomalies.baseline(record['name'])
+        }
+        for record in monitor.get_snapshot().devices if record.get('anomalies')
+    ]
+    return json_response({'devices': devices})
+
+@router.get("/profile")
+async def capture_profile(
+    seconds: float = 10,
+    target: str = "all",
+    format: str = "collapsed",
+    interval_ms: float = 5,
+    user: User = Depends(require_admin)
+):
+    """Profile the process for ``seconds``.
+
+    ``format=collapsed`` samples the stacks of ``target`` (``loop``,
+    ``monitor`` or ``all`` threads) into flamegraph-ready collapsed stacks;
+    ``format=pstats`` runs cProfile on the loop or the monitor thread and
+    returns a pstats dump.
+    """
+    if target not in ("all", "loop", "monitor") or format not in ("collapsed", "pstats"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown target or format")
+    if target == "monitor" and not (monitor.monitor_thread and monitor.monitor_thread.is_alive()):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="The monitor thread is not running here")
+    seconds = max(0.1, seconds)
+    logger.info("Profiling %s (%s) for %.1fs, requested by %s", target, format, seconds, user.username)
+    try:
+        if format == "pstats":
+            if target == "all":
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                    detail="pstats profiles one thread: loop or monitor")
+            stats = await (profile_loop(seconds) if target == "loop" else profile_monitor(monitor, seconds))
+            return Response(content=stats, media_type="application/octet-stream",
+                            headers={"Content-Disposition": f'attachment; filename="{target}.pstats"'})
+        if target == "loop":
+            threads = {threading.get_ident(): "event-loop"}
+        elif target == "monitor":
+            threads = {monitor.monitor_thread.ident: "monitor"}
+        else:
+            threads = all_threads()
+            threads[threading.get_ident()] = "event-loop"
+        stacks = await sample(threads, seconds, max(0.001, interval_ms / 1000))
+        return Response(content=stacks, media_type="text/plain; charset=utf-8")
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
@@ -0,0 +1,167 @@
+# app/collector.py
+"""Standalone status collector.
+
+Runs the ICMP/SNMP polling loop in its own process and publishes the status
+snapshots, equipment statuses and history samples to MongoDB, so any number
+of web workers started with COLLECTOR_MODE=external can serve them::
+
+    python -m app.collector
+"""
+from typing import Dict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import os
+import signal
+import threading
+import time
+import logging
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from .templates.monitoring.monitor import NetworkMonitor, StatusSnapshot, monitor, DEMO_DEVICES
+from .templates.monitoring.snapshot_store import MongoSnapshotStore
+from .models.database_models import Equipment, EquipmentHistory
+from .database import db_client
+from .logging_config import setup_logging, shutdown_logging
+from .metrics import REGISTRY, CONTENT_TYPE
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Port of the collector's Prometheus /metrics endpoint (0 to disable)
+COLLECTOR_METRICS_PORT = int(os.getenv("COLLECTOR_METRICS_PORT", "9101"))
+
+class Collector:
+    """Publishes what the monitor collects after each poll cycle."""
+
+    def __init__(self, monitor: NetworkMonitor, store: MongoSnapshotStore):
+        self.monitor = monitor
+        self.store = store
+        self.equipment_ids: Dict[str, ObjectId] = {}  # device name -> equipment _id
+        self._last_sampled: Dict[str, datetime] = {}
+        self._published_version = None
+
+    def load_devices(self):
+        """Monitor the active equipment of the database, or the demo devices if there is none."""
+        equipment = Equipment.get_all()
+        for eq in equipment:
+            self.monitor.add_device(eq.name, eq.ip_address, eq.ligne, eq.atelier, publish=False,
+                                    equipment_type=eq.equipment_type)
+            self.equipment_ids[eq.name] = eq._id
+        if not equipment:
+            logger.warning("No equipment in the database, monitoring the demo devices")
+            for device in DEMO_DEVICES:
+                self.monitor.add_device(device['name'], device['ip'], device['ligne'], device['atelier'],
+                                        publish=False)
+        self.publish(self.monitor.publish_snapshot())
+        logger.info("Collecting %s devices", len(self.monitor.devices))
+
+    def publish(self, snapshot: StatusSnapshot):
+        """Publish the snapshot unless it was already published."""
+        if snapshot.version == self._published_version:
+            return
+        self.store.publish(snapshot)
+        self._published_version = snapshot.version
+
+    def write_history(self, snapshot: StatusSnapshot):
+        """Store one history sample per checked device and the statuses that changed."""
+        samples = []
+        updates = []
+        for name, equipment_id in self.equipment_ids.items():
+            device = self.monitor.devices.get(name)
+            if device is None or device.last_checked is None or self._last_sampled.get(name) == device.last_checked:
+                continue
+            self._last_sampled[name] = device.last_checked
+            samples.append(EquipmentHistory(
+                equipment_id=str(equipment_id),
+                timestamp=device.last_checked,
+                status=device.status,
+                data_rate=device.data_rate,
+                response_time=device.response_time,
+                packet_loss=device.packet_loss,
+                snmp_data=device.snmp_data
+            ).to_dict())
+            if snapshot.device_versions.get(name) == snapshot.version:
+                updates.append(UpdateOne({"_id": equipment_id}, {"$set": {
+                    "status": device.status,
+                    "data_rate": device.data_rate,
+                    "response_time": device.response_time,
+                    "packet_loss": device.packet_loss,
+                    "last_checked": device.last_checked,
+                    "updated_at": datetime.utcnow()
+                }}))
+        if samples:
+            EquipmentHistory.get_collection().insert_many(samples, ordered=False)
+        if updates:
+            Equipment.get_collection().bulk_write(updates, ordered=False)
+
+    def on_cycle(self, snapshot: StatusSnapshot):
+        start = time.perf_counter()
+        self.publish(snapshot)
+        published = time.perf_counter()
+        self.write_history(snapshot)
+        self.monitor.timings.observe_cycle('store_snapshot', published - start)
+        self.monitor.timings.observe_cycle('db_write', time.perf_counter() - published)
+
+def slow_device_report(query: str) -> dict:
+    """Slowest devices and phases of the monitor, for a ``limit=&phase=`` query string."""
+    params = parse_qs(query)
+    try:
+        limit = max(1, min(int(params.get("limit", ["10"])[0]), 1000))
+    except ValueError:
+        limit = 10
+    return monitor.timings.report(limit, params.get("phase", [None])[0])
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the metrics (/metrics) and the slowest devices (/timings) of the collector process."""
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        if path == "/metrics":
+            body, content_type = REGISTRY.render(), CONTENT_TYPE
+        elif path == "/timings":
+            body, content_type = dumps(slow_device_report(query)), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info("Serving metrics on port %s", port)
+    return server
+
+def main():
+    setup_logging()
+    # Wait for MongoDB, which may still be starting along with the collector
+    db_client.connect()
+    collector = Collector(monitor, MongoSnapshotStore())
+    collector.load_devices()
+    monitor.add_cycle_callback(collector.on_cycle)
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    metrics_server = start_metrics_server(COLLECTOR_METRICS_PORT) if COLLECTOR_METRICS_PORT else None
+    monitor.start_monitoring()
+    # Wake up regularly, so signals are handled on every platform
+    while not stop_event.wait(1):
+        pass
+    monitor.stop_monitoring()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    shutdown_logging()
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
 # app/database.py
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import os
+import threading
+import time
 import logging
 from dotenv import load_dotenv
 
+from .metrics import Counter, Histogram
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -14,55 +18,86 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv('DB_env.env')
 
+# Attempts and first delay (doubled after each failure) of Database.connect()
+DB_CONNECT_RETRIES = int(os.getenv("DB_CONNECT_RETRIES", "5"))
+DB_CONNECT_DELAY = float(os.getenv("DB_CONNECT_DELAY", "0.5"))
+
+DB_COMMAND_SECONDS = Histogram("mongodb_command_duration_seconds", "MongoDB command latency", ("command",))
+DB_COMMAND_FAILURES = Counter("mongodb_command_failures_total", "Failed MongoDB commands", ("command",))
+
+class CommandMetrics(monitoring.CommandListener):
+    """Records the latency of every command sent by the client, as measured by the driver."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        DB_COMMAND_SECONDS.labels(event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        DB_COMMAND_SECONDS.labels(event.command_name).observe(event.duration_micros / 1e6)
+        DB_COMMAND_FAILURES.labels(event.command_name).inc()
+
 class Database:
+    """MongoDB client, created on first use.
+
+    Creating the client doesn't wait for the server (the driver connects in
+    the background and each operation waits up to serverSelectionTimeoutMS),
+    so importing the app never blocks on, or fails because of, MongoDB.
+    Call ``connect()`` to wait for the server explicitly.
+    """
+
     def __init__(self):
         self.uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
         self.db_name = os.getenv("DB_NAME", "equipment_monitor")
-        self.client = None
-        self.db = None
-        self._connect()
-
-    def _connect(self):
-        """Establish connection to MongoDB."""
-        try:
-            # Create MongoDB client with connection options
-            self.client = MongoClient(
-                self.uri,
-                serverSelectionTimeoutMS=5000,  # 5 second timeout
-                connectTimeoutMS=10000,         # 10 second connection timeout
-                maxPoolSize=50,                 # Maximum connections in pool
-                retryWrites=True                # Enable retryable writes
-            )
-            
-            # Test the connection
-            self.client.admin.command('ping')
-            
-            # Get database
-            self.db = self.client[self.db_name]
-            
-            logger.info(f"✓ Successfully connected to MongoDB")
-            logger.info(f"✓ Database: {self.db_name}")
-            logger.info(f"✓ URI: {self.uri}")
-            
-            # Print server info
-            server_info = self.client.server_info()
-            logger.info(f"✓ MongoDB version: {server_info['version']}")
-            
-        except ConnectionFailure as e:
-            logger.error(f"✗ Could not connect to MongoDB: {e}")
-            raise
-        except ServerSelectionTimeoutError as e:
-            logger.error(f"✗ MongoDB server selection timeout: {e}")
-            logger.error("Make sure MongoDB is running and accessible")
-            raise
-        except Exception as e:
-            logger.error(f"✗ Unexpected database connection error: {e}")
-            raise
+        self._client: Optional[MongoClient] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> MongoClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = MongoClient(
+                        self.uri,
+                        serverSelectionTimeoutMS=5000,  # 5 second timeout
+                        connectTimeoutMS=10000,         # 10 second connection timeout
+                        maxPoolSize=50,                 # Maximum connections in pool
+                        retryWrites=True,               # Enable retryable writes
+                        event_listeners=[CommandMetrics()]
+                    )
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[self.db_name]
+
+    def connect(self, retries: int = DB_CONNECT_RETRIES, delay: float = DB_CONNECT_DELAY):
+        """Wait until MongoDB answers a ping, retrying with exponential backoff.
+
+        Raises the last connection error after ``retries`` failed attempts.
+        """
+        for attempt in range(1, retries + 1):
+            try:
+                self.client.admin.command('ping')
+                logger.info("Connected to MongoDB database %s (server %s)",
+                            self.db_name, self.client.server_info()['version'])
+                return
+            except (ConnectionFailure, ServerSelectionTimeoutError) as e:
+                if attempt == retries:
+                    logger.error("✗ Could not connect to MongoDB after %s attempts: %s", retries, e)
+                    raise
+                wait = min(delay * 2 ** (attempt - 1), 30)
+                logger.warning("MongoDB not reachable (attempt %s/%s), retrying in %.1fs: %s",
+                               attempt, retries, wait, e)
+                time.sleep(wait)
 
     def close(self):
-        """Close database connection."""
-        if self.client:
-            self.client.close()
+        """Close database connection (a later use opens a new one)."""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
             logger.info("Database connection closed")
 
     def get_database_stats(self) -> Dict[str, Any]:
@@ -79,7 +114,7 @@ class Database:
                 "index_size": stats.get("indexSize", 0)
             }
         except Exception as e:
-            logger.error(f"Error getting database stats: {e}")
+            logger.error("Error getting database stats: %s", e)
             return {}
 
     def list_collections(self) -> List[str]:
@@ -87,25 +122,25 @@ class Database:
         try:
             return self.db.list_collection_names()
         except Exception as e:
-            logger.error(f"Error listing collections: {e}")
+            logger.error("Error listing collections: %s", e)
             return []
 
     def drop_database(self):
         """Drop the entire database (use with caution!)."""
         try:
             self.client.drop_database(self.db_name)
-            logger.warning(f"Database {self.db_name} dropped!")
+            logger.warning("Database %s dropped!", self.db_name)
         except Exception as e:
-            logger.error(f"Error dropping database: {e}")
+            logger.error("Error dropping database: %s", e)
             raise
 
     def create_collection(self, collection_name: str, **options):
         """Create a collection with options."""
         try:
             self.db.create_collection(collection_name, **options)
-            logger.info(f"Created collection: {collection_name}")
+            logger.info("Created collection: %s", collection_name)
         except Exception as e:
-            logger.error(f"Error creating collection {collection_name}: {e}")
+            logger.error("Error creating collection %s: %s", collection_name, e)
             raise
 
     def backup_collection(self, collection_name: str) -> List[Dict]:
@@ -114,7 +149,7 @@ class Database:
             collection = self.db[collection_name]
             return list(collection.find())
         except Exception as e:
-            logger.error(f"Error backing up collection {collection_name}: {e}")
+            logger.error("Error backing up collection %s: %s", collection_name, e)
             return []
 
     def restore_collection(self, collection_name: str, documents: List[Dict]):
@@ -123,9 +158,9 @@ class Database:
             collection = self.db[collection_name]
             if documents:
                 collection.insert_many(documents)
-                logger.info(f"Restored {len(documents)} documents to {collection_name}")
+                logger.info("Restored %s documents to %s", len(documents), collection_name)
         except Exception as e:
-            logger.error(f"Error restoring collection {collection_name}: {e}")
+            logger.error("Error restoring collection %s: %s", collection_name, e)
             raise
 
     def health_check(self) -> Dict[str, Any]:
@@ -162,38 +197,28 @@ class Database:
                 "timestamp": datetime.now().isoformat()
             }
 
-# Create a global database instance
-try:
-    db_client = Database()
-except Exception as e:
-    logger.error(f"Failed to initialize database client: {e}")
-    db_client = None
+# Global database instance (connects on first use)
+db_client = Database()
 
 # Utility functions
 def get_db():
     """Get database instance."""
-    if db_client is None:
-        raise RuntimeError("Database not initialized")
     return db_client.db
 
 def check_connection():
     """Check if database connection is healthy."""
-    if db_client is None:
-        return False
     try:
         db_client.client.admin.command('ping')
         return True
-    except:
+    except Exception:
         return False
 
 def reconnect():
     """Attempt to reconnect to database."""
-    global db_client
     try:
-        if db_client:
-            db_client.close()
-        db_client = Database()
+        db_client.close()
+        db_client.connect(retries=1)
         return True
     except Exception as e:
-        logger.error(f"Failed to reconnect to database: {e}")
-        return False
\ No newline at end of file
+        logger.error("Failed to reconnect to database: %s", e)
+        return False
@@ -0,0 +1,52 @@
+# app/downsample.py
+from typing import Tuple
+import numpy as np
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Downsample a series to ``threshold`` points with Largest-Triangle-Three-Buckets.
+
+    The first and last points are kept; every other bucket contributes the
+    point forming the largest triangle with the previously selected point
+    and the average of the next bucket, which preserves peaks and dips.
+    ``x`` must be sorted.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Edges of the threshold - 2 buckets covering points 1 .. n - 2
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    # Averages of each bucket (the last "bucket" is the last point)
+    next_edges = np.append(edges[1:], n)
+    counts = next_edges - edges
+    avg_x = np.add.reduceat(x, edges) / counts
+    avg_y = np.add.reduceat(y, edges) / counts
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # Twice the triangle area for every candidate point of the bucket
+        area = np.abs((ax - avg_x[i + 1]) * (y[start:end] - ay) - (ax - x[start:end]) * (avg_y[i + 1] - ay))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return x[selected], y[selected]
+
+def minmax_envelope(x: np.ndarray, y: np.ndarray, buckets: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Reduce a series to ``buckets`` (x, min, max) triples.
+
+    Cheaper than LTTB and never hides a spike, at the cost of showing a band
+    rather than a line. ``x`` of each bucket is its first sample.
+    """
+    n = len(x)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if buckets >= n or buckets < 1:
+        return x, y, y
+    edges = np.linspace(0, n, buckets, endpoint=False).astype(np.intp)
+    return x[edges], np.minimum.reduceat(y, edges), np.maximum.reduceat(y, edges)
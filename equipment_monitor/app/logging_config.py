@@ -0,0 +1,224 @@
+# app/logging_config.py
+"""Non-blocking logging pipeline.
+
+Records are filtered (sampling, rate limits) in the calling thread, queued,
+and formatted and written to stdout by a QueueListener thread, so slow
+console I/O never adds latency to requests or poll cycles::
+
+    LOG_LEVEL=INFO
+    LOG_FORMAT=json                          # or text
+    LOG_SAMPLE=app.main=0.1,app.admin=0.5    # share of records kept per logger
+    LOG_ROUTE_SAMPLE=/dashboard=0.01         # share of records kept per route prefix
+    LOG_RATE_LIMIT=20                        # records per second per message
+
+Warnings and errors are never sampled out, only rate limited.
+"""
+from typing import Dict, Optional, Tuple
+import contextvars
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+import orjson
+
+from .serialization import ORJSON_OPTIONS, _default
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_RATE_LIMIT = float(os.getenv("LOG_RATE_LIMIT", "20"))
+
+# Path of the request being handled, set by the request logging middleware
+current_route: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_route", default=None)
+
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "route"}
+
+def _parse_rates(value: str) -> Dict[str, float]:
+    """Parse "key=rate,key=rate" into a dict."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        key, _, rate = item.partition("=")
+        try:
+            rates[key.strip()] = max(0.0, min(1.0, float(rate)))
+        except ValueError:
+            pass
+    return rates
+
+class RouteFilter(logging.Filter):
+    """Tag records with the route of the request being handled."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.route = current_route.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep a share of the records below WARNING, per logger and per route prefix.
+
+    The most specific logger (``app.main`` before ``app``) and the longest
+    route prefix win; the lowest of the two rates applies.
+    """
+
+    def __init__(self, logger_rates: Dict[str, float] = None, route_rates: Dict[str, float] = None):
+        super().__init__()
+        self.logger_rates = logger_rates or {}
+        self.route_prefixes = sorted((route_rates or {}).items(), key=lambda item: -len(item[0]))
+        self._logger_cache: Dict[str, float] = {}
+
+    def _logger_rate(self, name: str) -> float:
+        rate = self._logger_cache.get(name)
+        if rate is None:
+            rate = 1.0
+            parts = name.split(".")
+            for i in range(len(parts), 0, -1):
+                prefix = ".".join(parts[:i])
+                if prefix in self.logger_rates:
+                    rate = self.logger_rates[prefix]
+                    break
+            self._logger_cache[name] = rate
+        return rate
+
+    def _route_rate(self, route: Optional[str]) -> float:
+        if route:
+            for prefix, rate in self.route_prefixes:
+                if route.startswith(prefix):
+                    return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = min(self._logger_rate(record.name), self._route_rate(getattr(record, "route", None)))
+        return rate >= 1.0 or random.random() < rate
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per (logger, message template).
+
+    Records over the limit are dropped; the next record let through carries
+    the number of dropped ones in ``suppressed``.
+    """
+
+    def __init__(self, rate: float = LOG_RATE_LIMIT, burst: float = None, max_keys: int = 10000):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.max_keys = max_keys
+        self._buckets: Dict[Tuple[str, str], list] = {}  # key -> [tokens, updated, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.clear()
+                bucket = self._buckets[key] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep the record as is (args, exc_info): formatting happens in the listener thread.
+        # Only exception tracebacks are rendered here, since they refer to live frames.
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def _log_default(obj):
+    try:
+        return _default(obj)
+    except TypeError:
+        return str(obj)
+
+class StructuredFormatter(logging.Formatter):
+    """One JSON object per line, with the ``extra`` fields of the record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        if getattr(record, "route", None):
+            data["route"] = record.route
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return orjson.dumps(data, default=_log_default, option=ORJSON_OPTIONS).decode("utf-8")
+
+_queue_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def setup_logging():
+    """Route all logging through the queue; safe to call more than once."""
+    global _queue_handler, _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "text":
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        stream_handler.setFormatter(StructuredFormatter())
+
+    _queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _queue_handler.addFilter(RouteFilter())
+    _queue_handler.addFilter(SamplingFilter(
+        _parse_rates(os.getenv("LOG_SAMPLE", "")),
+        _parse_rates(os.getenv("LOG_ROUTE_SAMPLE", ""))
+    ))
+    _queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    # Replace the stream handlers installed by logging.basicConfig() calls
+    root.handlers[:] = [_queue_handler]
+    root.setLevel(LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging():
+    """Flush the queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def logging_stats() -> Dict[str, int]:
+    """Queue depth and records dropped because the queue was full."""
+    if _queue_handler is None:
+        return {"queued": 0, "dropped": 0}
+    return {"queued": _queue_handler.queue.qsize(), "dropped": _queue_handler.dropped}
@@ -0,0 +1,147 @@
+# app/loop_watchdog.py
+"""Event loop blocking detector.
+
+A heartbeat task sleeps ``LOOP_WATCHDOG_INTERVAL`` seconds in a loop and
+measures how late it wakes up (the event loop lag). A watchdog thread checks
+the heartbeat; when the loop has not come back for more than
+``LOOP_BLOCK_THRESHOLD`` seconds, it captures the stack of the loop thread
+and finds the route whose endpoint is running in it. When the loop recovers,
+the stall is logged with that stack and counted per route::
+
+    LOOP_WATCHDOG=1
+    LOOP_WATCHDOG_INTERVAL=0.05
+    LOOP_BLOCK_THRESHOLD=0.1
+"""
+from typing import Any, Callable, Dict, List, Optional
+from collections import deque
+from types import CodeType, FrameType
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+import logging
+
+from .metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+LOOP_WATCHDOG = os.getenv("LOOP_WATCHDOG", "1") == "1"
+LOOP_WATCHDOG_INTERVAL = float(os.getenv("LOOP_WATCHDOG_INTERVAL", "0.05"))
+LOOP_BLOCK_THRESHOLD = float(os.getenv("LOOP_BLOCK_THRESHOLD", "0.1"))
+# Frames kept in a captured stack (innermost ones)
+STACK_LIMIT = 30
+
+LOOP_LAG_SECONDS = Histogram("event_loop_lag_seconds", "Delay of the event loop heartbeat",
+                             buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+LOOP_BLOCKS = Counter("event_loop_blocks_total", "Event loop stalls over the threshold", ("route",))
+LOOP_BLOCKED_SECONDS = Counter("event_loop_blocked_seconds_total", "Time the event loop was stalled", ("route",))
+
+class LoopWatchdog:
+    def __init__(self, interval: float = LOOP_WATCHDOG_INTERVAL, threshold: float = LOOP_BLOCK_THRESHOLD,
+                 history: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self._codes: Dict[CodeType, str] = {}  # endpoint code object -> route
+        self._loop_thread_id: Optional[int] = None
+        self._expected = 0.0  # monotonic time the heartbeat should wake up at
+        self._stall: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self.recent = deque(maxlen=history)
+
+    def add_function(self, function: Callable, label: str):
+        """Attribute stalls to ``label`` while ``function`` is running."""
+        function = getattr(function, "__wrapped__", function)
+        code = getattr(function, "__code__", None)
+        if code is not None:
+            self._codes[code] = label
+
+    def watch_routes(self, app):
+        """Attribute stalls to the routes of ``app`` (call once all routes are added)."""
+        for route in app.routes:
+            endpoint = getattr(route, "endpoint", None)
+            if endpoint is not None and hasattr(route, "path"):
+                methods = ",".join(sorted(getattr(route, "methods", None) or ()))
+                self.add_function(endpoint, f"{methods} {route.path}".strip())
+
+    def _attribute(self, frame: Optional[FrameType]) -> str:
+        """Route of the innermost known endpoint in the stack."""
+        while frame is not None:
+            label = self._codes.get(frame.f_code)
+            if label is not None:
+                return label
+            frame = frame.f_back
+        return "unknown"
+
+    def _capture(self, blocked: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.format_list(traceback.extract_stack(frame, limit=STACK_LIMIT))
+        route = self._attribute(frame)
+        del frame
+        with self._lock:
+            if self._stall is None:
+                self._stall = {"route": route, "stack": "".join(stack), "detected_after": round(blocked, 4)}
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            blocked = time.monotonic() - self._expected
+            if blocked > self.threshold and self._stall is None:
+                self._capture(blocked)
+
+    async def _heartbeat(self):
+        while True:
+            self._expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - self._expected)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag > self.threshold:
+                self._record(lag)
+
+    def _record(self, lag: float):
+        with self._lock:
+            stall, self._stall = self._stall, None
+        # Not captured when the stall was shorter than one check of the watchdog thread,
+        # or when the loop held the GIL the whole time
+        route = stall["route"] if stall else "unknown"
+        LOOP_BLOCKS.labels(route).inc()
+        LOOP_BLOCKED_SECONDS.labels(route).inc(lag)
+        entry = {"route": route, "blocked_seconds": round(lag, 4), "at": time.time(),
+                 "stack": stall["stack"] if stall else None}
+        self.recent.append(entry)
+        logger.warning("Event loop blocked for %.3fs in %s", lag, route,
+                       extra={"event": "loop_blocked", "route_template": route,
+                              "blocked_seconds": entry["blocked_seconds"], "stack": entry["stack"]})
+
+    def start(self):
+        """Start watching the running event loop (call from a coroutine)."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._expected = time.monotonic() + self.interval
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Thresholds and the most recent stalls, newest first."""
+        recent: List[Dict[str, Any]] = list(self.recent)
+        recent.reverse()
+        return {"interval": self.interval, "threshold": self.threshold, "recent": recent}
+
+loop_watchdog = LoopWatchdog()
@@ -1,16 +1,15 @@
 import logging
-from fastapi import FastAPI, Request, Response, status, HTTPException, Depends
+from fastapi import FastAPI, Request, Response, status, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi import Form
 from typing import Optional, Dict, Any, List
 import os
-import secrets
 import random
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import asyncio
+import time
 import platform
 import getpass
 import sys
@@ -24,10 +23,28 @@ import asyncio
 # Add the parent directory to the path so we can import from app.routers
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-from .models import User, Role, Permission
+from .models import User, Role, Permission, user_directory
 from .templates.monitoring.monitor import monitor, run_monitoring
+from .templates.monitoring.snapshot_store import COLLECTOR_MODE, get_status_source
+from .templates.monitoring.device_exporter import exporter as device_exporter
 from .routers import device_routes
 from . import admin
+from .serialization import json_response
+from .pagination import InvalidCursor
+from .sessions import create_session_store
+from .principal import session_principal
+from .passwords import PasswordPoolBusy, check_password, login_throttle, password_pool
+from .logging_config import setup_logging, shutdown_logging, current_route
+from .templating import templates, fragments
+from .metrics import REGISTRY, CONTENT_TYPE, Counter, Gauge, Histogram
+from .passwords import auth_stats
+from .logging_config import logging_stats
+from .loop_watchdog import LOOP_WATCHDOG, loop_watchdog
+from .models.database_models import Equipment, EquipmentHistory
+from .downsample import lttb, minmax_envelope
+from pydantic import BaseModel
+from bson import ObjectId
+import numpy as np
 from fastapi import HTTPException, status
 
 # Initialize app
@@ -36,8 +53,11 @@ app = FastAPI(title="Equipment Monitoring Dashboard")
 # Include device monitoring routes
 app.include_router(device_routes.router)
 
-# Store sessions in app state
-app.state.sessions = {}
+# Session store (in-process or shared through Mongo, see SESSION_BACKEND)
+app.state.sessions = create_session_store()
+
+# Device statuses: the in-process monitor, or the standalone collector's (see COLLECTOR_MODE)
+status_source = get_status_source()
 
 # Include admin routes
 app.include_router(admin.router)
@@ -46,12 +66,11 @@ app.include_router(admin.router)
 @app.get("/profile", response_class=HTMLResponse)
 async def profile_page(request: Request):
     try:
-        session_id = request.cookies.get("session_id")
-        if not session_id or session_id not in request.app.state.sessions:
+        session_data = request.app.state.sessions.get(request.cookies.get("session_id"))
+        if not session_data:
             return RedirectResponse(url="/login")
         
-        session_data = request.app.state.sessions[session_id]
-        user = next((u for u in dummy_users.values() if str(u.id) == str(session_data.get("id"))), None)
+        user = user_directory.get(session_data.get("id"))
         
         if not user:
             return RedirectResponse(url="/login")
@@ -63,7 +82,7 @@ async def profile_page(request: Request):
         })
         
     except Exception as e:
-        print(f"Profile page error: {str(e)}")
+        logger.error("Profile page error: %s", e)
         return RedirectResponse(url="/login")
 
 # Windows Authentication Configuration
@@ -72,14 +91,8 @@ WINDOWS_AUTH_ENABLED = True  # Set to False to disable Windows Auth
 # Mount static files
 app.mount("/static", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "static")), name="static")
 
-try:
-    templates = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "templates"))
-except Exception as e:
-    print(f"Error initializing templates: {e}")
-    templates = None
-
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Set up logging (queued, written by a background thread)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Home page route
@@ -92,36 +105,35 @@ def get_windows_username() -> Optional[str]:
     try:
         return getpass.getuser()
     except Exception as e:
-        print(f"Error getting Windows username: {e}")
+        logger.error("Error getting Windows username: %s", e)
         return None
 
 async def get_current_user(request: Request) -> Optional[Dict[str, Any]]:
     """Get the current user from session or Windows authentication."""
     # Check for session cookie first
-    session_id = request.cookies.get("session_id")
-    if session_id and session_id in request.app.state.sessions:
-        return request.app.state.sessions[session_id]
+    session_data = request.app.state.sessions.get(request.cookies.get("session_id"))
+    if session_data:
+        return session_data
     
     # If no session, try Windows Authentication if enabled
     if WINDOWS_AUTH_ENABLED and platform.system() == 'Windows':
         username = get_windows_username()
         if username:
             # Look for a user with a matching username (case-insensitive)
-            username_lower = username.lower()
-            user = next((u for u in dummy_users.values() if u.username.lower() == username_lower), None)
+            user = user_directory.get_by_username(username)
             
             if user:
                 # Create a fresh User object to ensure permissions are properly initialized
                 from .models import User as UserModel
-                user_obj = next((u for u in dummy_users.values() if u.id == user.id), None)
+                user_obj = user_directory.get(user.id)
                 if not user_obj:
-                    print(f"User {username} not found in dummy_users")
+                    logger.warning("User %s not found in user directory", username)
                     return None
                     
-                print(f"Windows auth successful for {user_obj.username} with role {user_obj.role} and permissions: {user_obj.permissions}")
+                logger.info("Windows auth successful for %s", user_obj.username,
+                            extra={"user_id": user_obj.id, "role": user_obj.role})
                 
                 # Create a session for the Windows-authenticated user
-                session_id = secrets.token_urlsafe(32)
                 user_data = {
                     "id": user_obj.id,
                     "username": user_obj.username,
@@ -131,21 +143,27 @@ async def get_current_user(request: Request) -> Optional[Dict[str, Any]]:
                     "windows_auth": True,
                     "last_activity": datetime.now()
                 }
-                request.app.state.sessions[session_id] = user_data
+                request.app.state.sessions.create(user_data)
                 return user_data
     return None
 
 # Authentication middleware
 @app.middleware("http")
 async def auth_middleware(request: Request, call_next):
+    # Route of the log records emitted while handling this request
+    current_route.set(request.url.path)
+    
     # Allow access to these paths without authentication
-    public_paths = ["/", "/login", "/signup", "/windows-auth"]
+    public_paths = ["/", "/login", "/signup", "/windows-auth", "/metrics"]
     if any(request.url.path.startswith(path) for path in public_paths):
         return await call_next(request)
     
-    # Get current user
+    # Get current user and its principal (cached on the session)
     current_user = await get_current_user(request)
-    if not current_user:
+    principal = None
+    if current_user:
+        principal = session_principal(request.app.state.sessions, request.cookies.get("session_id"), current_user)
+    if not principal:
         # If this is an API request, return 401
         if request.url.path.startswith("/api/"):
             return JSONResponse(
@@ -157,13 +175,14 @@ async def auth_middleware(request: Request, call_next):
     
     # Add user to request state
     request.state.user = current_user
+    request.state.principal = principal
     
     # Continue with the request
     response = await call_next(request)
     
     # If we have a session ID, make sure it's set in the response
     session_id = request.cookies.get("session_id")
-    if session_id in sessions and not request.cookies.get("session_id"):
+    if not request.cookies.get("session_id") and session_id in request.app.state.sessions:
         response.set_cookie(
             key="session_id",
             value=session_id,
@@ -178,7 +197,7 @@ async def auth_middleware(request: Request, call_next):
         print("No session ID found in cookies")
         return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
     
-    session = sessions.get(session_id)
+    session = request.app.state.sessions.get(session_id)
     if not session:
         print(f"Invalid session ID: {session_id}")
         return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
@@ -187,6 +206,57 @@ async def auth_middleware(request: Request, call_next):
     response = await call_next(request)
     return response
 
+# Request metrics
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being handled")
+Gauge("sessions", "Live sessions").set_function(lambda: app.state.sessions.count())
+Gauge("password_pool_pending", "Password checks queued or running").set_function(
+    lambda: auth_stats()["password_pool"]["pending"])
+Counter("password_pool_rejected_total", "Password checks rejected because the pool was full").set_function(
+    lambda: auth_stats()["password_pool"]["rejected"])
+Counter("login_throttled_total", "Login attempts rejected by the throttle").set_function(
+    lambda: sum(auth_stats()["login_throttle"]["rejected"].values()))
+Counter("log_records_dropped_total", "Log records dropped because the log queue was full").set_function(
+    lambda: logging_stats()["dropped"])
+Counter("fragment_cache_hits_total", "Dashboard fragments served from the cache").set_function(
+    lambda: fragments.hits)
+Counter("fragment_cache_misses_total", "Dashboard fragments rendered").set_function(
+    lambda: fragments.misses)
+
+# Registered after auth_middleware, so it wraps it and times whole requests
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    HTTP_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        HTTP_IN_FLIGHT.dec()
+        # Route template (/api/equipment/{equipment_id}/chart), not the raw path, to bound label values
+        route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+        HTTP_REQUESTS.labels(request.method, route, status_code).inc()
+        HTTP_REQUEST_SECONDS.labels(request.method, route).observe(elapsed)
+
+@app.get("/metrics")
+async def metrics():
+    """Application metrics in Prometheus text format."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/metrics/devices")
+async def device_metrics(request: Request):
+    """Per-device metrics of the current status snapshot in Prometheus text format."""
+    snapshot = status_source.get_snapshot()
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(content=device_exporter.render_gzip(snapshot), media_type=CONTENT_TYPE,
+                        headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+    body, _ = device_exporter.render(snapshot)
+    return Response(content=body, media_type=CONTENT_TYPE, headers={"Vary": "Accept-Encoding"})
+
 from .models import dummy_equipment, dummy_history
 
 # Use dummy data from models
@@ -199,11 +269,8 @@ data_history = {
 
 @app.get("/api/filters")
 async def get_filters():
-    from .models import LIGNES, ATELIERS
-    return {
-        "lignes": LIGNES,
-        "ateliers": ATELIERS
-    }
+    """Ligne/atelier filter options of the monitored devices, with counts by status."""
+    return json_response(status_source.get_filters())
 
 # Authentication routes
 @app.get("/windows-auth")
@@ -218,20 +285,14 @@ async def windows_auth(request: Request, response: Response):
         return RedirectResponse(url="/login?auto_redirect=false")
     
     # Check if this Windows user exists in our system (case-insensitive match)
-    username_lower = username.lower()
-    user = None
-    for email, user_obj in dummy_users.items():
-        if user_obj.username.lower() == username_lower:
-            user = user_obj
-            break
+    user = user_directory.get_by_username(username)
     
     if not user:
         # User not found in our system
         return RedirectResponse(url="/login?error=windows_user_not_found")
     
     # Create session for the Windows-authenticated user
-    session_id = secrets.token_urlsafe(32)
-    request.app.state.sessions[session_id] = {
+    session_id = request.app.state.sessions.create({
         "id": user.id,
         "username": user.username,
         "email": user.email,
@@ -239,7 +300,7 @@ async def windows_auth(request: Request, response: Response):
         "permissions": list(user.permissions),
         "windows_auth": True,
         "last_activity": datetime.now()
-    }
+    })
     
     # Set session cookie
     response = RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
@@ -253,83 +314,63 @@ async def windows_auth(request: Request, response: Response):
     
     return response
 
+def render_dashboard_filters(ligne: Optional[str], atelier: Optional[str], role: Optional[str]):
+    """Filter bar of the dashboard, rendered once per (snapshot version, filters, role)."""
+    snapshot = status_source.get_snapshot()
+    
+    def context():
+        filters = status_source.get_filters()
+        return {
+            "lignes": filters["lignes"],
+            "ateliers": filters["ateliers"],
+            "selected_ligne": ligne,
+            "selected_atelier": atelier
+        }
+    
+    return fragments.render("partials/dashboard_filters.html", (snapshot.version, ligne, atelier, role), context)
+
 @app.get("/dashboard")
 async def dashboard(request: Request, ligne: Optional[str] = None, atelier: Optional[str] = None):
     try:
-        session_id = request.cookies.get("session_id")
-        if not session_id or session_id not in request.app.state.sessions:
+        # The session store drops expired sessions and extends live ones
+        session_data = request.app.state.sessions.get(request.cookies.get("session_id"))
+        if not session_data:
             return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
         
-        session_data = request.app.state.sessions[session_id]
-        if datetime.now() - session_data["last_activity"] > timedelta(hours=1):
-            # Session expired
-            del request.app.state.sessions[session_id]
-            return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
-        
-        # Update last activity
-        request.app.state.sessions[session_id]["last_activity"] = datetime.now()
-        
         # Get the user's email from session
         user_email = session_data["email"]
         user_name = session_data["username"]
         
-        # Get all equipment data and filter by ligne and atelier
-        equipment_list = equipments
-        if ligne:
-            equipment_list = [e for e in equipment_list if e.ligne == ligne]
-        if atelier:
-            equipment_list = [e for e in equipment_list if e.atelier == atelier]
-        
-        print(f"Dashboard accessed by {user_email}")
+        logger.debug("Dashboard accessed by %s", user_email)
         
         # Get the current user object
-        user = next((u for u in dummy_users.values() if u.email == user_email), None)
-        
-        # Debug output
-        print(f"\n=== Dashboard Debug Info ===")
-        print(f"Session Data: {session_data}")
-        print(f"User Email: {user_email}")
-        print(f"Found User: {user}")
-        if user:
-            print(f"User Role: {user.role}")
-            print(f"User Permissions: {user.permissions}")
-        print("==========================\n")
+        user = user_directory.get_by_email(user_email)
         
         # Include the current user in the template context
         context = {
             "request": request,
             "user_email": user_email,
             "user_name": user_name,
-            "equipment_list": equipment_list,
+            # The equipment list itself is loaded page by page from /api/equipment
+            "filters_html": render_dashboard_filters(ligne, atelier, session_data.get("role")),
+            "selected_ligne": ligne,
+            "selected_atelier": atelier,
             "current_user": user  # Add the user object to the context
         }
         
-        print("\n=== Template Context ===")
-        print(f"Current User: {user}")
-        if user:
-            print(f"User Role: {user.role}")
-            print(f"User Permissions: {user.permissions}")
-        print("======================\n")
-        
         return templates.TemplateResponse("dashboard.html", context)
     except Exception as e:
-        print(f"Dashboard error: {str(e)}")
+        logger.error("Dashboard error: %s", e)
         return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
 
 @app.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request, auto_redirect: bool = True):
     try:
-        print("Login page requested")
         windows_username = None
         if WINDOWS_AUTH_ENABLED and platform.system() == 'Windows':
             windows_username = get_windows_username()
             if windows_username and auto_redirect:
-                username_lower = windows_username.lower()
-                matching_user = None
-                for email, user in dummy_users.items():
-                    if user.username.lower() == username_lower:
-                        matching_user = user
-                        break
+                matching_user = user_directory.get_by_username(windows_username)
                 if matching_user:
                     # Instead of auto-redirecting, pre-fill the form
                     return templates.TemplateResponse("login.html", {
@@ -350,10 +391,7 @@ async def login_page(request: Request, auto_redirect: bool = True):
             "message": request.query_params.get("message", "")
         })
     except Exception as e:
-        print(f"Error in login_page: {str(e)}")
-        print(f"Error type: {type(e).__name__}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in login_page: %s", e)
         raise
 
 @app.post("/login")
@@ -366,40 +404,43 @@ async def login(request: Request, response: Response):
         if not username:
             return RedirectResponse("/login?error=username_required", status_code=status.HTTP_303_SEE_OTHER)
         
+        # Throttle bursts of attempts per client IP and per username
+        client_ip = request.client.host if request.client else None
+        if not login_throttle.allow(client_ip, username):
+            return RedirectResponse("/login?error=too_many_attempts", status_code=status.HTTP_303_SEE_OTHER)
+        
         # Find user by username (case-insensitive)
-        user = None
-        for u in dummy_users.values():
-            if u.username.lower() == username.lower():
-                user = u
-                break
+        user = user_directory.get_by_username(username)
         
         # Check if user exists and either:
         # 1. No password is set (Windows auth user), or
-        # 2. Password matches (regular user)
-        if not user or (user.password and user.password != password):
-            print(f"Login failed for username: {username}")
+        # 2. Password matches (regular user), checked off the event loop
+        try:
+            password_ok = user is not None and (not user.password or await check_password(password, user.password))
+        except PasswordPoolBusy:
+            return RedirectResponse("/login?error=too_many_attempts", status_code=status.HTTP_303_SEE_OTHER)
+        if not password_ok:
+            logger.info("Login failed for username %s", username, extra={"client_ip": client_ip})
             return RedirectResponse("/login?error=invalid_credentials", status_code=status.HTTP_303_SEE_OTHER)
         
         # Create a fresh User object to ensure permissions are properly initialized
         from .models import User as UserModel
-        user_obj = next((u for u in dummy_users.values() if u.id == user.id), None)
+        user_obj = user_directory.get(user.id)
         if not user_obj:
             return RedirectResponse("/login?error=user_not_found", status_code=status.HTTP_303_SEE_OTHER)
             
         # Create session with user data
-        session_id = secrets.token_urlsafe(32)
-        request.app.state.sessions[session_id] = {
+        session_id = request.app.state.sessions.create({
             "id": user_obj.id,
             "username": user_obj.username,
             "email": user_obj.email,
             "role": user_obj.role,
             "permissions": list(user_obj.permissions) if hasattr(user_obj, 'permissions') else [],
             "last_activity": datetime.now()
-        }
-        
-        print(f"Session created for {user_obj.username} with role {user_obj.role} and permissions: {user_obj.permissions}")
+        })
         
-        print(f"Login successful for {user.username} (ID: {user.id})")
+        logger.info("Login successful for %s", user.username,
+                    extra={"user_id": user.id, "role": user_obj.role, "client_ip": client_ip})
         
         # Create response with redirect
         response = RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
@@ -414,18 +455,15 @@ async def login(request: Request, response: Response):
             samesite="Lax",
             path="/"  # Make cookie available on all paths
         )
-        
-        print(f"Session cookie set for {user.email}. Redirecting to /dashboard")
+
         return response
     except Exception as e:
-        print(f"Login error: {str(e)}")
+        logger.error("Login error: %s", e)
         return Response("An error occurred during login", status_code=500)
 
 @app.post("/logout")
 async def logout(request: Request, response: Response):
-    session_id = request.cookies.get("session_id")
-    if session_id in request.app.state.sessions:
-        del request.app.state.sessions[session_id]
+    request.app.state.sessions.delete(request.cookies.get("session_id"))
     response.delete_cookie("session_id")
     return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
 
@@ -441,15 +479,14 @@ async def signup(request: Request, response: Response):
     name = form_data.get("name")
     
     # Simple user registration
-    if any(user["email"] == email for user in request.app.state.sessions.values()):
+    if request.app.state.sessions.find_by_email(email):
         return Response("Email already registered", status_code=400)
     
     # Create session
-    session_id = secrets.token_hex(16)
-    request.app.state.sessions[session_id] = {
+    session_id = request.app.state.sessions.create({
         "email": email,
         "name": name
-    }
+    })
     
     response.set_cookie(key="session_id", value=session_id)
     return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
@@ -509,27 +546,9 @@ async def dashboard(request: Request):
             {"request": request, "equipments": equipments}
         )
     except Exception as e:
-        logger.error(f"Error rendering dashboard: {str(e)}")
+        logger.error("Error rendering dashboard: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.get("/api/equipment")
-async def get_equipment():
-    try:
-        return equipments
-    except Exception as e:
-        logger.error(f"Error getting equipment: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
-
-@app.get("/api/filters")
-async def get_filters():
-    """
-    Returns the available filters for the dashboard.
-    """
-    return {
-        "lignes": LIGNES,
-        "ateliers": ATELIERS
-    }
-
 """@app.get("/api/equipment/{equipment_id}")
 async def get_equipment_data(equipment_id: int):
     try:
@@ -540,7 +559,7 @@ async def get_equipment_data(equipment_id: int):
             return equipment_dict
         return {"error": "Equipment not found"}
     except Exception as e:
-        logger.error(f"Error getting equipment {equipment_id}: {str(e)}")
+        logger.error("Error getting equipment %s: %s", equipment_id, e)
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 async def update_equipment_data():
@@ -566,11 +585,11 @@ async def update_equipment_data():
                     data_history[eq.id].append({"time": timestamp, "value": eq.data_rate})
                     data_history[eq.id] = data_history[eq.id][-20:]
                 except Exception as e:
-                    logger.error(f"Error updating equipment {eq.id}: {str(e)}")
+                    logger.error("Error updating equipment %s: %s", eq.id, e)
             
             await asyncio.sleep(2)
     except Exception as e:
-        logger.error(f"Error in update_equipment_data: {str(e)}")
+        logger.error("Error in update_equipment_data: %s", e)
         raise
 
 """
@@ -591,33 +610,17 @@ async def dashboard(request: Request, ligne: Optional[str] = None, atelier: Opti
         user = await get_current_user(request)
         if not user:
             return RedirectResponse(url="/login")
-            
-        # Get device status
-        devices = monitor.get_status()
-        
-        # Filter devices based on ligne and atelier if provided
-        if ligne:
-            devices = [d for d in devices if d.get("ligne") == ligne]
-        if atelier:
-            devices = [d for d in devices if d.get("atelier") == atelier]
-            
-        # Get available filters
-        filters = {
-            "lignes": sorted(list(set(d.get("ligne") for d in devices if d.get("ligne")))),
-            "ateliers": sorted(list(set(d.get("atelier") for d in devices if d.get("atelier"))))
-        }
         
         return templates.TemplateResponse("dashboard.html", {
             "request": request,
             "current_user": user,
-            "devices": devices,
-            "filters": filters,
+            "filters_html": render_dashboard_filters(ligne, atelier, user.get("role")),
             "selected_ligne": ligne,
             "selected_atelier": atelier
         })
         
     except Exception as e:
-        logger.error(f"Dashboard error: {str(e)}")
+        logger.error("Dashboard error: %s", e)
         return RedirectResponse(url="/login")
 
 async def update_equipment_data():
@@ -631,17 +634,45 @@ async def update_equipment_data():
             # Handle cancellation
             break
         except Exception as e:
-            logger.error(f"Error in update_equipment_data: {str(e)}")
+            logger.error("Error in update_equipment_data: %s", e)
             await asyncio.sleep(5)  # Wait before retrying
         
 @app.on_event("startup")
 async def startup_event():
     """Start background tasks when the application starts."""
-    # Start the monitoring loop
-    asyncio.create_task(run_monitoring())
+    # Start the session expiry sweeper
+    app.state.sessions.start()
+    if LOOP_WATCHDOG:
+        loop_watchdog.watch_routes(app)
+        loop_watchdog.add_function(auth_middleware, "middleware auth")
+        loop_watchdog.add_function(metrics_middleware, "middleware metrics")
+        loop_watchdog.start()
+    if COLLECTOR_MODE == "external":
+        # Statuses are collected by the standalone collector (python -m app.collector)
+        status_source.start()
+    else:
+        # Start the monitoring loop
+        asyncio.create_task(run_monitoring())
     # Start the equipment data update task
     asyncio.create_task(update_equipment_data())
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks when the application stops."""
+    app.state.sessions.stop()
+    password_pool.shutdown()
+    loop_watchdog.stop()
+    if COLLECTOR_MODE == "external":
+        status_source.stop()
+    shutdown_logging()
+
+# Fields that can be requested from /api/equipment
+EQUIPMENT_FIELDS = (
+    "name", "ip_address", "ligne", "atelier", "description", "location", "equipment_type",
+    "status", "data_rate", "response_time", "packet_loss", "last_checked", "is_active",
+    "created_at", "updated_at"
+)
+
 class EquipmentCreate(BaseModel):
     name: str
     ip_address: str
@@ -649,8 +680,47 @@ class EquipmentCreate(BaseModel):
     atelier: str
 
 @app.get("/api/equipment")
-async def get_equipment():
-    return [eq.to_dict() for eq in Equipment.get_all()]
+def get_equipment(
+    ligne: Optional[str] = None,
+    atelier: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    sort: str = "name",
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Filtered, sorted page of equipment.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` to get the next page.
+    ``fields`` is a comma-separated list of fields to return (defaults to the
+    ones shown in the dashboard list).
+
+    A plain ``def``: FastAPI runs it in the threadpool, so the blocking
+    pymongo query doesn't stall the event loop.
+    """
+    projection = Equipment.LIST_FIELDS
+    if fields:
+        projection = tuple(f.strip() for f in fields.split(",") if f.strip())
+        unknown = set(projection) - set(EQUIPMENT_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    
+    try:
+        items, next_cursor = Equipment.get_page(
+            ligne=ligne,
+            atelier=atelier,
+            status=status_filter,
+            sort=sort,
+            descending=order == "desc",
+            limit=limit,
+            cursor=cursor,
+            fields=projection
+        )
+    except (InvalidCursor, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return json_response({"items": items, "next_cursor": next_cursor})
 
 @app.post("/api/equipment")
 async def create_equipment(equipment: EquipmentCreate):
@@ -661,4 +731,114 @@ async def create_equipment(equipment: EquipmentCreate):
         atelier=equipment.atelier
     )
     new_equip.save()
-    return {"id": new_equip.id, **new_equip.to_dict()}
\ No newline at end of file
+    return json_response(new_equip)
+
+# Expected seconds between two history samples of an equipment
+HISTORY_SAMPLE_INTERVAL = 5
+# Aggregate in Mongo first when a range holds more than this many samples per chart point
+CHART_ROLLUP_FACTOR = 20
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """UTC time without tzinfo, as history timestamps are stored (aware values are converted)."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _epoch_ms_labels(x: np.ndarray) -> List[str]:
+    """ISO 8601 UTC labels for epoch-millisecond x values."""
+    return [label + "Z" for label in np.datetime_as_string(x.astype("datetime64[ms]"), unit="s")]
+
+@app.get("/api/equipment/{equipment_id}/chart")
+def get_equipment_chart(
+    equipment_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(300, ge=3, le=5000),
+    metric: str = "data_rate",
+    mode: str = Query("lttb", pattern="^(lttb|minmax)$")
+):
+    """History of an equipment metric downsampled to about ``points`` points.
+
+    ``lttb`` keeps the visual shape of the series (Largest-Triangle-Three-Buckets),
+    ``minmax`` returns a min/max envelope per bucket. Long ranges are first
+    rolled up into time buckets by Mongo, short ones use the raw samples.
+    Times are UTC (or converted to UTC) and default to the last 24 hours.
+    Runs in the threadpool, the history queries are blocking.
+    """
+    end = _naive_utc(end) or datetime.utcnow()
+    start = _naive_utc(start) or end - timedelta(hours=24)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if metric not in EquipmentHistory.METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric {metric}")
+    if not ObjectId.is_valid(equipment_id):
+        raise HTTPException(status_code=404, detail="Equipment not found")
+    
+    span = (end - start).total_seconds()
+    if span / HISTORY_SAMPLE_INTERVAL > points * CHART_ROLLUP_FACTOR:
+        source = "rollup"
+        buckets = EquipmentHistory.get_rollup(equipment_id, start, end, span / (points * 4), metric)
+        x = np.array([b["t"] for b in buckets], dtype=np.float64)
+        y = np.array([b["avg"] for b in buckets], dtype=np.float64)
+        y_min = np.array([b["min"] for b in buckets], dtype=np.float64)
+        y_max = np.array([b["max"] for b in buckets], dtype=np.float64)
+    else:
+        source = "raw"
+        timestamps, values = EquipmentHistory.get_series(equipment_id, start, end, metric)
+        x = np.array(timestamps, dtype="datetime64[ms]").astype(np.int64).astype(np.float64)
+        y = y_min = y_max = np.array(values, dtype=np.float64)
+    
+    result = {
+        "equipment_id": equipment_id,
+        "metric": metric,
+        "mode": mode,
+        "source": source,
+        "start": start,
+        "end": end
+    }
+    if mode == "minmax":
+        bucket_x, low, _ = minmax_envelope(x, y_min, points)
+        _, _, high = minmax_envelope(x, y_max, points)
+        result.update(labels=_epoch_ms_labels(bucket_x), min=low, max=high)
+    else:
+        sampled_x, sampled_y = lttb(x, y, points)
+        result.update(labels=_epoch_ms_labels(sampled_x), data=sampled_y)
+    return json_response(result)
+
+@app.get("/api/equipment/{equipment_id}/history")
+def get_equipment_history(
+    equipment_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(1000, ge=1, le=10000),
+    cursor: Optional[str] = None
+):
+    """Page through the raw history samples of an equipment.
+
+    ``fields`` is a comma-separated list of metrics to return (defaults to
+    data_rate, response_time and packet_loss). Pass the returned
+    ``next_cursor`` back as ``cursor`` to get the next page. Runs in the
+    threadpool, the history query is blocking.
+    """
+    if not ObjectId.is_valid(equipment_id):
+        raise HTTPException(status_code=404, detail="Equipment not found")
+    projection = EquipmentHistory.METRICS
+    if fields:
+        projection = tuple(f.strip() for f in fields.split(",") if f.strip())
+    
+    try:
+        items, next_cursor = EquipmentHistory.get_page(
+            equipment_id,
+            start=start,
+            end=end,
+            fields=projection,
+            limit=limit,
+            cursor=cursor,
+            descending=order == "desc"
+        )
+    except (InvalidCursor, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return json_response({"items": items, "next_cursor": next_cursor})
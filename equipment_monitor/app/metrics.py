@@ -0,0 +1,191 @@
+# app/metrics.py
+"""Minimal Prometheus metrics (text exposition format 0.0.4).
+
+Updates are plain attribute/list increments without locks: each metric is
+mostly written from a single thread (the event loop or the monitor thread)
+and the GIL keeps concurrent increments from corrupting anything; at worst
+a rare concurrent increment is lost, which is fine for monitoring.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+import math
+
+# Default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(names: Sequence[str], values: Sequence) -> str:
+    """Preformatted ``{a="x",b="y"}`` label set ('' without labels)."""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{escape_label_value(v)}"' for n, v in zip(names, values)) + "}"
+
+def format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, "Metric"] = {}
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric: "Metric"):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def add_collector(self, collector: Callable[[], Iterable[str]]):
+        """Add a function yielding exposition lines, called on each render."""
+        self._collectors.append(collector)
+
+    def render(self) -> bytes:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        lines.append("")
+        return "\n".join(lines).encode("utf-8")
+
+REGISTRY = Registry()
+
+class Metric(ABC):
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple, object] = {}
+        self._function: Optional[Callable[[], float]] = None
+        if registry is not None:
+            registry.register(self)
+
+    @abstractmethod
+    def _new_child(self, label_str: str):
+        """Child holding the value(s) of one label set."""
+
+    def labels(self, *values):
+        """Child metric for these label values (cached, keep a reference on hot paths)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children.setdefault(values, self._new_child(format_labels(self.labelnames, values)))
+        return child
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from ``function`` at render time (unlabelled metrics only)."""
+        self._function = function
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        if self._function is not None:
+            try:
+                lines.append(f"{self.name} {format_value(self._function())}")
+            except Exception:
+                pass
+            return lines
+        if not self.labelnames and () not in self._children:
+            self.labels()
+        for child in list(self._children.values()):
+            lines.extend(child.render(self.name))
+        return lines
+
+class _ValueChild:
+    __slots__ = ("label_str", "value")
+
+    def __init__(self, label_str: str):
+        self.label_str = label_str
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+    def render(self, name: str) -> List[str]:
+        return [f"{name}{self.label_str} {format_value(self.value)}"]
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def _new_child(self, label_str: str):
+        return _ValueChild(label_str)
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def _new_child(self, label_str: str):
+        return _ValueChild(label_str)
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+class _HistogramChild:
+    __slots__ = ("label_str", "upper_bounds", "counts", "sum")
+
+    def __init__(self, label_str: str, upper_bounds: Tuple[float, ...]):
+        self.label_str = label_str
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+    def render(self, name: str) -> List[str]:
+        # Labels of the bucket lines: the child's labels plus le
+        prefix = self.label_str[:-1] + "," if self.label_str else "{"
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.upper_bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{prefix}le="{format_value(float(bound))}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        lines.append(f'{name}_bucket{prefix}le="+Inf"}} {cumulative}')
+        lines.append(f"{name}_sum{self.label_str} {format_value(self.sum)}")
+        lines.append(f"{name}_count{self.label_str} {cumulative}")
+        return lines
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional[Registry] = REGISTRY):
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self, label_str: str):
+        return _HistogramChild(label_str, self.upper_bounds)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
@@ -3,6 +3,7 @@ from typing import List, Optional, Dict, Set
 from datetime import datetime, timedelta
 import random
 from enum import Enum, auto
+import itertools
 
 class Permission(Enum):
     MANAGE_USERS = "manage_users"
@@ -131,6 +132,114 @@ dummy_users = {
 
 }
 
+class UserDirectory:
+    """In-memory users indexed by id, case-folded username and email.
+
+    All changes must go through add/update/remove so the three maps stay in
+    sync. Each change also gives the user a new epoch, which invalidates the
+    principals cached on its sessions.
+    """
+
+    def __init__(self, users=()):
+        self._by_id: Dict[int, User] = {}
+        self._by_username: Dict[str, User] = {}
+        self._by_email: Dict[str, User] = {}
+        self._epochs: Dict[int, int] = {}
+        self._epoch_counter = itertools.count(1)
+        for user in users:
+            self.add(user)
+
+    @staticmethod
+    def _fold(username: str) -> str:
+        return username.casefold()
+
+    def add(self, user: User):
+        """Add a user, ValueError if its id, username or email is taken."""
+        if user.id in self._by_id:
+            raise ValueError(f"User id {user.id} already exists")
+        if self._fold(user.username) in self._by_username:
+            raise ValueError(f"Username {user.username} already exists")
+        if user.email and user.email in self._by_email:
+            raise ValueError(f"Email {user.email} already exists")
+        self._index(user)
+        self._epochs[user.id] = next(self._epoch_counter)
+
+    def _index(self, user: User):
+        self._by_id[user.id] = user
+        self._by_username[self._fold(user.username)] = user
+        if user.email:
+            self._by_email[user.email] = user
+
+    def _unindex(self, user: User):
+        del self._by_id[user.id]
+        del self._by_username[self._fold(user.username)]
+        if user.email:
+            del self._by_email[user.email]
+
+    def update(self, user_id, **fields) -> Optional[User]:
+        """Change some fields of a user (role, is_active, ...) and return it."""
+        user = self.get(user_id)
+        if user is None:
+            return None
+        self._unindex(user)
+        for name, value in fields.items():
+            setattr(user, name, value)
+        if "role" in fields:
+            user.permissions = set()
+            for role in Role:
+                if role.value["name"] == user.role:
+                    user.permissions.update(role.value["permissions"])
+        self._index(user)
+        self._epochs[user.id] = next(self._epoch_counter)
+        return user
+
+    def remove(self, user_id) -> Optional[User]:
+        """Remove a user by id and return it."""
+        user = self.get(user_id)
+        if user is None:
+            return None
+        self._unindex(user)
+        del self._epochs[user.id]
+        return user
+
+    def epoch(self, user_id) -> Optional[int]:
+        """Current epoch of a user, None if it doesn't exist."""
+        try:
+            return self._epochs.get(int(user_id))
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, user_id) -> Optional[User]:
+        """Get a user by id, given as an int or a string (as stored in sessions)."""
+        try:
+            return self._by_id.get(int(user_id))
+        except (TypeError, ValueError):
+            return None
+
+    def get_by_username(self, username: Optional[str]) -> Optional[User]:
+        """Get a user by username, case-insensitively."""
+        if not username:
+            return None
+        return self._by_username.get(self._fold(username))
+
+    def get_by_email(self, email: Optional[str]) -> Optional[User]:
+        return self._by_email.get(email) if email else None
+
+    def next_id(self) -> int:
+        return max(self._by_id, default=0) + 1
+
+    def values(self) -> List[User]:
+        return list(self._by_id.values())
+
+    def __contains__(self, user_id) -> bool:
+        return self.get(user_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+# Users of the application; dummy_users above is only the initial data
+user_directory = UserDirectory(dummy_users.values())
+
 # Create dummy equipment
 dummy_equipment = [
     # AVS - CMS1
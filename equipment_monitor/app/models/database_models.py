@@ -1,11 +1,12 @@
 # app/models/database_models.py
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
 from bson import ObjectId
 from pydantic import BaseModel, Field
 from enum import Enum
-import bcrypt
 from ..database import db_client
+from ..pagination import encode_cursor, decode_cursor, keyset_filter, InvalidCursor
+from ..passwords import password_pool, hash_password, verify_password
 
 # Permission and Role definitions
 class Permission(Enum):
@@ -59,6 +60,10 @@ class PyObjectId(ObjectId):
     def __modify_schema__(cls, field_schema):
         field_schema.update(type="string")
 
+# Case-insensitive comparison of usernames ("Admin" == "admin"), used by the
+# unique username index so lookups by username can use it
+USERNAME_COLLATION = {"locale": "en", "strength": 2}
+
 # User Model
 class User:
     def __init__(
@@ -107,16 +112,24 @@ class User:
         return self.role == "admin"
 
     def _hash_password(self, password: str) -> str:
-        """Hash a password using bcrypt."""
+        """Hash a password using bcrypt (blocking, use set_password in request handlers)."""
         if not password:
             return None
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        return hash_password(password)
 
     def verify_password(self, password: str) -> bool:
-        """Verify a password against the hash."""
+        """Verify a password against the hash (blocking, use check_password in request handlers)."""
+        return verify_password(password, self.password_hash)
+
+    async def set_password(self, password: str):
+        """Hash a new password in the password pool, off the event loop."""
+        self.password_hash = await password_pool.hash(password) if password else None
+
+    async def check_password(self, password: str) -> bool:
+        """Verify a password against the hash in the password pool, off the event loop."""
         if not self.password_hash or not password:
             return False
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return await password_pool.verify(password, self.password_hash)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -186,8 +199,9 @@ class User:
 
     @classmethod
     def get_by_username(cls, username: str) -> Optional['User']:
-        result = cls.get_collection().find_one({"username": {"$regex": f"^{username}$", "$options": "i"}})
-        if result:
+        """Find a user by username, case-insensitively (served by the collated username index)."""
+        results = cls.get_collection().find({"username": username}).collation(USERNAME_COLLATION).limit(1)
+        for result in results:
             return cls.from_dict(result)
         return None
 
@@ -218,6 +232,11 @@ class User:
 
 # Equipment Model
 class Equipment:
+    # Fields shown in the dashboard equipment list
+    LIST_FIELDS = ("name", "ligne", "atelier", "status", "data_rate", "last_checked")
+    # Sortable fields; all are always set, so keyset comparisons never hit nulls
+    SORT_FIELDS = ("name", "status", "data_rate", "last_checked")
+
     def __init__(
         self,
         name: str,
@@ -363,6 +382,67 @@ class Equipment:
         results = cls.get_collection().find(query)
         return [cls.from_dict(equipment) for equipment in results]
 
+    @classmethod
+    def get_page(
+        cls,
+        ligne: str = None,
+        atelier: str = None,
+        status: str = None,
+        sort: str = "name",
+        descending: bool = False,
+        limit: int = 50,
+        cursor: str = None,
+        fields: Tuple[str, ...] = LIST_FIELDS,
+        active_only: bool = True
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of equipment documents using keyset pagination.
+
+        Filters use the (ligne, atelier, name), (status, name) and
+        (status, _id) compound indexes, the page is located from ``cursor``
+        (the last sort key and _id of the previous page) instead of skipping
+        documents, and only ``fields`` are returned.
+        Returns the documents and the cursor of the next page (None at the end).
+        """
+        if sort not in cls.SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {sort}")
+        direction = -1 if descending else 1
+        keys = [(sort, direction)] if sort == "name" else [(sort, direction), ("_id", direction)]
+
+        query = {}
+        if ligne:
+            query["ligne"] = ligne
+        if atelier:
+            query["atelier"] = atelier
+        if status:
+            query["status"] = status
+        if active_only:
+            query["is_active"] = True
+
+        if cursor:
+            position = decode_cursor(cursor)
+            if position.get("s") != sort or position.get("d") != direction:
+                raise InvalidCursor("Cursor does not match the requested sort")
+            query = {"$and": [query, keyset_filter(keys, position["k"])]}
+
+        projection = {field: 1 for field in fields}
+        if sort not in projection:
+            projection[sort] = 1
+        results = list(cls.get_collection().find(query, projection).sort(keys).limit(limit + 1))
+
+        next_cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            last = results[-1]
+            next_cursor = encode_cursor({
+                "s": sort,
+                "d": direction,
+                "k": [last[field] for field, _ in keys]
+            })
+
+        for document in results:
+            document["id"] = str(document.pop("_id"))
+        return results, next_cursor
+
     @classmethod
     def delete(cls, equipment_id: str) -> bool:
         result = cls.get_collection().delete_one({"_id": ObjectId(equipment_id)})
@@ -375,6 +455,11 @@ class Equipment:
 
 # Equipment History Model
 class EquipmentHistory:
+    # Numeric metrics that can be charted / exported
+    METRICS = ("data_rate", "response_time", "packet_loss")
+    # Fields that can be requested from a history page (timestamp is always included)
+    FIELDS = ("status", "data_rate", "response_time", "packet_loss", "snmp_data")
+
     def __init__(
         self,
         equipment_id: str,
@@ -452,6 +537,121 @@ class EquipmentHistory:
         ).sort("timestamp", -1).limit(limit)
         return [cls.from_dict(history) for history in results]
 
+    @classmethod
+    def get_page(
+        cls,
+        equipment_id: str,
+        start: datetime = None,
+        end: datetime = None,
+        fields: Tuple[str, ...] = METRICS,
+        limit: int = 1000,
+        cursor: str = None,
+        descending: bool = True
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of raw history samples of an equipment.
+
+        Pages are located by (timestamp, _id) keyset from ``cursor`` on the
+        (equipment_id, timestamp, _id) index, so a deep page costs the same
+        as the first. Only ``fields`` are returned, plus the timestamp.
+        Returns the samples and the cursor of the next page (None at the end).
+        """
+        unknown = set(fields) - set(cls.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        direction = -1 if descending else 1
+        keys = [("timestamp", direction), ("_id", direction)]
+
+        query = {"equipment_id": ObjectId(equipment_id)}
+        time_range = {}
+        if start:
+            time_range["$gte"] = start
+        if end:
+            time_range["$lt"] = end
+        if time_range:
+            query["timestamp"] = time_range
+
+        if cursor:
+            position = decode_cursor(cursor)
+            if position.get("e") != str(equipment_id) or position.get("d") != direction:
+                raise InvalidCursor("Cursor does not match the requested history")
+            query = {"$and": [query, keyset_filter(keys, position["k"])]}
+
+        projection = {"timestamp": 1, **{field: 1 for field in fields}}
+        results = list(cls.get_collection().find(query, projection).sort(keys).limit(limit + 1))
+
+        next_cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            last = results[-1]
+            next_cursor = encode_cursor({
+                "e": str(equipment_id),
+                "d": direction,
+                "k": [last["timestamp"], last["_id"]]
+            })
+
+        for sample in results:
+            del sample["_id"]
+        return results, next_cursor
+
+    @classmethod
+    def get_series(
+        cls,
+        equipment_id: str,
+        start: datetime,
+        end: datetime,
+        metric: str = "data_rate"
+    ) -> Tuple[List[datetime], List[float]]:
+        """Get the raw (timestamp, metric) samples of an equipment in [start, end)."""
+        if metric not in cls.METRICS:
+            raise ValueError(f"Unknown metric {metric}")
+        results = cls.get_collection().find(
+            {
+                "equipment_id": ObjectId(equipment_id),
+                "timestamp": {"$gte": start, "$lt": end},
+                metric: {"$ne": None}
+            },
+            {"_id": 0, "timestamp": 1, metric: 1}
+        ).sort("timestamp", 1).batch_size(10000)
+        timestamps = []
+        values = []
+        for sample in results:
+            timestamps.append(sample["timestamp"])
+            values.append(sample[metric])
+        return timestamps, values
+
+    @classmethod
+    def get_rollup(
+        cls,
+        equipment_id: str,
+        start: datetime,
+        end: datetime,
+        bucket_seconds: int,
+        metric: str = "data_rate"
+    ) -> List[Dict[str, Any]]:
+        """Aggregate samples in [start, end) into fixed time buckets.
+
+        Returns one document per non-empty bucket with the bucket start
+        (epoch ms) as ``t`` and the avg/min/max of ``metric``.
+        """
+        if metric not in cls.METRICS:
+            raise ValueError(f"Unknown metric {metric}")
+        bucket_ms = max(1, int(bucket_seconds * 1000))
+        epoch_ms = {"$toLong": "$timestamp"}
+        pipeline = [
+            {"$match": {
+                "equipment_id": ObjectId(equipment_id),
+                "timestamp": {"$gte": start, "$lt": end},
+                metric: {"$ne": None}
+            }},
+            {"$project": {"_id": 0, "t": {"$subtract": [epoch_ms, {"$mod": [epoch_ms, bucket_ms]}]}, "v": f"${metric}"}},
+            {"$group": {"_id": "$t", "avg": {"$avg": "$v"}, "min": {"$min": "$v"}, "max": {"$max": "$v"}}},
+            {"$sort": {"_id": 1}}
+        ]
+        return [
+            {"t": bucket["_id"], "avg": bucket["avg"], "min": bucket["min"], "max": bucket["max"]}
+            for bucket in cls.get_collection().aggregate(pipeline, allowDiskUse=True)
+        ]
+
     @classmethod
     def cleanup_old_records(cls, days: int = 30):
         """Remove records older than specified days."""
@@ -0,0 +1,37 @@
+# app/pagination.py
+from typing import Any, Dict, List, Tuple
+import base64
+from bson import json_util
+
+class InvalidCursor(ValueError):
+    """Raised when a continuation token can't be decoded or doesn't match the query."""
+
+def encode_cursor(data: Dict[str, Any]) -> str:
+    """Encode keyset position (may hold ObjectIds and datetimes) as an opaque token."""
+    raw = json_util.dumps(data, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """Decode a token made by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json_util.loads(raw)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {e}")
+    if not isinstance(data, dict):
+        raise InvalidCursor("Invalid cursor")
+    return data
+
+def keyset_filter(keys: List[Tuple[str, int]], values: List[Any]) -> Dict[str, Any]:
+    """Build the query matching documents after ``values`` in the ``keys`` sort order.
+
+    For keys [(a, 1), (_id, 1)] and values [x, y] this gives
+    ``{$or: [{a: {$gt: x}}, {a: x, _id: {$gt: y}}]}``, which an index on
+    (a, _id) can answer with a single range scan.
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(keys):
+        clause = {keys[j][0]: values[j] for j in range(i)}
+        clause[field] = {"$gt" if direction == 1 else "$lt": values[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
@@ -0,0 +1,171 @@
+# app/passwords.py
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import secrets
+import threading
+import time
+import logging
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+# Threads hashing/verifying passwords (bcrypt releases the GIL while hashing)
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+# Password operations queued or running before new ones are rejected
+PASSWORD_QUEUE_MAX = int(os.getenv("PASSWORD_QUEUE_MAX", "32"))
+# Login attempts per client IP: burst size and refill rate (per second)
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "10"))
+LOGIN_IP_RATE = float(os.getenv("LOGIN_IP_RATE", "0.5"))
+# Login attempts per username: burst size and refill rate (per second)
+LOGIN_USER_BURST = int(os.getenv("LOGIN_USER_BURST", "5"))
+LOGIN_USER_RATE = float(os.getenv("LOGIN_USER_RATE", "0.1"))
+
+class PasswordPoolBusy(RuntimeError):
+    """Raised when too many password operations are already queued."""
+
+class PasswordPool:
+    """Bounded thread pool running bcrypt off the event loop.
+
+    A bcrypt check takes ~250ms of CPU; running it on the loop would stall
+    every other request. At most ``max_pending`` operations are queued or
+    running, further ones fail fast with PasswordPoolBusy.
+    """
+
+    def __init__(self, workers: int = PASSWORD_WORKERS, max_pending: int = PASSWORD_QUEUE_MAX):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _submit(self, fn, *args) -> "asyncio.Future":
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordPoolBusy("Too many password operations in progress")
+            self.pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        future = asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with bcrypt."""
+        return await self._submit(hash_password, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        """Check a password against a bcrypt hash."""
+        return await self._submit(verify_password, password, password_hash)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+def hash_password(password: str) -> str:
+    """Hash a password with bcrypt (blocking)."""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """Check a password against a bcrypt hash (blocking)."""
+    if not password or not password_hash:
+        return False
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+def is_bcrypt_hash(value: Optional[str]) -> bool:
+    return bool(value) and value.startswith(("$2a$", "$2b$", "$2y$"))
+
+class TokenBuckets:
+    """Token buckets keyed by client IP, username, ...
+
+    Each key may spend ``burst`` attempts at once, refilled at ``rate`` per
+    second. Only the ``max_keys`` most recently used keys are remembered.
+    """
+
+    def __init__(self, burst: int, rate: float, max_keys: int = 100000):
+        self.burst = burst
+        self.rate = rate
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated)
+
+    def _tokens(self, key: str, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def available(self, key: str) -> bool:
+        return self._tokens(key, time.monotonic()) >= 1
+
+    def take(self, key: str) -> bool:
+        """Spend a token, False if the bucket is empty."""
+        now = time.monotonic()
+        tokens = self._tokens(key, now)
+        if tokens < 1:
+            return False
+        self._buckets[key] = (tokens - 1, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return True
+
+class LoginThrottle:
+    """Per-IP and per-username rate limit of login attempts."""
+
+    def __init__(self):
+        self.by_ip = TokenBuckets(LOGIN_IP_BURST, LOGIN_IP_RATE)
+        self.by_username = TokenBuckets(LOGIN_USER_BURST, LOGIN_USER_RATE)
+        self.rejected = {"ip": 0, "username": 0}
+
+    def allow(self, ip: Optional[str], username: str) -> bool:
+        """Take a token from both buckets, or none if either is empty."""
+        ip = ip or "unknown"
+        username = username.casefold()
+        if not self.by_ip.available(ip):
+            self.rejected["ip"] += 1
+            return False
+        if not self.by_username.available(username):
+            self.rejected["username"] += 1
+            return False
+        self.by_ip.take(ip)
+        self.by_username.take(username)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rejected": dict(self.rejected)}
+
+password_pool = PasswordPool()
+login_throttle = LoginThrottle()
+
+async def check_password(password: str, stored: Optional[str]) -> bool:
+    """Check a login password against a stored bcrypt hash (in the pool),
+    or against the plain password of the demo users (in constant time).
+    """
+    if not stored or not password:
+        return False
+    if is_bcrypt_hash(stored):
+        return await password_pool.verify(password, stored)
+    return secrets.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+
+def auth_stats() -> Dict[str, Any]:
+    """Password pool depth and rejected login attempts."""
+    return {"password_pool": password_pool.stats(), "login_throttle": login_throttle.stats()}
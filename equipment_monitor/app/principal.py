@@ -0,0 +1,90 @@
+# app/principal.py
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterable, Optional, Union
+from fastapi import HTTPException, Request, status
+
+from .models import Permission, Role, User, user_directory
+
+# One bit per permission
+PERMISSION_BITS: Dict[str, int] = {p.value: 1 << i for i, p in enumerate(Permission)}
+
+def permission_mask(permissions: Iterable[Union[Permission, str]]) -> int:
+    """Compile permissions (enum members or values) into a bitmask; unknown names are ignored."""
+    mask = 0
+    for permission in permissions:
+        value = permission.value if isinstance(permission, Permission) else permission
+        mask |= PERMISSION_BITS.get(value, 0)
+    return mask
+
+ROLE_MASKS: Dict[str, int] = {role.value["name"]: permission_mask(role.value["permissions"]) for role in Role}
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user of a session, with its permissions as a bitmask.
+
+    Cached on the session and trusted while ``epoch`` matches the user's
+    epoch in the user directory.
+    """
+    id: int
+    username: str
+    email: Optional[str]
+    role: str
+    mask: int
+    epoch: int
+
+    def can(self, required: int) -> bool:
+        return self.mask & required == required
+
+def principal_for(user: User) -> Principal:
+    return Principal(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        role=user.role,
+        mask=ROLE_MASKS.get(user.role, 0) | permission_mask(user.permissions),
+        epoch=user_directory.epoch(user.id)
+    )
+
+def session_principal(sessions, session_id: Optional[str], session: Dict[str, Any]) -> Optional[Principal]:
+    """Principal cached on a session, resolved again if the user changed since.
+
+    None if the user was deleted or deactivated.
+    """
+    cached = session.get("principal")
+    if cached is not None and cached["epoch"] == user_directory.epoch(cached["id"]):
+        return Principal(**cached)
+
+    user = user_directory.get(session.get("id"))
+    if user is None or not user.is_active:
+        return None
+    principal = principal_for(user)
+    if session_id:
+        sessions.update(session_id, principal=asdict(principal))
+    return principal
+
+def get_principal(request: Request) -> Optional[Principal]:
+    """Principal of the request, as set by the auth middleware or from the session cookie."""
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
+    session_id = request.cookies.get("session_id")
+    session = request.app.state.sessions.get(session_id)
+    if not session:
+        return None
+    principal = session_principal(request.app.state.sessions, session_id, session)
+    request.state.principal = principal
+    return principal
+
+def require_permission(*permissions: Permission):
+    """Route dependency checking the request's principal has all ``permissions``."""
+    required = permission_mask(permissions)
+
+    async def dependency(request: Request) -> Principal:
+        principal = get_principal(request)
+        if principal is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        if not principal.can(required):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+        return principal
+
+    return dependency
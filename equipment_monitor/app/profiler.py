@@ -0,0 +1,124 @@
+# app/profiler.py
+"""On-demand profiling of the running process.
+
+``sample()`` polls the stacks of chosen threads (the event loop, the monitor
+thread, ...) every few milliseconds and returns them as collapsed stacks,
+the input of flamegraph.pl / speedscope; its overhead is low enough for
+production. ``profile_loop()`` and ``profile_monitor()`` run cProfile in
+one thread and return a pstats dump (``python -m pstats profile.pstats``).
+"""
+from typing import Dict
+from collections import Counter
+import asyncio
+import cProfile
+import marshal
+import os
+import sys
+import threading
+import time
+
+# Longest capture allowed, in seconds
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a capture is already running."""
+
+_capture_lock = threading.Lock()
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    # Keep the path short but unambiguous: package/module.py
+    short = os.path.join(os.path.basename(os.path.dirname(filename)), os.path.basename(filename))
+    return f"{code.co_name} ({short}:{code.co_firstlineno})"
+
+def _collect(threads: Dict[int, str], seconds: float, interval: float) -> Counter:
+    """Sample the stacks of ``threads`` (ident -> name) for ``seconds``."""
+    stacks: Counter = Counter()
+    labels: Dict[object, str] = {}  # code object -> label, formatted once
+    own = threading.get_ident()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frames = sys._current_frames()
+        for ident, name in threads.items():
+            frame = frames.get(ident)
+            if frame is None or ident == own:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                parts.append(label)
+                frame = frame.f_back
+            parts.append(name)
+            parts.reverse()
+            stacks[";".join(parts)] += 1
+        del frames
+        time.sleep(interval)
+    return stacks
+
+async def sample(threads: Dict[int, str], seconds: float, interval: float = 0.005) -> str:
+    """Collapsed stacks (``frame;frame;frame count`` lines) of ``threads`` over ``seconds``.
+
+    The sampling runs in a worker thread, so the event loop keeps running
+    (and can be sampled) meanwhile.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being captured")
+    try:
+        stacks = await asyncio.get_running_loop().run_in_executor(
+            None, _collect, threads, min(seconds, PROFILE_MAX_SECONDS), interval
+        )
+    finally:
+        _capture_lock.release()
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+def _wait_unlocked(lock: threading.Lock):
+    with lock:
+        pass
+
+def _dump(profiler: cProfile.Profile) -> bytes:
+    """Same format as Profile.dump_stats(), without the file."""
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+async def profile_loop(seconds: float) -> bytes:
+    """cProfile everything that runs on the event loop for ``seconds``."""
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being captured")
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            await asyncio.sleep(min(seconds, PROFILE_MAX_SECONDS))
+        finally:
+            profiler.disable()
+    finally:
+        _capture_lock.release()
+    return _dump(profiler)
+
+async def profile_monitor(monitor, seconds: float) -> bytes:
+    """cProfile the device checks of the monitor thread for ``seconds``.
+
+    The monitor thread runs each check under the profiler while
+    ``monitor.profiler`` is set, holding ``monitor.profiling_lock``.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being captured")
+    profiler = cProfile.Profile()
+    try:
+        monitor.profiler = profiler
+        try:
+            await asyncio.sleep(min(seconds, PROFILE_MAX_SECONDS))
+        finally:
+            monitor.profiler = None
+            # Wait for a check in progress to finish with the profiler
+            await asyncio.get_running_loop().run_in_executor(None, _wait_unlocked, monitor.profiling_lock)
+    finally:
+        _capture_lock.release()
+    return _dump(profiler)
+
+def all_threads() -> Dict[int, str]:
+    """Every live thread (ident -> name)."""
+    return {thread.ident: thread.name for thread in threading.enumerate() if thread.ident is not None}
@@ -0,0 +1,75 @@
+# app/routers/device_routes.py
+from fastapi import APIRouter, Request, Response, HTTPException, status
+from typing import Optional
+
+from ..templates.monitoring.snapshot_store import get_status_source
+from ..serialization import json_response
+
+router = APIRouter(prefix="/api/devices")
+
+status_source = get_status_source()
+
+def snapshot_response(request: Request, body: bytes, body_gzip: bytes, etag: str) -> Response:
+    """Build a JSON response from pre-serialized bytes, honouring ETag and gzip."""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding"
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        body = body_gzip
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/status")
+async def get_devices_status(request: Request, since: Optional[int] = None):
+    """Current status of all monitored devices.
+
+    With ``?since=<version>`` only the devices that changed after that
+    version are returned, along with the names of removed devices.
+    """
+    snapshot = status_source.get_snapshot()
+    if since is None:
+        return snapshot_response(request, snapshot.body, snapshot.body_gzip, snapshot.etag)
+    
+    if since == snapshot.version:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": snapshot.etag})
+    body, body_gzip = snapshot.delta_body(since)
+    return snapshot_response(request, body, body_gzip, f'"{snapshot.version}-{since}"')
+
+@router.get("/summary")
+async def get_devices_summary(request: Request, ligne: Optional[str] = None, atelier: Optional[str] = None):
+    """Dashboard summary: totals, counts by status, data_rate/response_time
+    stats and worst devices, for the site or one ligne/atelier.
+
+    Without filters the whole site -> ligne -> atelier tree is returned.
+    Atelier names are only unique within a ligne, so ``atelier`` needs ``ligne``.
+    """
+    if atelier is not None and ligne is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="atelier requires ligne")
+    snapshot = status_source.get_snapshot()
+    etag = '"{}-{}-{}"'.format(snapshot.version, ligne or "", atelier or "")
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    if ligne is None and atelier is None:
+        return Response(content=snapshot.summary_body, media_type="application/json", headers={"ETag": etag})
+    
+    summary = snapshot.summary(ligne, atelier)
+    if summary is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No devices in this ligne/atelier")
+    return json_response(summary, headers={"ETag": etag})
+
+@router.get("/{device_name}/history")
+def get_device_history(device_name: str, limit: int = 20):
+    """Recent status history for a monitored device.
+
+    Runs in the threadpool: in external collector mode the history is read
+    from MongoDB with blocking queries.
+    """
+    if not status_source.has_device(device_name):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Device not found")
+    return json_response(status_source.get_device_history(device_name, limit))
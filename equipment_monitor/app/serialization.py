@@ -0,0 +1,76 @@
+# app/serialization.py
+from typing import Any, Dict, List, Optional, Sequence, Type
+from decimal import Decimal
+from enum import Enum
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+import orjson
+
+# orjson handles datetime, date, UUID, dataclasses and numpy arrays natively;
+# dict keys may be non-strings (e.g. equipment ids).
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# One compiled pydantic-core serializer per model class, for List[Model]
+_list_adapters: Dict[Type[BaseModel], TypeAdapter] = {}
+
+def _default(obj: Any) -> Any:
+    """Convert types orjson doesn't know about."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, "to_dict"):
+        # Mongo model objects (app.models.database_models)
+        data = obj.to_dict()
+        if getattr(obj, "id", None) is not None:
+            data["id"] = obj.id
+        return data
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps(data: Any) -> bytes:
+    """Serialize data to compact JSON bytes."""
+    return orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+
+def loads(data: bytes) -> Any:
+    """Parse JSON bytes."""
+    return orjson.loads(data)
+
+def get_list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """Get the (cached) TypeAdapter for a list of ``model``."""
+    adapter = _list_adapters.get(model)
+    if adapter is None:
+        adapter = _list_adapters[model] = TypeAdapter(List[model])
+    return adapter
+
+def dump_models(models: Sequence[BaseModel], model: Optional[Type[BaseModel]] = None) -> bytes:
+    """Serialize a list of pydantic models with the precompiled pydantic-core serializer."""
+    if not models:
+        return b"[]"
+    adapter = get_list_adapter(model or type(models[0]))
+    return adapter.dump_json(list(models))
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson.
+
+    Returning it directly from a route also skips FastAPI's
+    ``jsonable_encoder`` pass over the content.
+    """
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+def json_response(data: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> FastJSONResponse:
+    """Serialize data (plain dicts, Mongo models, ObjectIds, datetimes...) with orjson."""
+    return FastJSONResponse(content=data, status_code=status_code, headers=headers)
+
+def models_response(models: Sequence[BaseModel], status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> FastJSONResponse:
+    """Response for a list of pydantic models."""
+    return FastJSONResponse(content=dump_models(models), status_code=status_code, headers=headers)
@@ -0,0 +1,257 @@
+# app/sessions.py
+from typing import Dict, Any, Optional
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import os
+import secrets
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Session lifetime since last activity, matches the session cookie max_age
+SESSION_TTL = int(os.getenv("SESSION_TTL", "3600"))
+# Maximum number of sessions kept by the in-process store
+SESSION_MAX = int(os.getenv("SESSION_MAX", "50000"))
+# Seconds between two expiry sweeps of the in-process store
+SESSION_SWEEP_INTERVAL = int(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+
+class SessionStore(ABC):
+    """Session storage API used by the routes.
+
+    Sessions are dicts of user data keyed by an opaque session id. They
+    expire ``ttl`` seconds after their last access. Backends implement the
+    abstract methods.
+    """
+
+    def __init__(self, ttl: int = SESSION_TTL):
+        self.ttl = ttl
+
+    @staticmethod
+    def new_session_id() -> str:
+        return secrets.token_urlsafe(32)
+
+    def create(self, data: Dict[str, Any]) -> str:
+        """Store a new session and return its id."""
+        session_id = self.new_session_id()
+        self.set(session_id, data)
+        return session_id
+
+    @abstractmethod
+    def get(self, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Get a session and extend its expiry, None if missing or expired."""
+
+    @abstractmethod
+    def set(self, session_id: str, data: Dict[str, Any]):
+        """Create or replace a session."""
+
+    @abstractmethod
+    def update(self, session_id: str, **fields):
+        """Update some fields of an existing session."""
+
+    @abstractmethod
+    def delete(self, session_id: Optional[str]):
+        """Remove a session."""
+
+    @abstractmethod
+    def find_by_email(self, email: str) -> Optional[str]:
+        """Id of a live session for this email, if any."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored sessions."""
+
+    def __contains__(self, session_id: Optional[str]) -> bool:
+        return self.get(session_id) is not None
+
+    def start(self):
+        """Start background maintenance, if the backend needs any."""
+
+    def stop(self):
+        """Stop background maintenance."""
+
+class MemorySessionStore(SessionStore):
+    """In-process session store.
+
+    Sessions are kept in least-recently-used order, so the expiry sweeper
+    only looks at the expired ones at the front and the oldest session is
+    evicted when ``max_sessions`` is reached. Only suitable for a single
+    worker process.
+    """
+
+    def __init__(self, ttl: int = SESSION_TTL, max_sessions: int = SESSION_MAX,
+                 sweep_interval: int = SESSION_SWEEP_INTERVAL):
+        super().__init__(ttl)
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._expires: Dict[str, datetime] = {}
+        self._by_email: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._sweeper = None
+
+    def get(self, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not session_id:
+            return None
+        with self._lock:
+            data = self._sessions.get(session_id)
+            if data is None:
+                return None
+            now = datetime.now()
+            if self._expires[session_id] <= now:
+                self._remove(session_id)
+                return None
+            self._expires[session_id] = now + timedelta(seconds=self.ttl)
+            self._sessions.move_to_end(session_id)
+            return data
+
+    def set(self, session_id: str, data: Dict[str, Any]):
+        with self._lock:
+            if session_id in self._sessions:
+                self._remove(session_id)
+            while len(self._sessions) >= self.max_sessions:
+                oldest = next(iter(self._sessions))
+                logger.warning("Session store full, evicting session %s...", oldest[:8])
+                self._remove(oldest)
+            self._sessions[session_id] = data
+            self._expires[session_id] = datetime.now() + timedelta(seconds=self.ttl)
+            if data.get("email"):
+                self._by_email[data["email"]] = session_id
+
+    def update(self, session_id: str, **fields):
+        with self._lock:
+            data = self._sessions.get(session_id)
+            if data is not None:
+                data.update(fields)
+
+    def delete(self, session_id: Optional[str]):
+        with self._lock:
+            self._remove(session_id)
+
+    def _remove(self, session_id: Optional[str]):
+        data = self._sessions.pop(session_id, None)
+        self._expires.pop(session_id, None)
+        if data and self._by_email.get(data.get("email")) == session_id:
+            del self._by_email[data["email"]]
+
+    def find_by_email(self, email: str) -> Optional[str]:
+        session_id = self._by_email.get(email)
+        return session_id if self.get(session_id) is not None else None
+
+    def count(self) -> int:
+        return len(self._sessions)
+
+    def sweep(self) -> int:
+        """Remove expired sessions and return how many were removed."""
+        removed = 0
+        now = datetime.now()
+        with self._lock:
+            # Least recently used first: stop at the first live session
+            while self._sessions:
+                session_id = next(iter(self._sessions))
+                if self._expires[session_id] > now:
+                    break
+                self._remove(session_id)
+                removed += 1
+        if removed:
+            logger.info("Expired %s sessions", removed)
+        return removed
+
+    def _sweep_loop(self):
+        while not self._stop_event.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error("Error sweeping sessions: %s", e)
+
+    def start(self):
+        if self._sweeper is not None:
+            return
+        self._stop_event.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+
+class MongoSessionStore(SessionStore):
+    """Session store shared by all worker processes through MongoDB.
+
+    Sessions live in the ``sessions`` collection keyed by session id; a TTL
+    index on ``expires_at`` lets the server delete expired sessions. To avoid
+    a write on every request the expiry is only pushed back once a tenth of
+    the TTL has elapsed.
+    """
+
+    def __init__(self, ttl: int = SESSION_TTL, collection_name: str = "sessions"):
+        super().__init__(ttl)
+        self.collection_name = collection_name
+        self._refresh_after = timedelta(seconds=max(1, ttl // 10))
+
+    @property
+    def collection(self):
+        from .database import get_db
+        return get_db()[self.collection_name]
+
+    def ensure_indexes(self):
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+        self.collection.create_index("data.email", sparse=True)
+
+    def get(self, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not session_id:
+            return None
+        now = datetime.utcnow()
+        document = self.collection.find_one({"_id": session_id, "expires_at": {"$gt": now}})
+        if document is None:
+            return None
+        expires_at = now + timedelta(seconds=self.ttl)
+        if expires_at - document["expires_at"] >= self._refresh_after:
+            self.collection.update_one({"_id": session_id}, {"$set": {"expires_at": expires_at}})
+        return document["data"]
+
+    def set(self, session_id: str, data: Dict[str, Any]):
+        self.collection.replace_one(
+            {"_id": session_id},
+            {"data": data, "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)},
+            upsert=True
+        )
+
+    def update(self, session_id: str, **fields):
+        self.collection.update_one(
+            {"_id": session_id},
+            {"$set": {f"data.{key}": value for key, value in fields.items()}}
+        )
+
+    def delete(self, session_id: Optional[str]):
+        if session_id:
+            self.collection.delete_one({"_id": session_id})
+
+    def find_by_email(self, email: str) -> Optional[str]:
+        document = self.collection.find_one(
+            {"data.email": email, "expires_at": {"$gt": datetime.utcnow()}},
+            {"_id": 1}
+        )
+        return document["_id"] if document else None
+
+    def count(self) -> int:
+        return self.collection.count_documents({"expires_at": {"$gt": datetime.utcnow()}})
+
+    def start(self):
+        try:
+            self.ensure_indexes()
+        except Exception as e:
+            logger.error("Could not create session indexes: %s", e)
+
+def create_session_store() -> SessionStore:
+    """Create the session store selected by the SESSION_BACKEND env var (memory or mongo)."""
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    if backend == "mongo":
+        return MongoSessionStore()
+    if backend != "memory":
+        logger.warning("Unknown SESSION_BACKEND %s, using in-process sessions", backend)
+    return MemorySessionStore()
@@ -0,0 +1,163 @@
+# app/templates/monitoring/anomaly.py
+from typing import Dict, List, Optional, Sequence
+import os
+import threading
+
+import numpy as np
+
+# Metrics watched, in the column order of the arrays
+METRICS = ('data_rate', 'response_time', 'packet_loss')
+
+# Smoothing of the per-device baselines (EWMA mean and variance): about the
+# last 1 / ANOMALY_ALPHA samples count
+ANOMALY_ALPHA = float(os.getenv("ANOMALY_ALPHA", "0.05"))
+# A metric turns anomalous after ANOMALY_ENTER_CYCLES cycles in a row over
+# ANOMALY_Z_ENTER standard deviations, and back to normal once under ANOMALY_Z_EXIT
+ANOMALY_Z_ENTER = float(os.getenv("ANOMALY_Z_ENTER", "4"))
+ANOMALY_Z_EXIT = float(os.getenv("ANOMALY_Z_EXIT", "2"))
+ANOMALY_ENTER_CYCLES = int(os.getenv("ANOMALY_ENTER_CYCLES", "3"))
+# Samples of a device before it can be flagged (baseline warm-up)
+ANOMALY_MIN_SAMPLES = int(os.getenv("ANOMALY_MIN_SAMPLES", "30"))
+
+# Deviations smaller than this are never anomalous, however stable the
+# baseline (Mbps, ms, %)
+MIN_STD = np.array([1.0, 2.0, 1.0])
+# True: only increases are anomalous, False: both directions (traffic that stops
+# is as suspicious as a burst)
+UPWARD_ONLY = np.array([False, True, True])
+# Samples over the entry threshold (and all samples while anomalous) still
+# update the baseline, this much slower: outliers don't inflate the variance
+# and hide themselves, but a lasting change of level is eventually accepted
+# as the new normal
+ANOMALOUS_ALPHA_FACTOR = 0.1
+
+class AnomalyDetector:
+    """Streaming EWMA z-score detectors over the metrics of the whole fleet.
+
+    Each device has a row in the baseline arrays (EWMA mean and variance per
+    metric); ``update`` scores the latest samples of all devices and updates
+    their baselines in a few NumPy operations, whatever the fleet size.
+    Hysteresis (entry after several cycles over a high z-score, exit under a
+    lower one) keeps noisy devices from flapping.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self._lock = threading.Lock()
+        self.rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._size = 0
+        self._names: List[str] = []  # names of the last update and their rows,
+        self._name_rows = slice(0, 0)  # reused while the fleet doesn't change
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        m = len(METRICS)
+        arrays = {
+            'mean': np.zeros((capacity, m)),
+            'var': np.zeros((capacity, m)),
+            'count': np.zeros((capacity, m), dtype=np.int64),
+            'streak': np.zeros((capacity, m), dtype=np.int32),
+            'flags': np.zeros((capacity, m), dtype=bool),
+            'score': np.zeros((capacity, m))
+        }
+        for name, array in arrays.items():
+            old = getattr(self, name, None)
+            if old is not None:
+                array[:len(old)] = old
+            setattr(self, name, array)
+
+    def _row(self, name: str) -> int:
+        row = self.rows.get(name)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                if self._size == len(self.mean):
+                    self._allocate(2 * len(self.mean))
+                row = self._size
+                self._size += 1
+            self.rows[name] = row
+        return row
+
+    def _reset(self, rows):
+        for array in (self.mean, self.var, self.count, self.streak, self.flags, self.score):
+            array[rows] = 0
+
+    def remove(self, name: str):
+        """Forget the baseline of a device."""
+        with self._lock:
+            row = self.rows.pop(name, None)
+            if row is not None:
+                self._names = []
+                self._reset(row)
+                self._free.append(row)
+
+    def update(self, names: Sequence[str], values: np.ndarray) -> Dict[str, List[str]]:
+        """Score one sample per device and update the baselines.
+
+        ``values`` has one row per name and one column per metric of
+        ``METRICS``; NaN marks a missing sample (device unreachable), which
+        clears the device's flags without touching its baseline. Returns the
+        devices whose anomalous metrics changed, with the metrics now
+        anomalous (empty once back to normal).
+        """
+        with self._lock:
+            if names != self._names:
+                self._names = list(names)
+                rows = np.fromiter((self._row(name) for name in names), dtype=np.intp, count=len(names))
+                # Usually rows 0..n-1 in order: a slice avoids copying in and out of the arrays
+                self._name_rows = slice(0, len(rows)) if np.array_equal(rows, np.arange(len(rows))) else rows
+            rows = self._name_rows
+            x = np.asarray(values, dtype=float).reshape(len(names), len(METRICS))
+            valid = ~np.isnan(x)
+            mean, var, count = self.mean[rows], self.var[rows], self.count[rows]
+            was_flagged = self.flags[rows].copy()
+
+            std = np.maximum(np.sqrt(var), MIN_STD)
+            z = np.where(valid, (x - mean) / std, 0.0)
+            score = np.where(UPWARD_ONLY, z, np.abs(z))
+            ready = valid & (count >= ANOMALY_MIN_SAMPLES)
+
+            streak = np.where(ready & (score > ANOMALY_Z_ENTER), self.streak[rows] + 1, 0)
+            flags = np.where(was_flagged, ready & (score >= ANOMALY_Z_EXIT), streak >= ANOMALY_ENTER_CYCLES)
+
+            # EWMA mean/variance; the first sample of a device is its baseline
+            outlier = flags | (streak > 0)
+            alpha = np.where(outlier, ANOMALY_ALPHA * ANOMALOUS_ALPHA_FACTOR, ANOMALY_ALPHA)
+            alpha = np.where(count == 0, 1.0, alpha)
+            diff = np.where(valid, x - mean, 0.0)
+            increment = alpha * diff
+            self.mean[rows] = mean + increment
+            self.var[rows] = np.where(valid, (1 - alpha) * (var + diff * increment), var)
+            self.count[rows] = count + valid
+            self.streak[rows] = streak
+            self.flags[rows] = flags
+            self.score[rows] = np.where(valid, score, 0.0)
+
+            changed = np.flatnonzero((flags != was_flagged).any(axis=1))
+            return {
+                names[i]: [METRICS[j] for j in np.flatnonzero(flags[i])]
+                for i in changed.tolist()
+            }
+
+    def baseline(self, name: str) -> Optional[Dict[str, Dict[str, float]]]:
+        """Baseline, last z-score and state of each metric of a device."""
+        with self._lock:
+            row = self.rows.get(name)
+            if row is None:
+                return None
+            return {
+                metric: {
+                    'mean': round(float(self.mean[row, j]), 3),
+                    'std': round(float(np.sqrt(self.var[row, j])), 3),
+                    'samples': int(self.count[row, j]),
+                    'z': round(float(self.score[row, j]), 2),
+                    'anomalous': bool(self.flags[row, j])
+                }
+                for j, metric in enumerate(METRICS)
+            }
+
+    def anomalous_count(self) -> int:
+        """Devices with at least one anomalous metric."""
+        with self._lock:
+            return int(self.flags[:self._size].any(axis=1).sum())
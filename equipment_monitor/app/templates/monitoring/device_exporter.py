@@ -0,0 +1,135 @@
+# app/templates/monitoring/device_exporter.py
+from typing import Dict, List, Optional, Tuple
+import gzip
+import threading
+
+from ...metrics import escape_label_value, format_value
+from .monitor import StatusSnapshot
+
+# (name, help, type) of the exported families, in output order
+FAMILIES = (
+    ('device_data_rate_mbps', 'Data rate of the device in Mbps', 'gauge'),
+    ('device_response_time_ms', 'Average ping response time in ms', 'gauge'),
+    ('device_packet_loss_percent', 'Ping packet loss in percent', 'gauge'),
+    ('device_status', 'Current status of the device (1 for the status label)', 'gauge'),
+    ('device_interface_in_bps', 'Inbound traffic of an interface in bits per second', 'gauge'),
+    ('device_interface_out_bps', 'Outbound traffic of an interface in bits per second', 'gauge'),
+)
+_HEADERS = tuple(f'# HELP {name} {doc}\n# TYPE {name} {kind}\n'.encode('utf-8') for name, doc, kind in FAMILIES)
+
+LabelKey = Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]
+
+class DeviceMetricsExporter:
+    """Prometheus exposition of the devices of the status snapshots.
+
+    Each device's samples are rendered once per change (per device version)
+    as bytes per metric family, with its label string preformatted. Devices
+    are grouped in blocks of ``block_size`` whose family chunks are joined
+    ahead of time, so a new snapshot only re-renders the devices that
+    changed and re-joins their blocks; the body is built once per snapshot
+    version and shared by all scrapes.
+    """
+
+    def __init__(self, block_size: int = 256):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._body = b''
+        self._body_gzip: Optional[bytes] = None
+        self._order: List[str] = []          # device names, in snapshot order
+        self._position: Dict[str, int] = {}  # device name -> index in _order
+        self._chunks: Dict[str, Tuple[bytes, ...]] = {}      # device -> bytes per family
+        self._labels: Dict[str, Tuple[LabelKey, str]] = {}  # device -> (label values, label string)
+        self._blocks: List[Tuple[bytes, ...]] = []           # block -> joined bytes per family
+
+    def _label_string(self, record) -> str:
+        key = (record['name'], record.get('ligne'), record.get('atelier'), record.get('equipment_type'))
+        cached = self._labels.get(record['name'])
+        if cached is None or cached[0] != key:
+            labels = ','.join(
+                f'{label}="{escape_label_value(value if value is not None else "")}"'
+                for label, value in zip(('device', 'ligne', 'atelier', 'equipment_type'), key)
+            )
+            cached = self._labels[record['name']] = (key, labels)
+        return cached[1]
+
+    def _render_device(self, record) -> Tuple[bytes, ...]:
+        labels = self._label_string(record)
+        lines: List[str] = []
+        for field, (name, _, _) in zip(('data_rate', 'response_time', 'packet_loss'), FAMILIES):
+            value = record.get(field)
+            lines.append(f'{name}{{{labels}}} {format_value(value)}\n' if value is not None else '')
+        lines.append(f'device_status{{{labels},status="{escape_label_value(record["status"])}"}} 1\n')
+        in_lines = []
+        out_lines = []
+        for if_index, rates in sorted((record.get('interfaces') or {}).items()):
+            if_labels = f'{labels},interface="{escape_label_value(if_index)}"'
+            in_lines.append(f'device_interface_in_bps{{{if_labels}}} {format_value(rates["in_bps"])}\n')
+            out_lines.append(f'device_interface_out_bps{{{if_labels}}} {format_value(rates["out_bps"])}\n')
+        lines.append(''.join(in_lines))
+        lines.append(''.join(out_lines))
+        return tuple(line.encode('utf-8') for line in lines)
+
+    def _join_block(self, block: int) -> Tuple[bytes, ...]:
+        names = self._order[block * self.block_size:(block + 1) * self.block_size]
+        return tuple(b''.join(family) for family in zip(*(self._chunks[name] for name in names)))
+
+    def _rebuild(self, snapshot: StatusSnapshot):
+        """Render every device again (first snapshot, devices added or removed)."""
+        self._order = [record['name'] for record in snapshot.devices]
+        self._position = {name: i for i, name in enumerate(self._order)}
+        self._chunks = {record['name']: self._render_device(record) for record in snapshot.devices}
+        for name in set(self._labels) - set(self._position):
+            del self._labels[name]
+        self._blocks = [self._join_block(block)
+                        for block in range((len(self._order) + self.block_size - 1) // self.block_size)]
+
+    def _update(self, snapshot: StatusSnapshot) -> bool:
+        """Re-render the devices changed since the cached version, False if
+        the set of devices changed and everything must be rebuilt.
+        """
+        since = self._version
+        if since is None or since > snapshot.version or since < snapshot.oldest_since \
+                or len(snapshot.devices) != len(self._order):
+            return False
+        if any(v > since for v in snapshot.removed.values()):
+            return False
+        changed = [record for record in snapshot.devices if snapshot.device_versions[record['name']] > since]
+        if any(record['name'] not in self._position for record in changed):
+            return False
+        dirty = set()
+        for record in changed:
+            self._chunks[record['name']] = self._render_device(record)
+            dirty.add(self._position[record['name']] // self.block_size)
+        for block in dirty:
+            self._blocks[block] = self._join_block(block)
+        return True
+
+    def render(self, snapshot: StatusSnapshot) -> Tuple[bytes, Optional[bytes]]:
+        """Exposition body for a snapshot, and its gzip version once computed."""
+        with self._lock:
+            if snapshot.version == self._version:
+                return self._body, self._body_gzip
+            if not self._update(snapshot):
+                self._rebuild(snapshot)
+
+            parts = []
+            for i, header in enumerate(_HEADERS):
+                parts.append(header)
+                parts.extend(block[i] for block in self._blocks)
+            self._body = b''.join(parts)
+            self._body_gzip = None
+            self._version = snapshot.version
+            return self._body, None
+
+    def render_gzip(self, snapshot: StatusSnapshot) -> bytes:
+        """Gzip body for a snapshot, compressed once per version."""
+        body, body_gzip = self.render(snapshot)
+        if body_gzip is None:
+            body_gzip = gzip.compress(body, compresslevel=5)
+            with self._lock:
+                if self._version == snapshot.version:
+                    self._body_gzip = body_gzip
+        return body_gzip
+
+exporter = DeviceMetricsExporter()
@@ -0,0 +1,128 @@
+# app/templates/monitoring/device_index.py
+from typing import Dict, List, Optional, Any, Tuple
+from collections import Counter
+import threading
+
+class IndexNode:
+    """A node of the ligne -> atelier -> device tree with live status counts."""
+    __slots__ = ('devices', 'counts', 'children')
+
+    def __init__(self):
+        self.devices: Dict[str, None] = {}  # insertion-ordered set of device names
+        self.counts: Counter = Counter()    # status -> number of devices
+        self.children: Dict[str, 'IndexNode'] = {}
+
+    def summary(self) -> Dict[str, Any]:
+        return {'total': len(self.devices), 'counts': dict(self.counts)}
+
+class DeviceIndex:
+    """Hierarchical secondary index of monitored devices (site -> ligne -> atelier).
+
+    Each node keeps the names of the devices below it and their counts by
+    status, updated on add/remove/status change, so lookups and facet
+    counts cost O(result) instead of a scan of the whole fleet.
+    """
+
+    def __init__(self):
+        self.root = IndexNode()
+        self._entries: Dict[str, Tuple[Optional[str], Optional[str], str]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, ligne: Optional[str], atelier: Optional[str], create: bool = False) -> List[IndexNode]:
+        """Nodes from the root down to (ligne, atelier), as far as they exist."""
+        nodes = [self.root]
+        for key in (ligne, atelier):
+            if key is None:
+                break
+            node = nodes[-1].children.get(key)
+            if node is None:
+                if not create:
+                    break
+                node = nodes[-1].children[key] = IndexNode()
+            nodes.append(node)
+        return nodes
+
+    def add(self, name: str, ligne: Optional[str], atelier: Optional[str], status: str):
+        """Add (or move) a device."""
+        with self._lock:
+            if name in self._entries:
+                self._remove(name)
+            self._entries[name] = (ligne, atelier, status)
+            for node in self._path(ligne, atelier, create=True):
+                node.devices[name] = None
+                node.counts[status] += 1
+
+    def remove(self, name: str):
+        """Remove a device."""
+        with self._lock:
+            self._remove(name)
+
+    def _remove(self, name: str):
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return
+        ligne, atelier, status = entry
+        path = self._path(ligne, atelier)
+        for node in path:
+            node.devices.pop(name, None)
+            node.counts[status] -= 1
+            if node.counts[status] <= 0:
+                del node.counts[status]
+        # Drop nodes that became empty, deepest first
+        for parent, key, node in reversed(list(zip(path, (ligne, atelier), path[1:]))):
+            if not node.devices:
+                del parent.children[key]
+
+    def update_status(self, name: str, status: str):
+        """Move a device's count to its new status."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry[2] == status:
+                return
+            ligne, atelier, old_status = entry
+            self._entries[name] = (ligne, atelier, status)
+            for node in self._path(ligne, atelier):
+                node.counts[old_status] -= 1
+                if node.counts[old_status] <= 0:
+                    del node.counts[old_status]
+                node.counts[status] += 1
+
+    def find(self, ligne: Optional[str] = None, atelier: Optional[str] = None) -> List[str]:
+        """Names of the devices in a ligne and/or atelier."""
+        with self._lock:
+            if ligne is not None:
+                path = self._path(ligne, atelier)
+                if len(path) < (3 if atelier is not None else 2):
+                    return []
+                return list(path[-1].devices)
+            if atelier is not None:
+                # Atelier without ligne: union over the lignes that have it
+                names = []
+                for ligne_node in self.root.children.values():
+                    atelier_node = ligne_node.children.get(atelier)
+                    if atelier_node is not None:
+                        names.extend(atelier_node.devices)
+                return names
+            return list(self.root.devices)
+
+    def counts(self, ligne: Optional[str] = None, atelier: Optional[str] = None) -> Dict[str, Any]:
+        """Total and counts by status for a node."""
+        with self._lock:
+            path = self._path(ligne, atelier)
+            if len(path) < 1 + (ligne is not None) + (atelier is not None and ligne is not None):
+                return {'total': 0, 'counts': {}}
+            return path[-1].summary()
+
+    def facets(self) -> Dict[str, Any]:
+        """Filter options with live counts, in the same shape as LIGNES/ATELIERS."""
+        with self._lock:
+            lignes = []
+            ateliers = {}
+            for ligne in sorted(self.root.children):
+                ligne_node = self.root.children[ligne]
+                lignes.append({'value': ligne, 'label': ligne, **ligne_node.summary()})
+                ateliers[ligne] = [
+                    {'value': atelier, 'label': atelier, **ligne_node.children[atelier].summary()}
+                    for atelier in sorted(ligne_node.children)
+                ]
+            return {'lignes': lignes, 'ateliers': ateliers, **self.root.summary()}
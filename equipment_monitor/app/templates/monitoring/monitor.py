@@ -1,16 +1,25 @@
 # app/templates/monitoring/monitor.py
 import asyncio
+import os
 import subprocess
 import time
 import socket
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import logging
-from dataclasses import dataclass
-from pysnmp.hlapi import *
+from dataclasses import dataclass, field
 import threading
 import queue
-import json
+import gzip
+
+import numpy as np
+
+from ...serialization import dumps
+from ...metrics import Counter, Gauge, Histogram
+from .anomaly import AnomalyDetector
+from .device_index import DeviceIndex
+from .phase_timing import DeviceTimer, PhaseTimings
+from .summary import GroupKey, GroupSummaries, summarize, summary_tree
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -28,14 +37,177 @@ class DeviceStatus:
     data_rate: Optional[float] = None
     ligne: Optional[str] = None
     atelier: Optional[str] = None
+    equipment_type: Optional[str] = None
+    interfaces: Optional[Dict[str, Dict[str, float]]] = None  # ifIndex -> {'in_bps', 'out_bps'}
+    anomalies: Optional[List[str]] = None  # metrics out of the device's baseline (status 'issue')
+
+def counter_delta(current: int, previous: int, bits: int = 32) -> int:
+    """Increase of an SNMP counter between two reads, allowing for one wrap."""
+    if current >= previous:
+        return current - previous
+    return current + (1 << bits) - previous
+
+# Poll loop metrics
+CYCLE_SECONDS = Histogram("monitor_cycle_duration_seconds", "Duration of a poll cycle over all devices",
+                          buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600))
+CYCLE_OVERRUNS = Counter("monitor_cycle_overruns_total", "Poll cycles that took longer than the monitor interval")
+PROBE_SECONDS = Histogram("monitor_probe_duration_seconds", "Latency of a device probe", ("probe",),
+                          buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20))
+ICMP_ERRORS = Counter("monitor_icmp_errors_total", "Pings that didn't get an answer", ("result",))
+SNMP_ERRORS = Counter("monitor_snmp_errors_total", "Failed SNMP requests", ("kind",))
+ANOMALIES = Counter("monitor_anomalies_total", "Metrics of a device that turned anomalous", ("metric",))
+_ICMP_PROBE = PROBE_SECONDS.labels("icmp")
+_SNMP_PROBE = PROBE_SECONDS.labels("snmp")
+
+# Fields of a status record that don't count as a change on their own
+VOLATILE_FIELDS = ('last_checked',)
+# Versions a removed device is remembered for; clients asking for a delta
+# from before a forgotten removal get the full snapshot instead
+SNAPSHOT_TOMBSTONE_VERSIONS = int(os.getenv("SNAPSHOT_TOMBSTONE_VERSIONS", "1000"))
+
+@dataclass(frozen=True)
+class StatusSnapshot:
+    """Immutable, pre-serialized view of all device statuses for one poll cycle.
+
+    Snapshots are only ever replaced, never mutated, so request handlers can
+    read ``monitor.snapshot`` without taking a lock. The records in
+    ``devices`` must be treated as read-only.
+    """
+    version: int
+    created_at: datetime
+    devices: Tuple[Dict[str, Any], ...]
+    by_name: Dict[str, Dict[str, Any]]
+    device_versions: Dict[str, int]  # device name -> version it last changed in
+    removed: Dict[str, int]          # removed device name -> version it was removed in
+    body: bytes
+    body_gzip: bytes
+    summaries: Dict[GroupKey, Dict[str, Any]]  # () site, (ligne,), (ligne, atelier)
+    summary_body: bytes
+    oldest_since: int = 0  # deltas from an older version would miss pruned removals
+    _delta_cache: Dict[int, Tuple[bytes, bytes]] = field(default_factory=dict, repr=False, compare=False)
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+    def delta(self, since: int) -> Dict[str, Any]:
+        """Get the devices that changed or were removed after version ``since``."""
+        if since > self.version or since < 0 or since < self.oldest_since:
+            # Version from another monitor instance, or too old to know what was removed since: send everything
+            return {'version': self.version, 'since': since, 'full': True,
+                    'devices': list(self.devices), 'removed': []}
+        return {
+            'version': self.version,
+            'since': since,
+            'full': False,
+            'devices': [d for d in self.devices if self.device_versions[d['name']] > since],
+            'removed': [name for name, v in self.removed.items() if v > since]
+        }
+
+    def summary(self, ligne: str = None, atelier: str = None) -> Optional[Dict[str, Any]]:
+        """Summary of the site, a ligne or an atelier (None if there is no such group).
+
+        An atelier is only identified within its ligne: ``atelier`` without
+        ``ligne`` matches no group.
+        """
+        if atelier is not None and ligne is None:
+            return None
+        key = tuple(k for k in (ligne, atelier) if k is not None)
+        summary = self.summaries.get(key)
+        if summary is None:
+            return None
+        return {'version': self.version, 'ligne': ligne, 'atelier': atelier, **summary}
+    
+    def delta_body(self, since: int) -> Tuple[bytes, bytes]:
+        """Serialized (plain, gzip) delta, cached since most pollers ask for the same one."""
+        cached = self._delta_cache.get(since)
+        if cached is None:
+            body = serialize_status(self.delta(since))
+            cached = (body, gzip.compress(body, compresslevel=5))
+            if len(self._delta_cache) < 32:
+                self._delta_cache[since] = cached
+        return cached
 
-class NetworkMonitor:
+def serialize_status(data: Any) -> bytes:
+    """Serialize status data to compact JSON bytes."""
+    return dumps(data)
+
+def build_snapshot(
+    version: int,
+    records: List[Dict[str, Any]],
+    device_versions: Dict[str, int],
+    removed: Dict[str, int],
+    summaries: Dict[GroupKey, Dict[str, Any]],
+    body: bytes = None,
+    body_gzip: bytes = None,
+    created_at: datetime = None,
+    oldest_since: int = 0
+) -> StatusSnapshot:
+    """Build a snapshot, serializing whatever wasn't given already serialized."""
+    if body is None:
+        body = serialize_status(records)
+    if body_gzip is None:
+        body_gzip = gzip.compress(body, compresslevel=5)
+    return StatusSnapshot(
+        version=version,
+        created_at=created_at or datetime.now(),
+        devices=tuple(records),
+        by_name={record['name']: record for record in records},
+        device_versions=device_versions,
+        removed=removed,
+        body=body,
+        body_gzip=body_gzip,
+        summaries=summaries,
+        summary_body=serialize_status({'version': version, **summary_tree(summaries)}),
+        oldest_since=oldest_since
+    )
+
+def _empty_snapshot(version: int) -> StatusSnapshot:
+    return build_snapshot(version, [], {}, {}, {(): summarize([])})
+
+class StatusReader:
+    """Read side of the device statuses, served from ``snapshot`` and ``index``.
+
+    Shared by the monitor and by the web workers' reader of the statuses
+    published by a standalone collector.
+    """
+    snapshot: StatusSnapshot
+    index: DeviceIndex
+
+    def get_snapshot(self) -> StatusSnapshot:
+        """Get the latest published status snapshot."""
+        return self.snapshot
+
+    def has_device(self, name: str) -> bool:
+        """Whether a device is in the latest snapshot."""
+        return name in self.snapshot.by_name
+
+    def get_status(self, ligne: str = None, atelier: str = None) -> List[Dict[str, Any]]:
+        """Get current status of all devices, or those of a ligne/atelier, from the latest snapshot."""
+        snapshot = self.snapshot
+        if ligne is None and atelier is None:
+            return list(snapshot.devices)
+        by_name = snapshot.by_name
+        return [by_name[name] for name in self.index.find(ligne, atelier) if name in by_name]
+
+    def get_filters(self) -> Dict[str, Any]:
+        """Get the ligne/atelier filter options with device counts by status."""
+        return self.index.facets()
+
+class NetworkMonitor(StatusReader):
     def __init__(self):
         self.devices: Dict[str, DeviceStatus] = {}
         self.is_running = False
         self.monitor_thread = None
         self.status_history: Dict[str, List[Dict]] = {}
+        self._octets: Dict[str, Tuple[float, int, int]] = {}  # device -> (time, in octets, out octets)
         self.alert_callbacks = []
+        self.cycle_callbacks = []
+        self.index = DeviceIndex()  # ligne -> atelier -> device, with status counts
+        self.timings = PhaseTimings()  # rolling per-device timings of the check phases
+        self.anomalies = AnomalyDetector()  # per-device metric baselines, scored once per cycle
+        self.profiler = None  # cProfile.Profile the checks run under, while set (see app.profiler)
+        self.profiling_lock = threading.Lock()
         
         # SNMP Configuration
         self.snmp_community = 'public'
@@ -47,26 +219,47 @@ class NetworkMonitor:
         self.ping_timeout = 5
         self.ping_count = 4
         self.monitor_interval = 5  # seconds
+        self.summary_worst_n = 5  # worst devices listed per summary group
+        self.groups = GroupSummaries()  # running aggregates of the published records, by group
+        
+        # Published status snapshot. Versions start from the current time in ms
+        # so they keep increasing across restarts and `since` values stay valid.
+        self._publish_lock = threading.Lock()
+        self.snapshot = _empty_snapshot(int(time.time() * 1000))
         
-    def add_device(self, name: str, ip_address: str, ligne: str = None, atelier: str = None):
-        """Add a device to monitor."""
+    def add_device(self, name: str, ip_address: str, ligne: str = None, atelier: str = None,
+                   publish: bool = True, equipment_type: str = None):
+        """Add a device to monitor.
+
+        Pass ``publish=False`` when adding many devices and call
+        ``publish_snapshot()`` once at the end.
+        """
         self.devices[name] = DeviceStatus(
             name=name,
             ip_address=ip_address,
             status='unknown',
             ligne=ligne,
-            atelier=atelier
+            atelier=atelier,
+            equipment_type=equipment_type
         )
         self.status_history[name] = []
-        logger.info(f"Added device {name} ({ip_address}) to monitoring")
+        self.index.add(name, ligne, atelier, 'unknown')
+        logger.info("Added device %s (%s) to monitoring", name, ip_address)
+        if publish:
+            self.publish_snapshot()
     
     def remove_device(self, name: str):
         """Remove a device from monitoring."""
         if name in self.devices:
             del self.devices[name]
+            self.index.remove(name)
             if name in self.status_history:
                 del self.status_history[name]
-            logger.info(f"Removed device {name} from monitoring")
+            self._octets.pop(name, None)
+            self.timings.remove(name)
+            self.anomalies.remove(name)
+            logger.info("Removed device %s from monitoring", name)
+            self.publish_snapshot()
     
     def ping_device(self, ip_address: str) -> Dict[str, Any]:
         """Ping a device using ICMP and return response time and packet loss."""
@@ -117,25 +310,29 @@ class NetworkMonitor:
                 }
                 
         except subprocess.TimeoutExpired:
-            logger.warning(f"Ping timeout for {ip_address}")
+            logger.warning("Ping timeout for %s", ip_address)
             return {
                 'status': 'timeout',
                 'response_time': None,
                 'packet_loss': 100.0
             }
         except Exception as e:
-            logger.error(f"Error pinging {ip_address}: {e}")
+            logger.error("Error pinging %s: %s", ip_address, e)
             return {
                 'status': 'error',
                 'response_time': None,
                 'packet_loss': 100.0
             }
     
-    def get_snmp_data(self, ip_address: str) -> Dict[str, Any]:
-        """Get SNMP data from a device."""
+    def get_snmp_data(self, ip_address: str, timer: DeviceTimer = None) -> Dict[str, Any]:
+        """Get SNMP data from a device, timing each request with ``timer`` if given."""
         snmp_data = {}
         
         try:
+            # Imported here: pysnmp is slow to import and only needed once polling starts
+            from pysnmp.hlapi import (CommunityData, ContextData, ObjectIdentity, ObjectType, SnmpEngine,
+                                      UdpTransportTarget, nextCmd)
+            
             # Standard SNMP OIDs
             oids = {
                 'sysDescr': '1.3.6.1.2.1.1.1.0',
@@ -157,18 +354,23 @@ class NetworkMonitor:
                         maxRows=1):
                         
                         if errorIndication:
-                            logger.debug(f"SNMP error indication for {ip_address} {name}: {errorIndication}")
+                            SNMP_ERRORS.labels("indication").inc()
+                            logger.debug("SNMP error indication for %s %s: %s", ip_address, name, errorIndication)
                             break
                         elif errorStatus:
-                            logger.debug(f"SNMP error status for {ip_address} {name}: {errorStatus.prettyPrint()}")
+                            SNMP_ERRORS.labels("status").inc()
+                            logger.debug("SNMP error status for %s %s: %s", ip_address, name, errorStatus)
                             break
                         else:
                             for varBind in varBinds:
                                 snmp_data[name] = str(varBind[1])
                             break
                 except Exception as e:
-                    logger.debug(f"SNMP error for {ip_address} {name}: {e}")
-                    continue
+                    SNMP_ERRORS.labels("exception").inc()
+                    logger.debug("SNMP error for %s %s: %s", ip_address, name, e)
+                finally:
+                    if timer is not None:
+                        timer.lap('snmp.' + name)
             
             # Calculate data rate if we have the necessary data
             if 'ifInOctets' in snmp_data and 'ifOutOctets' in snmp_data:
@@ -184,28 +386,38 @@ class NetworkMonitor:
                     snmp_data['calculated_data_rate'] = 0
                     
         except Exception as e:
-            logger.debug(f"SNMP collection failed for {ip_address}: {e}")
+            logger.debug("SNMP collection failed for %s: %s", ip_address, e)
         
         return snmp_data
     
     def check_device(self, device: DeviceStatus) -> DeviceStatus:
         """Check a single device status using ICMP and SNMP."""
-        logger.debug(f"Checking device {device.name} ({device.ip_address})")
+        logger.debug("Checking device %s (%s)", device.name, device.ip_address)
         
         # Store previous status for comparison
         previous_status = device.status
+        timer = self.timings.device(device.name)
         
         # Ping the device
         ping_result = self.ping_device(device.ip_address)
+        _ICMP_PROBE.observe(timer.lap('icmp'))
+        if ping_result['status'] != 'online':
+            ICMP_ERRORS.labels(ping_result['status']).inc()
         device.status = ping_result['status']
+        if device.status == 'online' and device.anomalies:
+            # Stays an issue until the anomaly detector clears it (see detect_anomalies)
+            device.status = 'issue'
         device.response_time = ping_result['response_time']
         device.packet_loss = ping_result['packet_loss']
         device.last_checked = datetime.now()
         
         # If device is online, try to get SNMP data
-        if device.status == 'online':
-            snmp_data = self.get_snmp_data(device.ip_address)
+        if ping_result['status'] == 'online':
+            probe_start = timer.last
+            snmp_data = self.get_snmp_data(device.ip_address, timer)
+            _SNMP_PROBE.observe(time.perf_counter() - probe_start)
             device.snmp_data = snmp_data
+            device.interfaces = self._interface_rates(device, snmp_data)
             
             # Set data rate from SNMP or simulate it
             if 'calculated_data_rate' in snmp_data:
@@ -217,6 +429,8 @@ class NetworkMonitor:
         else:
             device.data_rate = 0.0
             device.snmp_data = None
+            device.interfaces = None
+        timer.lap('rates')
         
         # Store status history
         if device.name in self.status_history:
@@ -232,14 +446,38 @@ class NetworkMonitor:
             # Keep only last 50 entries
             if len(self.status_history[device.name]) > 50:
                 self.status_history[device.name] = self.status_history[device.name][-50:]
+        timer.lap('history')
         
-        # Trigger alerts if status changed
-        if previous_status != device.status and previous_status != 'unknown':
-            self.trigger_alert(device, previous_status, device.status)
+        # Keep the index counts and trigger alerts if status changed
+        if previous_status != device.status:
+            self.index.update_status(device.name, device.status)
+            if previous_status != 'unknown':
+                self.trigger_alert(device, previous_status, device.status)
+            timer.lap('alerts')
+        timer.done()
         
-        logger.debug(f"Device {device.name} status: {device.status}, response_time: {device.response_time}ms")
+        logger.debug("Device %s status: %s, response_time: %sms", device.name, device.status, device.response_time)
         return device
     
+    def _interface_rates(self, device: DeviceStatus, snmp_data: Dict[str, Any]) -> Optional[Dict[str, Dict[str, float]]]:
+        """In/out bits per second of the polled interface, from the octet counters of two polls."""
+        try:
+            in_octets = int(snmp_data['ifInOctets'])
+            out_octets = int(snmp_data['ifOutOctets'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        now = time.monotonic()
+        previous = self._octets.get(device.name)
+        self._octets[device.name] = (now, in_octets, out_octets)
+        if previous is None or now <= previous[0]:
+            return None
+        elapsed = now - previous[0]
+        # Only interface 1 is polled (see get_snmp_data)
+        return {'1': {
+            'in_bps': round(counter_delta(in_octets, previous[1]) * 8 / elapsed, 1),
+            'out_bps': round(counter_delta(out_octets, previous[2]) * 8 / elapsed, 1)
+        }}
+    
     def trigger_alert(self, device: DeviceStatus, old_status: str, new_status: str):
         """Trigger an alert when device status changes."""
         alert_data = {
@@ -252,19 +490,56 @@ class NetworkMonitor:
             'atelier': device.atelier
         }
         
-        logger.info(f"ALERT: Device {device.name} status changed from {old_status} to {new_status}")
+        # Structured record, formatted and written by the logging thread
+        logger.info("ALERT: Device %s status changed from %s to %s", device.name, old_status, new_status,
+                    extra={'event': 'status_change', **alert_data})
         
         # Call registered alert callbacks
         for callback in self.alert_callbacks:
             try:
                 callback(alert_data)
             except Exception as e:
-                logger.error(f"Error in alert callback: {e}")
+                logger.error("Error in alert callback: %s", e)
+    
+    def detect_anomalies(self, devices: List[DeviceStatus]):
+        """Score the latest metrics of all devices against their baselines.
+
+        Reachable devices with an anomalous metric become 'issue' and go back
+        to 'online' when the detector clears them; the changes raise alerts
+        like any other status change.
+        """
+        if not devices:
+            return
+        values = np.array([
+            (device.data_rate, device.response_time, device.packet_loss)
+            if device.status in ('online', 'issue') else (None, None, None)
+            for device in devices
+        ], dtype=float)
+        changes = self.anomalies.update([device.name for device in devices], values)
+        for name, metrics in changes.items():
+            device = self.devices.get(name)
+            if device is None:
+                continue
+            for metric in set(metrics) - set(device.anomalies or ()):
+                ANOMALIES.labels(metric).inc()
+            device.anomalies = metrics or None
+            if device.status not in ('online', 'issue'):
+                continue
+            new_status = 'issue' if metrics else 'online'
+            if new_status != device.status:
+                old_status = device.status
+                device.status = new_status
+                self.index.update_status(name, new_status)
+                self.trigger_alert(device, old_status, new_status)
     
     def add_alert_callback(self, callback):
         """Add a callback function to be called when alerts are triggered."""
         self.alert_callbacks.append(callback)
     
+    def add_cycle_callback(self, callback):
+        """Add a callback called with the latest snapshot after each poll cycle."""
+        self.cycle_callbacks.append(callback)
+    
     def monitor_loop(self):
         """Main monitoring loop."""
         logger.info("Starting monitoring loop")
@@ -273,21 +548,43 @@ class NetworkMonitor:
             try:
                 start_time = time.time()
                 
-                # Check all devices
-                for device_name, device in self.devices.items():
+                # Check all devices (copy, devices can be added from other threads)
+                devices = list(self.devices.values())
+                for device in devices:
                     if not self.is_running:
                         break
-                    self.check_device(device)
+                    profiler = self.profiler
+                    if profiler is None:
+                        self.check_device(device)
+                    else:
+                        with self.profiling_lock:
+                            profiler.runcall(self.check_device, device)
+                
+                phase_start = time.perf_counter()
+                self.detect_anomalies(devices)
+                self.timings.observe_cycle('anomalies', time.perf_counter() - phase_start)
+                
+                phase_start = time.perf_counter()
+                snapshot = self.publish_snapshot()
+                self.timings.observe_cycle('publish', time.perf_counter() - phase_start)
+                for callback in self.cycle_callbacks:
+                    try:
+                        callback(snapshot)
+                    except Exception as e:
+                        logger.error("Error in cycle callback: %s", e)
                 
                 # Calculate sleep time to maintain consistent interval
                 elapsed_time = time.time() - start_time
+                CYCLE_SECONDS.observe(elapsed_time)
+                if elapsed_time > self.monitor_interval:
+                    CYCLE_OVERRUNS.inc()
                 sleep_time = max(0, self.monitor_interval - elapsed_time)
                 
                 if self.is_running:
                     time.sleep(sleep_time)
                     
             except Exception as e:
-                logger.error(f"Error in monitoring loop: {e}")
+                logger.error("Error in monitoring loop: %s", e)
                 if self.is_running:
                     time.sleep(self.monitor_interval)
     
@@ -312,23 +609,67 @@ class NetworkMonitor:
             self.monitor_thread.join(timeout=10)
         logger.info("Monitoring stopped")
     
-    def get_status(self) -> List[Dict[str, Any]]:
-        """Get current status of all devices."""
-        status_list = []
-        for device in self.devices.values():
-            status_list.append({
-                'name': device.name,
-                'ip_address': device.ip_address,
-                'status': device.status,
-                'response_time': device.response_time,
-                'packet_loss': device.packet_loss,
-                'data_rate': device.data_rate,
-                'last_checked': device.last_checked.isoformat() if device.last_checked else None,
-                'ligne': device.ligne,
-                'atelier': device.atelier,
-                'snmp_data': device.snmp_data
-            })
-        return status_list
+    def _status_record(self, device: DeviceStatus) -> Dict[str, Any]:
+        """Build the public status record for a device."""
+        return {
+            'name': device.name,
+            'ip_address': device.ip_address,
+            'status': device.status,
+            'response_time': device.response_time,
+            'packet_loss': device.packet_loss,
+            'data_rate': device.data_rate,
+            'last_checked': device.last_checked.isoformat() if device.last_checked else None,
+            'ligne': device.ligne,
+            'atelier': device.atelier,
+            'equipment_type': device.equipment_type,
+            'snmp_data': dict(device.snmp_data) if device.snmp_data else None,
+            'interfaces': device.interfaces,
+            'anomalies': device.anomalies
+        }
+    
+    def publish_snapshot(self) -> StatusSnapshot:
+        """Publish a new status snapshot if any device changed since the last one."""
+        with self._publish_lock:
+            previous = self.snapshot
+            previous_records = previous.by_name
+            version = previous.version + 1
+            
+            records = []
+            device_versions = {}
+            dirty_groups = set()
+            for device in list(self.devices.values()):
+                record = self._status_record(device)
+                old = previous_records.get(device.name)
+                if old is not None and all(old[k] == record[k] for k in record if k not in VOLATILE_FIELDS):
+                    device_versions[device.name] = previous.device_versions[device.name]
+                else:
+                    device_versions[device.name] = version
+                    dirty_groups.update(self.groups.update(old, record))
+                records.append(record)
+            
+            # Tombstones of re-added devices go, old ones are pruned
+            cutoff = version - SNAPSHOT_TOMBSTONE_VERSIONS
+            oldest_since = previous.oldest_since
+            removed = {}
+            for name, v in previous.removed.items():
+                if name in device_versions:
+                    continue
+                if v <= cutoff:
+                    oldest_since = max(oldest_since, v)
+                    continue
+                removed[name] = v
+            for name, old in previous_records.items():
+                if name not in device_versions:
+                    removed[name] = version
+                    dirty_groups.update(self.groups.update(old, None))
+            
+            if not dirty_groups:
+                return previous
+            
+            summaries = self.groups.summaries(previous.summaries, dirty_groups, self.summary_worst_n)
+            self.snapshot = build_snapshot(version, records, device_versions, removed, summaries,
+                                           oldest_since=oldest_since)
+            return self.snapshot
     
     def get_device_history(self, device_name: str, limit: int = 20) -> List[Dict]:
         """Get historical data for a specific device."""
@@ -338,27 +679,26 @@ class NetworkMonitor:
 
 # Global monitor instance
 monitor = NetworkMonitor()
+Gauge("monitor_devices", "Devices being monitored").set_function(lambda: len(monitor.devices))
+Gauge("monitor_anomalous_devices", "Devices with a metric out of their baseline").set_function(
+    monitor.anomalies.anomalous_count
+)
+
+# Demo devices, used when there is no equipment in the database
+DEMO_DEVICES = [
+    {'name': 'Router-001', 'ip': '192.168.1.1', 'ligne': 'Ligne 1', 'atelier': 'Atelier A'},
+    {'name': 'Switch-001', 'ip': '192.168.1.10', 'ligne': 'Ligne 1', 'atelier': 'Atelier A'},
+    {'name': 'Server-001', 'ip': '192.168.1.100', 'ligne': 'Ligne 2', 'atelier': 'Atelier B'},
+    {'name': 'Workstation-001', 'ip': '192.168.1.200', 'ligne': 'Ligne 2', 'atelier': 'Atelier B'},
+]
 
 # Async wrapper functions for FastAPI compatibility
 async def run_monitoring():
     """Start monitoring in a separate thread."""
     # Add some demo devices - you should load these from your database
-    demo_devices = [
-        {'name': 'Router-001', 'ip': '192.168.1.1', 'ligne': 'Ligne 1', 'atelier': 'Atelier A'},
-        {'name': 'Switch-001', 'ip': '192.168.1.10', 'ligne': 'Ligne 1', 'atelier': 'Atelier A'},
-        {'name': 'Server-001', 'ip': '192.168.1.100', 'ligne': 'Ligne 2', 'atelier': 'Atelier B'},
-        {'name': 'Workstation-001', 'ip': '192.168.1.200', 'ligne': 'Ligne 2', 'atelier': 'Atelier B'},
-    ]
-    
-    for device in demo_devices:
-        monitor.add_device(device['name'], device['ip'], device['ligne'], device['atelier'])
-    
-    # Add alert callback for logging
-    def log_alert(alert_data):
-        logger.info(f"ALERT: {alert_data['device_name']} ({alert_data['ip_address']}) "
-                   f"changed from {alert_data['old_status']} to {alert_data['new_status']}")
-    
-    monitor.add_alert_callback(log_alert)
+    for device in DEMO_DEVICES:
+        monitor.add_device(device['name'], device['ip'], device['ligne'], device['atelier'], publish=False)
+    monitor.publish_snapshot()
     
     # Start monitoring
     monitor.start_monitoring()
@@ -0,0 +1,185 @@
+# app/templates/monitoring/phase_timing.py
+from typing import Any, Dict, List, Optional, Tuple
+from bisect import bisect_left
+import os
+import threading
+import time
+
+# Length of a rolling window, in seconds: statistics cover the current
+# window and the previous one, so between one and two windows of samples
+PHASE_WINDOW_SECONDS = float(os.getenv("PHASE_WINDOW_SECONDS", "300"))
+
+# Upper bounds of the duration buckets, in seconds (the last bucket is +Inf)
+PHASE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class RollingHistogram:
+    """Bucketed durations of one phase of one device over a rolling window.
+
+    Recording a duration is a bisect and a few increments. Samples are kept
+    in two windows, the current and the previous one, rotated lazily, so old
+    slow samples age out without storing them individually.
+    """
+    __slots__ = ('counts', 'previous', 'sum', 'previous_sum', 'max', 'previous_max', 'window')
+
+    def __init__(self, window: int):
+        self.counts = [0] * (len(PHASE_BUCKETS) + 1)
+        self.previous = None
+        self.sum = 0.0
+        self.previous_sum = 0.0
+        self.max = 0.0
+        self.previous_max = 0.0
+        self.window = window
+
+    def _rotate(self, window: int):
+        if window == self.window:
+            return
+        if window == self.window + 1:
+            self.previous, self.previous_sum, self.previous_max = self.counts, self.sum, self.max
+        else:
+            self.previous, self.previous_sum, self.previous_max = None, 0.0, 0.0
+        self.counts = [0] * (len(PHASE_BUCKETS) + 1)
+        self.sum = 0.0
+        self.max = 0.0
+        self.window = window
+
+    def observe(self, seconds: float, window: int):
+        if window != self.window:
+            self._rotate(window)
+        self.counts[bisect_left(PHASE_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def stats(self, window: int) -> Optional[Dict[str, float]]:
+        """Count, mean, p50, p95 and max of the last one to two windows (None if empty)."""
+        self._rotate(window)
+        counts = self.counts
+        if self.previous is not None:
+            counts = [a + b for a, b in zip(counts, self.previous)]
+        count = sum(counts)
+        if not count:
+            return None
+        maximum = max(self.max, self.previous_max)
+        return {
+            'count': count,
+            'mean': (self.sum + self.previous_sum) / count,
+            'p50': self._quantile(counts, count, 0.5, maximum),
+            'p95': self._quantile(counts, count, 0.95, maximum),
+            'max': maximum
+        }
+
+    @staticmethod
+    def _quantile(counts: List[int], count: int, q: float, maximum: float) -> float:
+        """Upper bound of the bucket holding the quantile, capped at the max seen."""
+        rank = q * count
+        cumulative = 0
+        for bound, bucket_count in zip(PHASE_BUCKETS, counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return min(bound, maximum)
+        return maximum
+
+class PhaseTimings:
+    """Rolling per-device, per-phase timings of the poll loop.
+
+    Phases are ``icmp``, ``snmp.<oid name>``, ``rates``, ``history``,
+    ``alerts`` and ``total`` (the whole device check). Phases of the cycle
+    as a whole, such as the database write, are recorded separately.
+    """
+
+    def __init__(self, window_seconds: float = PHASE_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._devices: Dict[str, Dict[str, RollingHistogram]] = {}
+        self._cycle: Dict[str, RollingHistogram] = {}
+        self._lock = threading.Lock()
+
+    def current_window(self) -> int:
+        return int(time.monotonic() // self.window_seconds)
+
+    def device(self, name: str) -> "DeviceTimer":
+        """Timer recording the phases of one check of a device."""
+        phases = self._devices.get(name)
+        if phases is None:
+            with self._lock:
+                phases = self._devices.setdefault(name, {})
+        return DeviceTimer(phases, self.current_window())
+
+    def observe_cycle(self, phase: str, seconds: float):
+        window = self.current_window()
+        histogram = self._cycle.get(phase)
+        if histogram is None:
+            histogram = self._cycle.setdefault(phase, RollingHistogram(window))
+        histogram.observe(seconds, window)
+
+    def remove(self, name: str):
+        with self._lock:
+            self._devices.pop(name, None)
+
+    def report(self, limit: int = 10, phase: str = None) -> Dict[str, Any]:
+        """Slowest devices (by p95 of the whole check) and slowest device phases (by p95).
+
+        ``phase`` restricts the phase ranking to one phase, or to a family
+        of phases when it ends with a dot (``snmp.``).
+        """
+        window = self.current_window()
+        with self._lock:
+            devices = list(self._devices.items())
+        totals: List[Tuple[float, Dict[str, Any]]] = []
+        phases: List[Tuple[float, Dict[str, Any]]] = []
+        for name, histograms in devices:
+            for phase_name, histogram in list(histograms.items()):
+                stats = histogram.stats(window)
+                if stats is None:
+                    continue
+                if phase_name == 'total':
+                    totals.append((stats['p95'], {'device': name, **stats}))
+                elif phase is None or phase_name == phase or (phase.endswith('.') and phase_name.startswith(phase)):
+                    phases.append((stats['p95'], {'device': name, 'phase': phase_name, **stats}))
+        key = lambda item: (item[0], item[1]['max'])
+        totals.sort(key=key, reverse=True)
+        phases.sort(key=key, reverse=True)
+        cycle = {}
+        for phase_name, histogram in list(self._cycle.items()):
+            stats = histogram.stats(window)
+            if stats is not None:
+                cycle[phase_name] = stats
+        return {
+            'window_seconds': self.window_seconds,
+            'devices': [entry for _, entry in totals[:limit]],
+            'phases': [entry for _, entry in phases[:limit]],
+            'cycle': cycle
+        }
+
+class DeviceTimer:
+    """Records consecutive phases of one device check.
+
+    ``lap(phase)`` records the time since the previous lap (or the start)
+    under ``phase``; ``done()`` records the whole check as ``total``.
+    """
+    __slots__ = ('phases', 'window', 'start', 'last')
+
+    def __init__(self, phases: Dict[str, RollingHistogram], window: int):
+        self.phases = phases
+        self.window = window
+        self.start = self.last = time.perf_counter()
+
+    def _observe(self, phase: str, seconds: float):
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases.setdefault(phase, RollingHistogram(self.window))
+        histogram.observe(seconds, self.window)
+
+    def lap(self, phase: str) -> float:
+        now = time.perf_counter()
+        elapsed = now - self.last
+        self.last = now
+        self._observe(phase, elapsed)
+        return elapsed
+
+    def skip(self):
+        """Don't count the time since the previous lap in the next one."""
+        self.last = time.perf_counter()
+
+    def done(self):
+        self.last = time.perf_counter()
+        self._observe('total', self.last - self.start)
@@ -0,0 +1,160 @@
+# app/templates/monitoring/snapshot_store.py
+from typing import Dict, List, Optional, Any
+from bson import Binary
+import gzip
+import os
+import threading
+import logging
+
+from ...serialization import loads
+from .device_index import DeviceIndex
+from .monitor import StatusReader, StatusSnapshot, build_snapshot, _empty_snapshot, monitor
+
+logger = logging.getLogger(__name__)
+
+# "embedded": each web process runs its own monitor (single worker setups).
+# "external": the standalone collector (python -m app.collector) polls the
+# devices and web workers only read what it publishes to MongoDB.
+COLLECTOR_MODE = os.getenv("COLLECTOR_MODE", "embedded").lower()
+# Seconds between two checks for a newer snapshot by the web workers
+SNAPSHOT_POLL_INTERVAL = float(os.getenv("SNAPSHOT_POLL_INTERVAL", "1"))
+
+# Id of the document holding the latest snapshot
+SNAPSHOT_ID = "current"
+
+class MongoSnapshotStore:
+    """Latest status snapshot shared through a single MongoDB document.
+
+    Only the gzip body is stored (the plain body of a large fleet would not
+    fit in a 16MB document); device versions are stored in the order of the
+    devices in the body, so device names never need to be document keys.
+    """
+
+    def __init__(self, collection_name: str = "status_snapshots"):
+        self.collection_name = collection_name
+
+    @property
+    def collection(self):
+        from ...database import get_db
+        return get_db()[self.collection_name]
+
+    def publish(self, snapshot: StatusSnapshot):
+        """Replace the stored snapshot."""
+        self.collection.replace_one(
+            {"_id": SNAPSHOT_ID},
+            {
+                "version": snapshot.version,
+                "created_at": snapshot.created_at,
+                "body_gzip": Binary(snapshot.body_gzip),
+                "device_versions": [snapshot.device_versions[d['name']] for d in snapshot.devices],
+                "removed": [[name, version] for name, version in snapshot.removed.items()],
+                "oldest_since": snapshot.oldest_since,
+                "summaries": [[list(key), summary] for key, summary in snapshot.summaries.items()]
+            },
+            upsert=True
+        )
+
+    def load(self, newer_than: int = None) -> Optional[StatusSnapshot]:
+        """Get the stored snapshot, None if there is none newer than ``newer_than``."""
+        query: Dict[str, Any] = {"_id": SNAPSHOT_ID}
+        if newer_than is not None:
+            query["version"] = {"$gt": newer_than}
+        document = self.collection.find_one(query)
+        if document is None:
+            return None
+
+        body_gzip = bytes(document["body_gzip"])
+        body = gzip.decompress(body_gzip)
+        records: List[Dict[str, Any]] = loads(body)
+        return build_snapshot(
+            document["version"],
+            records,
+            device_versions={r['name']: v for r, v in zip(records, document["device_versions"])},
+            removed={name: version for name, version in document["removed"]},
+            summaries={tuple(key): summary for key, summary in document["summaries"]},
+            body=body,
+            body_gzip=body_gzip,
+            created_at=document["created_at"],
+            oldest_since=document.get("oldest_since", 0)
+        )
+
+class SnapshotReader(StatusReader):
+    """Status source of the web workers when the collector runs in its own process.
+
+    A background thread swaps in newer snapshots from the store, so request
+    handlers read them the same way as the monitor's: without a lock or a
+    database round trip.
+    """
+
+    def __init__(self, store: MongoSnapshotStore, poll_interval: float = SNAPSHOT_POLL_INTERVAL):
+        self.store = store
+        self.poll_interval = poll_interval
+        self.snapshot = _empty_snapshot(0)
+        self.index = DeviceIndex()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def refresh(self) -> bool:
+        """Load the stored snapshot if it is newer, return whether it was."""
+        snapshot = self.store.load(newer_than=self.snapshot.version)
+        if snapshot is None:
+            return False
+        index = DeviceIndex()
+        for record in snapshot.devices:
+            index.add(record['name'], record['ligne'], record['atelier'], record['status'])
+        self.index = index
+        self.snapshot = snapshot
+        return True
+
+    def get_device_history(self, device_name: str, limit: int = 20) -> List[Dict]:
+        """Get historical data for a device from the samples written by the collector."""
+        from ...models.database_models import Equipment, EquipmentHistory
+        equipment = Equipment.get_by_name(device_name)
+        if equipment is None:
+            return []
+        return [
+            {
+                'timestamp': entry.timestamp.isoformat(),
+                'status': entry.status,
+                'response_time': entry.response_time,
+                'data_rate': entry.data_rate,
+                'packet_loss': entry.packet_loss
+            }
+            for entry in reversed(EquipmentHistory.get_by_equipment(equipment.id, limit))
+        ]
+
+    def _poll_loop(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("Error loading status snapshot: %s", e)
+
+    def start(self):
+        """Load the current snapshot and start polling for newer ones."""
+        if self._thread is not None:
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error("Error loading status snapshot: %s", e)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._poll_loop, name="snapshot-reader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+_reader = None
+
+def get_status_source() -> StatusReader:
+    """Status source of this process: the monitor, or a reader of the collector's snapshots."""
+    global _reader
+    if COLLECTOR_MODE != "external":
+        return monitor
+    if _reader is None:
+        _reader = SnapshotReader(MongoSnapshotStore())
+    return _reader
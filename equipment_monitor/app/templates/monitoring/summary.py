@@ -0,0 +1,191 @@
+# app/templates/monitoring/summary.py
+from typing import Dict, List, Optional, Any, Iterable, Set, Tuple
+import bisect
+import math
+
+# Order used to pick the worst devices: unreachable first, then issues
+STATUS_SEVERITY = {
+    'offline': 0,
+    'error': 0,
+    'timeout': 1,
+    'issue': 2,
+    'warning': 3,
+    'unknown': 4,
+    'online': 5
+}
+
+# Group keys: () for the site, (ligne,) for a ligne, (ligne, atelier) for an atelier
+GroupKey = Tuple[str, ...]
+
+def group_keys(record: Dict[str, Any]) -> List[GroupKey]:
+    """Keys of the groups a device record belongs to."""
+    keys = [()]
+    if record.get('ligne') is not None:
+        keys.append((record['ligne'],))
+        if record.get('atelier') is not None:
+            keys.append((record['ligne'], record['atelier']))
+    return keys
+
+def _percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def _stats(sorted_values: List[float], total: float) -> Dict[str, Optional[float]]:
+    return {
+        'avg': round(total / len(sorted_values), 2) if sorted_values else None,
+        'p50': _percentile(sorted_values, 50),
+        'p95': _percentile(sorted_values, 95),
+        'max': sorted_values[-1] if sorted_values else None
+    }
+
+def _severity(record: Dict[str, Any]) -> Tuple:
+    return (
+        STATUS_SEVERITY.get(record['status'], 4),
+        -(record.get('packet_loss') or 0),
+        -(record.get('response_time') or 0)
+    )
+
+def _remove(values: List, value):
+    index = bisect.bisect_left(values, value)
+    if index < len(values) and values[index] == value:
+        del values[index]
+
+class GroupStats:
+    """Running aggregates of one group, updated one device record at a time.
+
+    Metric values and the devices that aren't online are kept sorted, so
+    adding or removing a record is a couple of bisections and the summary
+    (percentiles, worst devices) is read without scanning the group.
+    """
+    __slots__ = ('total', 'counts', 'data_rates', 'data_rate_sum', 'response_times', 'response_time_sum', 'worst')
+
+    def __init__(self):
+        self.total = 0
+        self.counts: Dict[str, int] = {}
+        self.data_rates: List[float] = []
+        self.data_rate_sum = 0.0
+        self.response_times: List[float] = []
+        self.response_time_sum = 0.0
+        self.worst: List[Tuple] = []  # (severity, name, status, response_time, packet_loss), not online only
+
+    @staticmethod
+    def _worst_entry(record: Dict[str, Any]) -> Optional[Tuple]:
+        severity = _severity(record)
+        if severity[0] >= STATUS_SEVERITY['online']:
+            return None
+        return (severity, record['name'], record['status'], record.get('response_time'), record.get('packet_loss'))
+
+    def add(self, record: Dict[str, Any]):
+        self.total += 1
+        self.counts[record['status']] = self.counts.get(record['status'], 0) + 1
+        if record.get('data_rate') is not None:
+            bisect.insort(self.data_rates, record['data_rate'])
+            self.data_rate_sum += record['data_rate']
+        if record.get('response_time') is not None:
+            bisect.insort(self.response_times, record['response_time'])
+            self.response_time_sum += record['response_time']
+        entry = self._worst_entry(record)
+        if entry is not None:
+            bisect.insort(self.worst, entry)
+
+    def discard(self, record: Dict[str, Any]):
+        """Remove a record previously added (the same values)."""
+        self.total -= 1
+        count = self.counts.get(record['status'], 0) - 1
+        if count > 0:
+            self.counts[record['status']] = count
+        else:
+            self.counts.pop(record['status'], None)
+        if record.get('data_rate') is not None:
+            _remove(self.data_rates, record['data_rate'])
+            self.data_rate_sum -= record['data_rate']
+        if record.get('response_time') is not None:
+            _remove(self.response_times, record['response_time'])
+            self.response_time_sum -= record['response_time']
+        entry = self._worst_entry(record)
+        if entry is not None:
+            _remove(self.worst, entry)
+
+    def summary(self, worst_n: int = 5) -> Dict[str, Any]:
+        # Sums are reset when a list empties, so rounding errors don't accumulate forever
+        if not self.data_rates:
+            self.data_rate_sum = 0.0
+        if not self.response_times:
+            self.response_time_sum = 0.0
+        return {
+            'total': self.total,
+            'counts': dict(self.counts),
+            'data_rate': _stats(self.data_rates, self.data_rate_sum),
+            'response_time': _stats(self.response_times, self.response_time_sum),
+            'worst': [
+                {'name': name, 'status': status, 'response_time': response_time, 'packet_loss': packet_loss}
+                for _, name, status, response_time, packet_loss in self.worst[:worst_n]
+            ]
+        }
+
+def summarize(records: Iterable[Dict[str, Any]], worst_n: int = 5) -> Dict[str, Any]:
+    """Totals, counts by status, data_rate/response_time stats and worst devices of a group."""
+    stats = GroupStats()
+    for record in records:
+        stats.add(record)
+    return stats.summary(worst_n)
+
+class GroupSummaries:
+    """Running aggregates of the site, each ligne and each atelier.
+
+    Fed with the records that changed between two snapshots, so updating
+    the summaries costs in proportion to the changes, not to the fleet.
+    """
+
+    def __init__(self):
+        self.groups: Dict[GroupKey, GroupStats] = {(): GroupStats()}
+
+    def update(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> Set[GroupKey]:
+        """Replace a device's ``old`` record (None if added) by ``new`` (None if
+        removed) and return the keys of the groups that changed.
+        """
+        touched = set()
+        if old is not None:
+            for key in group_keys(old):
+                self.groups[key].discard(old)
+                touched.add(key)
+        if new is not None:
+            for key in group_keys(new):
+                stats = self.groups.get(key)
+                if stats is None:
+                    stats = self.groups[key] = GroupStats()
+                stats.add(new)
+                touched.add(key)
+        return touched
+
+    def summaries(
+        self,
+        previous: Dict[GroupKey, Dict[str, Any]],
+        dirty: Iterable[GroupKey],
+        worst_n: int = 5
+    ) -> Dict[GroupKey, Dict[str, Any]]:
+        """Summaries of all groups: the dirty ones recomputed, the others reused from ``previous``."""
+        summaries = dict(previous)
+        for key in dirty:
+            stats = self.groups.get(key)
+            if stats is not None and (stats.total or key == ()):
+                summaries[key] = stats.summary(worst_n)
+            else:
+                # Last device of a ligne/atelier removed
+                self.groups.pop(key, None)
+                summaries.pop(key, None)
+        return summaries
+
+def summary_tree(summaries: Dict[GroupKey, Dict[str, Any]]) -> Dict[str, Any]:
+    """Nest group summaries as site -> lignes -> ateliers."""
+    tree = dict(summaries[()])
+    tree['lignes'] = {}
+    for key in sorted(k for k in summaries if len(k) == 1):
+        tree['lignes'][key[0]] = dict(summaries[key], ateliers={})
+    for key in sorted(k for k in summaries if len(k) == 2):
+        ligne = tree['lignes'].setdefault(key[0], {'ateliers': {}})
+        ligne['ateliers'][key[1]] = summaries[key]
+    return tree
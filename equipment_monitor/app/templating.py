@@ -0,0 +1,74 @@
+# app/templating.py
+from typing import Any, Callable, Dict, Hashable, Tuple
+from collections import OrderedDict
+import os
+import threading
+import logging
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+# Compiled templates, shared by all worker processes and kept across restarts.
+# Unset: Jinja's per-user temporary directory (mode 0700, ownership checked);
+# the bytecode is executed, so never point this at a directory others can write
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR")
+# Maximum number of rendered fragments kept
+FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", "512"))
+
+# The one template environment of the application
+templates = Jinja2Templates(directory=TEMPLATES_DIR)
+try:
+    if TEMPLATE_CACHE_DIR:
+        os.makedirs(TEMPLATE_CACHE_DIR, mode=0o700, exist_ok=True)
+    templates.env.bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+except OSError as e:
+    logger.warning("Template bytecode cache disabled: %s", e)
+
+class FragmentCache:
+    """Rendered template fragments, least recently used evicted first.
+
+    Keys must hold everything the fragment depends on (typically the status
+    snapshot version, the filters and the user's role), so entries never need
+    invalidating: a new snapshot version simply stops hitting the old ones.
+    """
+
+    def __init__(self, max_entries: int = FRAGMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._fragments: "OrderedDict[Tuple[str, Hashable], Markup]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, template_name: str, key: Hashable, context: Callable[[], Dict[str, Any]]) -> Markup:
+        """Render ``template_name``, or reuse its rendering for the same key.
+
+        ``context`` is only called on a miss, so building it can be skipped too.
+        """
+        cache_key = (template_name, key)
+        with self._lock:
+            fragment = self._fragments.get(cache_key)
+            if fragment is not None:
+                self._fragments.move_to_end(cache_key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+
+        fragment = Markup(templates.get_template(template_name).render(context()))
+        with self._lock:
+            self._fragments[cache_key] = fragment
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._fragments), "hits": self.hits, "misses": self.misses}
+
+fragments = FragmentCache()
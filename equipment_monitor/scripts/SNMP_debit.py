@@ -9,7 +9,6 @@ import os
 import time
 from pathlib import Path
 from datetime import datetime
-from pysnmp.hlapi import *
 
 # Add the project root to the Python path
 project_root = Path(__file__).parent.parent
@@ -78,6 +77,9 @@ class SNMPMonitor:
     def get_snmp_value_v3(self, oid):
         """Get SNMP value using SNMPv3."""
         try:
+            # Imported here: pysnmp is slow to import
+            from pysnmp.hlapi import (ContextData, ObjectIdentity, ObjectType, SnmpEngine, UdpTransportTarget,
+                                      UsmUserData, getCmd, usmDESPrivProtocol, usmHMACSHAAuthProtocol)
             response = next(getCmd(
                 SnmpEngine(),
                 UsmUserData(
@@ -113,6 +115,8 @@ class SNMPMonitor:
     def get_snmp_value_v2c(self, oid):
         """Get SNMP value using SNMPv2c (fallback)."""
         try:
+            from pysnmp.hlapi import (CommunityData, ContextData, ObjectIdentity, ObjectType, SnmpEngine,
+                                      UdpTransportTarget, getCmd)
             response = next(getCmd(
                 SnmpEngine(),
                 CommunityData('public'),
@@ -418,6 +422,8 @@ except ImportError as e:
     sys.exit(1)
 
 def get_snmp_value(oid):
+    from pysnmp.hlapi import (ContextData, ObjectIdentity, ObjectType, SnmpEngine, UdpTransportTarget,
+                              UsmUserData, getCmd, usmDESPrivProtocol, usmHMACSHAAuthProtocol)
     response = next(getCmd(
     SnmpEngine(),
     UsmUserData(SNMP_USER, AUTH_KEY, PRIV_KEY,
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Query-plan auditor
+Explains every query shape issued by the models and routes with
+explain("executionStats") against a loaded database (see
+scripts/generate_fleet.py) and flags collection scans, in-memory sorts,
+regex filters and queries examining many more documents than they return.
+Suggests the missing compound / partial indexes (--create builds them) and
+lists the indexes that are never used or are the prefix of another one,
+which only slow down writes.
+
+    DB_NAME=equipment_bench python scripts/audit_queries.py
+    DB_NAME=equipment_bench python scripts/audit_queries.py --create
+"""
+
+import re
+import sys
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database import db_client
+from app.models.database_models import USERNAME_COLLATION
+from query_plans import explain_aggregate, explain_find, summarize_plan
+
+class Shape:
+    """One query shape: where it is issued and the find/aggregate it runs."""
+
+    def __init__(self, name: str, collection: str, filter: Dict = None, sort: List[Tuple[str, int]] = None,
+                 limit: int = 0, projection: Dict = None, collation: Dict = None, pipeline: List[Dict] = None):
+        self.name = name
+        self.collection = collection
+        self.filter = filter or {}
+        self.sort = sort or []
+        self.limit = limit
+        self.projection = projection
+        self.collation = collation
+        self.pipeline = pipeline
+
+    def explain(self) -> Dict[str, Any]:
+        collection = db_client.db[self.collection]
+        if self.pipeline is not None:
+            return explain_aggregate(collection, self.pipeline)
+        return explain_find(collection, self.filter, self.projection, self.sort, self.limit, self.collation)
+
+def sample_values() -> Dict[str, Any]:
+    """Real values to put in the filters, so the plans match production ones."""
+    db = db_client.db
+    equipment = db.equipment.find_one({"is_active": True}) or {}
+    user = db.users.find_one() or {}
+    config = db.system_config.find_one() or {}
+    session = db.sessions.find_one() or {}
+    return {
+        "equipment_id": equipment.get("_id"),
+        "name": equipment.get("name", "unknown"),
+        "ip_address": equipment.get("ip_address", "0.0.0.0"),
+        "ligne": equipment.get("ligne", "ligne1"),
+        "atelier": equipment.get("atelier", "atelier_a"),
+        "status": equipment.get("status", "online"),
+        "user_id": user.get("_id"),
+        "username": user.get("username", "admin"),
+        "email": user.get("email", "admin@example.com"),
+        "config_key": config.get("key", "monitoring_interval"),
+        "session_id": session.get("_id", "unknown")
+    }
+
+def query_shapes(v: Dict[str, Any]) -> List[Shape]:
+    """Every query shape of app/models/database_models.py, app/sessions.py and the snapshot store."""
+    now = datetime.utcnow()
+    week_ago = now - timedelta(days=7)
+    list_fields = {"name": 1, "ligne": 1, "atelier": 1, "status": 1, "data_rate": 1, "last_checked": 1}
+    shapes = [
+        Shape("User.get_by_id", "users", {"_id": v["user_id"]}, limit=1),
+        Shape("User.get_by_username", "users", {"username": v["username"]}, limit=1, collation=USERNAME_COLLATION),
+        Shape("User.get_by_email", "users", {"email": v["email"]}, limit=1),
+        Shape("Equipment.get_by_name", "equipment", {"name": v["name"]}, limit=1),
+        Shape("Equipment.get_by_ip", "equipment", {"ip_address": v["ip_address"]}, limit=1),
+        Shape("Equipment.get_all", "equipment", {"is_active": True}),
+        Shape("Equipment.get_by_ligne", "equipment", {"ligne": v["ligne"], "is_active": True}),
+        Shape("Equipment.get_by_atelier", "equipment", {"atelier": v["atelier"], "is_active": True}),
+        Shape("EquipmentHistory.get_by_equipment", "equipment_history", {"equipment_id": v["equipment_id"]},
+              sort=[("timestamp", -1)], limit=50),
+        Shape("EquipmentHistory.get_page", "equipment_history",
+              {"equipment_id": v["equipment_id"], "timestamp": {"$gte": week_ago, "$lt": now}},
+              sort=[("timestamp", -1), ("_id", -1)], limit=1001, projection={"timestamp": 1, "data_rate": 1}),
+        Shape("EquipmentHistory.get_series", "equipment_history",
+              {"equipment_id": v["equipment_id"], "timestamp": {"$gte": week_ago, "$lt": now}, "data_rate": {"$ne": None}},
+              sort=[("timestamp", 1)], projection={"_id": 0, "timestamp": 1, "data_rate": 1}),
+        Shape("EquipmentHistory.get_rollup", "equipment_history", pipeline=[
+            {"$match": {"equipment_id": v["equipment_id"], "timestamp": {"$gte": week_ago, "$lt": now},
+                        "data_rate": {"$ne": None}}},
+            {"$group": {"_id": None, "avg": {"$avg": "$data_rate"}}}
+        ]),
+        Shape("EquipmentHistory.cleanup_old_records", "equipment_history",
+              {"timestamp": {"$lt": now - timedelta(days=30)}}, projection={"_id": 1}),
+        Shape("Alert.get_active_alerts", "alerts", {"resolved": False}, sort=[("timestamp", -1)], limit=100),
+        Shape("Alert.get_by_equipment", "alerts", {"equipment_id": v["equipment_id"]}, sort=[("timestamp", -1)], limit=50),
+        Shape("SystemConfig.get_by_key", "system_config", {"key": v["config_key"]}, limit=1),
+        Shape("MongoSessionStore.get", "sessions", {"_id": v["session_id"], "expires_at": {"$gt": now}}, limit=1),
+        Shape("MongoSessionStore.find_by_email", "sessions", {"data.email": v["email"], "expires_at": {"$gt": now}},
+              limit=1, projection={"_id": 1}),
+        Shape("MongoSessionStore.count", "sessions", {"expires_at": {"$gt": now}}, projection={"_id": 1}),
+        Shape("MongoSnapshotStore.load", "status_snapshots", {"_id": "current", "version": {"$gt": 0}}, limit=1),
+    ]
+    # GET /api/equipment: Equipment.get_page, per filter combination and sort
+    filters = {
+        "": {},
+        "ligne": {"ligne": v["ligne"]},
+        "ligne+atelier": {"ligne": v["ligne"], "atelier": v["atelier"]},
+        "status": {"status": v["status"]},
+    }
+    for label, query in filters.items():
+        for sort in ("name", "status", "data_rate", "last_checked"):
+            keys = [(sort, 1)] if sort == "name" else [(sort, 1), ("_id", 1)]
+            shapes.append(Shape(f"Equipment.get_page[{label or 'all'}, sort={sort}]", "equipment",
+                                {**query, "is_active": True}, sort=keys, limit=51, projection=list_fields))
+    return shapes
+
+def uses_regex(filter: Any) -> bool:
+    if isinstance(filter, re.Pattern):
+        return True
+    if isinstance(filter, dict):
+        return "$regex" in filter or any(uses_regex(value) for value in filter.values())
+    if isinstance(filter, list):
+        return any(uses_regex(value) for value in filter)
+    return False
+
+def suggest_index(shape: Shape) -> Optional[Tuple[List[Tuple[str, int]], Dict[str, Any]]]:
+    """Index for a shape following the equality, sort, range order.
+
+    Boolean equality fields (is_active, resolved) become the partial filter
+    of the index rather than keys. None when no index would help (e.g. a
+    filter on a boolean only, returning most of the collection).
+    """
+    filter = shape.pipeline[0]["$match"] if shape.pipeline else shape.filter
+    equality, ranges, partial = [], [], {}
+    for field, condition in filter.items():
+        if field.startswith("$") or field == "_id":
+            continue
+        if isinstance(condition, bool):
+            partial[field] = condition
+        elif isinstance(condition, dict) and any(op.startswith("$") and op not in ("$eq", "$in") for op in condition):
+            ranges.append(field)
+        else:
+            equality.append(field)
+    sort_fields = {field for field, _ in shape.sort}
+    keys = [(field, 1) for field in equality if field not in sort_fields]
+    keys += list(shape.sort)
+    keys += [(field, 1) for field in ranges if field not in sort_fields]
+    if not equality and not shape.sort and not ranges:
+        return None
+    options: Dict[str, Any] = {}
+    if partial:
+        options["partialFilterExpression"] = partial
+    if shape.collation:
+        options["collation"] = shape.collation
+    return keys, options
+
+def _matches(index: Dict[str, Any], keys: List[Tuple[str, int]]) -> bool:
+    """Whether an existing index has ``keys`` as a prefix (or the reverse of it)."""
+    index_keys = list(index["key"].items())[:len(keys)]
+    reverse = [(field, -direction) for field, direction in keys]
+    return [(f, int(d)) for f, d in index_keys] in (keys, reverse)
+
+def index_name(keys: List[Tuple[str, int]], options: Dict[str, Any]) -> str:
+    name = "audit_" + "_".join(f"{field.replace('.', '_')}_{direction}" for field, direction in keys)
+    if "partialFilterExpression" in options:
+        name += "_partial"
+    return name
+
+def redundant_and_unused(collections: List[str]) -> List[str]:
+    """Indexes never used since the server started, or a plain prefix of another index."""
+    findings = []
+    db = db_client.db
+    for name in collections:
+        indexes = list(db[name].list_indexes())
+        try:
+            stats = {stat["name"]: stat for stat in db[name].aggregate([{"$indexStats": {}}])}
+        except Exception:
+            stats = {}
+        for index in indexes:
+            if index["name"] == "_id_":
+                continue
+            plain = not any(option in index for option in
+                            ("unique", "partialFilterExpression", "collation", "expireAfterSeconds", "sparse"))
+            keys = list(index["key"].items())
+            for other in indexes:
+                other_keys = list(other["key"].items())
+                if plain and other is not index and len(other_keys) > len(keys) and other_keys[:len(keys)] == keys:
+                    findings.append(f"{name}.{index['name']}: prefix of {other['name']}, redundant")
+                    break
+            stat = stats.get(index["name"])
+            if stat is not None and stat["accesses"]["ops"] == 0 and "expireAfterSeconds" not in index:
+                findings.append(f"{name}.{index['name']}: not used since {stat['accesses']['since']:%Y-%m-%d %H:%M}")
+    return findings
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit the query plans of the model layer")
+    parser.add_argument("--max-ratio", type=float, default=10, help="Flag queries examining more docs per result")
+    parser.add_argument("--min-docs", type=int, default=100, help="Ignore ratios below this many docs examined")
+    parser.add_argument("--create", action="store_true", help="Create the suggested indexes")
+    args = parser.parse_args()
+
+    db_client.connect()
+    shapes = query_shapes(sample_values())
+    existing = {name: list(db_client.db[name].list_indexes()) for name in {shape.collection for shape in shapes}}
+
+    print(f"Auditing {len(shapes)} query shapes on {db_client.db_name}")
+    print("-" * 110)
+    suggestions: Dict[Tuple[str, str], Tuple[List, Dict, List[str]]] = {}
+    flagged = 0
+    for shape in shapes:
+        try:
+            plan = summarize_plan(shape.explain())
+        except Exception as e:
+            print(f"{shape.name:<52} explain failed: {e}")
+            continue
+        problems = []
+        if plan["collscan"]:
+            problems.append("COLLSCAN")
+        if plan["in_memory_sort"]:
+            problems.append("SORT in memory")
+        if uses_regex(shape.filter):
+            problems.append("regex")
+        if plan["docs_examined"] >= args.min_docs and plan["examined_ratio"] > args.max_ratio:
+            problems.append(f"{plan['examined_ratio']:.0f} docs examined per result")
+        indexes = ",".join(plan["indexes"]) or "-"
+        print(f"{shape.name:<52} {indexes:<32} docs {plan['docs_examined']:>8}/{plan['n_returned']:<6} "
+              f"{'✗ ' + ', '.join(problems) if problems else '✓'}")
+        if not problems:
+            continue
+        flagged += 1
+        suggestion = suggest_index(shape)
+        if suggestion is None:
+            continue
+        keys, options = suggestion
+        # An index without a partial filter serves the query as well
+        if any(_matches(index, keys) and index.get("partialFilterExpression") in (None, options.get("partialFilterExpression"))
+               for index in existing[shape.collection]):
+            continue
+        key = (shape.collection, index_name(keys, options))
+        suggestions.setdefault(key, (keys, options, []))[2].append(shape.name)
+
+    print("-" * 110)
+    print(f"{flagged} of {len(shapes)} query shapes flagged")
+    if suggestions:
+        print("\nMissing indexes (add to create_indexes() in scripts/init_database.py):")
+        for (collection, name), (keys, options, shape_names) in suggestions.items():
+            option_text = "".join(f", {option}={value!r}" for option, value in options.items())
+            print(f"    db_client.db.{collection}.create_index({keys!r}{option_text})  # {', '.join(shape_names)}")
+            if args.create:
+                db_client.db[collection].create_index(keys, name=name, **options)
+                print(f"    ✓ created {collection}.{name}")
+
+    findings = redundant_and_unused(sorted(existing))
+    if findings:
+        print("\nIndexes that only slow down writes:")
+        for finding in findings:
+            print(f"    {finding}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Data-layer micro-benchmark
+Times the model methods of app/models/database_models.py against a local
+mongod (load it with scripts/generate_fleet.py first), records ops/sec and
+latency percentiles, and explains the query each read actually sends
+(captured from the driver: index used, documents examined).
+
+Save a baseline, then compare later runs against it: a run fails (exit
+code 1) when a query stops using its index, examines many more documents,
+or gets slower than the tolerance allows.
+
+    DB_NAME=equipment_bench python scripts/bench_models.py --save-baseline bench_models.json
+    DB_NAME=equipment_bench python scripts/bench_models.py --baseline bench_models.json
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bson import ObjectId
+from pymongo import monitoring
+
+from app.database import db_client
+from app.models.database_models import Alert, Equipment, EquipmentHistory, User
+from query_plans import CommandCapture, explain_command, summarize_plan
+
+BENCH_PREFIX = "BENCH-"
+
+# Registered before db_client creates the client, see main()
+capture = CommandCapture()
+
+class Case:
+    """A model method to time, and whether to explain the query it sends."""
+
+    def __init__(self, name: str, run: Callable[[int], Any], explain: bool = False):
+        self.name = name
+        self.run = run          # called with the iteration number
+        self.explain = explain  # explain the first query of a representative call
+
+def explain_case(case: Case) -> Optional[Dict[str, Any]]:
+    """Plan of the first query ``case.run`` sends, None if it sends none."""
+    with capture.capture() as commands:
+        case.run(0)
+    if not commands:
+        return None
+    database_name, command = commands[0]
+    return summarize_plan(explain_command(db_client.client[database_name], command))
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
+
+def bench(case: Case, seconds: float, warmup: int) -> Dict[str, Any]:
+    for i in range(warmup):
+        case.run(i)
+    latencies = []
+    started = time.perf_counter()
+    deadline = started + seconds
+    i = 0
+    while True:
+        start = time.perf_counter()
+        case.run(warmup + i)
+        end = time.perf_counter()
+        latencies.append(end - start)
+        i += 1
+        if end >= deadline:
+            break
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    result = {
+        "ops": len(latencies),
+        "ops_per_sec": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000
+    }
+    if case.explain:
+        plan = explain_case(case)
+        if plan is not None:
+            result["plan"] = plan
+    return result
+
+def sample_fixtures(samples: int) -> Dict[str, Any]:
+    """Existing equipment ids, lignes and usernames to query, picked at random."""
+    db = db_client.db
+    equipment_ids = [doc["_id"] for doc in db.equipment.aggregate([
+        {"$match": {"is_active": True}}, {"$sample": {"size": samples}}, {"$project": {"_id": 1}}
+    ])]
+    if not equipment_ids:
+        raise SystemExit("No equipment in the database, load a fleet with scripts/generate_fleet.py first")
+    lignes = db.equipment.distinct("ligne") or ["ligne1"]
+    usernames = [doc["username"] for doc in db.users.find({}, {"username": 1}).limit(samples)]
+    created_user = None
+    if not usernames:
+        created_user = User(name="Bench User", username=f"{BENCH_PREFIX}user", role="viewer")
+        created_user.save()
+        usernames = [created_user.username]
+    return {"equipment_ids": equipment_ids, "lignes": lignes, "usernames": usernames, "created_user": created_user}
+
+def make_cases(fixtures: Dict[str, Any]) -> List[Case]:
+    equipment_ids = fixtures["equipment_ids"]
+    lignes = fixtures["lignes"]
+    usernames = fixtures["usernames"]
+    pick = lambda values, i: values[i % len(values)]
+
+    def equipment_save(i: int):
+        Equipment(
+            name=f"{BENCH_PREFIX}{ObjectId()}",
+            ip_address=f"{BENCH_PREFIX}{ObjectId()}",
+            ligne=pick(lignes, i),
+            atelier="atelier_bench",
+            equipment_type="switch"
+        ).save()
+
+    def history_save(i: int):
+        EquipmentHistory(
+            equipment_id=str(pick(equipment_ids, i)),
+            timestamp=datetime.utcnow(),
+            status="online",
+            data_rate=random.uniform(0, 100),
+            response_time=random.uniform(1, 20),
+            packet_loss=0.0,
+            snmp_data={"bench": True}
+        ).save()
+
+    return [
+        Case("Equipment.save", equipment_save),
+        Case("Equipment.get_all", lambda i: Equipment.get_all(), explain=True),
+        Case("Equipment.get_by_ligne", lambda i: Equipment.get_by_ligne(pick(lignes, i)), explain=True),
+        Case("EquipmentHistory.save", history_save),
+        Case("EquipmentHistory.get_by_equipment", lambda i: EquipmentHistory.get_by_equipment(str(pick(equipment_ids, i))),
+             explain=True),
+        Case("Alert.get_active_alerts", lambda i: Alert.get_active_alerts(), explain=True),
+        Case("User.get_by_username", lambda i: User.get_by_username(pick(usernames, i).upper()), explain=True),
+    ]
+
+def cleanup(fixtures: Dict[str, Any]):
+    """Remove what the write cases inserted."""
+    db = db_client.db
+    removed = db.equipment.delete_many({"name": {"$regex": f"^{BENCH_PREFIX}"}}).deleted_count
+    removed += db.equipment_history.delete_many({"snmp_data.bench": True}).deleted_count
+    if fixtures["created_user"] is not None:
+        User.delete(fixtures["created_user"].id)
+    print(f"Removed {removed} benchmark documents")
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Regressions of ``results`` against ``baseline``."""
+    failures = []
+    for name, base in baseline.items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if current["ops_per_sec"] < base["ops_per_sec"] * (1 - tolerance):
+            failures.append(f"{name}: {current['ops_per_sec']:.0f} ops/s, baseline {base['ops_per_sec']:.0f}")
+        if current["p99_ms"] > base["p99_ms"] * (1 + tolerance) and current["p99_ms"] - base["p99_ms"] > 1:
+            failures.append(f"{name}: p99 {current['p99_ms']:.2f} ms, baseline {base['p99_ms']:.2f} ms")
+        plan, base_plan = current.get("plan"), base.get("plan")
+        if plan and base_plan:
+            if plan["collscan"] and not base_plan["collscan"]:
+                failures.append(f"{name}: now a collection scan (baseline used {', '.join(base_plan['indexes'])})")
+            elif base_plan["indexes"] and not set(base_plan["indexes"]) & set(plan["indexes"]):
+                failures.append(f"{name}: uses {plan['indexes'] or 'no index'} instead of {base_plan['indexes']}")
+            if plan["in_memory_sort"] and not base_plan["in_memory_sort"]:
+                failures.append(f"{name}: now sorts in memory")
+            if plan["examined_ratio"] > max(2 * base_plan["examined_ratio"], base_plan["examined_ratio"] + 10):
+                failures.append(f"{name}: examines {plan['examined_ratio']:.0f} docs per result, "
+                                f"baseline {base_plan['examined_ratio']:.0f}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Mongo model methods")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Timed duration per case")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed calls per case")
+    parser.add_argument("--samples", type=int, default=200, help="Random equipment/users queried in turn")
+    parser.add_argument("--cases", help="Comma-separated case names to run (default: all)")
+    parser.add_argument("--save-baseline", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slow-down (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    # Listeners only apply to clients created after they are registered
+    monitoring.register(capture)
+    db_client.connect()
+    random.seed(42)
+    fixtures = sample_fixtures(args.samples)
+    cases = make_cases(fixtures)
+    if args.cases:
+        wanted = set(args.cases.split(","))
+        cases = [case for case in cases if case.name in wanted]
+
+    print(f"Benchmarking {len(cases)} model methods on {db_client.db_name} ({args.seconds:.0f}s each)")
+    print("-" * 100)
+    print(f"{'case':<36} {'ops/s':>9} {'p50 ms':>8} {'p99 ms':>8}  plan")
+    results: Dict[str, Dict] = {}
+    try:
+        for case in cases:
+            result = results[case.name] = bench(case, args.seconds, args.warmup)
+            plan = result.get("plan")
+            plan_text = ""
+            if plan:
+                plan_text = (f"{'COLLSCAN' if plan['collscan'] else ','.join(plan['indexes']) or '-'}"
+                             f"{' +SORT' if plan['in_memory_sort'] else ''}"
+                             f"  docs {plan['docs_examined']}/{plan['n_returned']}")
+            print(f"{case.name:<36} {result['ops_per_sec']:9.0f} {result['p50_ms']:8.2f} {result['p99_ms']:8.2f}  {plan_text}")
+    finally:
+        cleanup(fixtures)
+    print("-" * 100)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline, args.tolerance)
+        for failure in failures:
+            print(f"✗ {failure}")
+        if failures:
+            sys.exit(1)
+        print(f"✓ No regression against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Serialization micro-benchmark
+Compares FastAPI's default JSON encoding with app.serialization (orjson +
+precompiled pydantic-core serializers) on equipment payloads.
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from app.serialization import dumps, dump_models
+
+class EquipmentRow(BaseModel):
+    id: str
+    name: str
+    ip_address: str
+    ligne: str
+    atelier: str
+    equipment_type: str
+    status: str
+    data_rate: float
+    response_time: Optional[float] = None
+    packet_loss: Optional[float] = None
+    last_checked: datetime
+    is_active: bool = True
+
+def make_rows(count: int):
+    """Build equipment documents shaped like the Mongo `equipment` collection."""
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        rows.append({
+            "_id": ObjectId(),
+            "name": f"Device-{i:05d}",
+            "ip_address": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+            "ligne": random.choice(["AVS", "BBS"]),
+            "atelier": random.choice(["CMS1", "CMS2", "intégration"]),
+            "equipment_type": random.choice(["router", "switch", "server"]),
+            "status": random.choice(["online", "online", "online", "offline", "issue"]),
+            "data_rate": round(random.uniform(0, 100), 2),
+            "response_time": round(random.uniform(0.5, 50), 2),
+            "packet_loss": 0.0,
+            "last_checked": now - timedelta(seconds=random.randint(0, 300)),
+            "is_active": True
+        })
+    return rows
+
+def bench(label: str, func, repeat: int) -> float:
+    """Run func `repeat` times and return the best time in ms."""
+    func()  # warm up
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(func())
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<45} {best * 1000:9.2f} ms  ({size / 1024:.0f} KiB)")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API serialization")
+    parser.add_argument("--rows", type=int, default=10_000, help="Number of equipment rows")
+    parser.add_argument("--repeat", type=int, default=10, help="Repetitions per case (best is kept)")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    models = [EquipmentRow(id=str(r["_id"]), **{k: v for k, v in r.items() if k != "_id"}) for r in rows]
+
+    print(f"Serializing {args.rows} equipment rows (best of {args.repeat})")
+    print("-" * 70)
+
+    # What FastAPI does for a returned list of dicts / models
+    baseline_dicts = bench(
+        "dicts:  jsonable_encoder + json.dumps",
+        lambda: json.dumps(jsonable_encoder(rows, custom_encoder={ObjectId: str})).encode("utf-8"),
+        args.repeat
+    )
+    fast_dicts = bench("dicts:  orjson (app.serialization.dumps)", lambda: dumps(rows), args.repeat)
+
+    baseline_models = bench(
+        "models: jsonable_encoder + json.dumps",
+        lambda: json.dumps(jsonable_encoder(models)).encode("utf-8"),
+        args.repeat
+    )
+    fast_models = bench("models: TypeAdapter.dump_json (dump_models)", lambda: dump_models(models), args.repeat)
+
+    print("-" * 70)
+    print(f"Speed-up on dicts:  {baseline_dicts / fast_dicts:.1f}x")
+    print(f"Speed-up on models: {baseline_models / fast_models:.1f}x")
+
+if __name__ == "__main__":
+    main()
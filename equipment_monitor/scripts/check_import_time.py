@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Import-time check
+Imports the web app in fresh interpreters and fails (exit code 1) when the
+cold import takes longer than the budget, when pysnmp gets imported, or when
+a MongoDB connection is opened at import time. Prints the slowest modules
+from ``python -X importtime`` to show where the time goes.
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Run in the child interpreter: import the app and report what it did
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+from app.database import db_client
+print(json.dumps({{
+    "seconds": elapsed,
+    "pysnmp": any(name == "pysnmp" or name.startswith("pysnmp.") for name in sys.modules),
+    "mongo_client": db_client._client is not None
+}}))
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def probe(module: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        raise SystemExit(f"Importing {module} failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def slowest_imports(module: str, top: int):
+    """(self us, cumulative us, module) of the slowest modules by self time."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            rows.append((int(match.group(1)), int(match.group(2)), match.group(4)))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the web app")
+    parser.add_argument("--module", default="app.main", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1500")),
+                        help="Maximum median import time, in ms")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time (median is kept)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    args = parser.parse_args()
+
+    # The first run warms the bytecode cache, like any deployment after the first start
+    probe(args.module)
+    runs = [probe(args.module) for _ in range(args.runs)]
+    median_ms = statistics.median(run["seconds"] for run in runs) * 1000
+
+    print(f"Import of {args.module}: {median_ms:.0f} ms (median of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    print("-" * 70)
+    print(f"{'self ms':>9} {'cumul. ms':>10}  module")
+    for self_us, cumulative_us, name in slowest_imports(args.module, args.top):
+        print(f"{self_us / 1000:9.1f} {cumulative_us / 1000:10.1f}  {name}")
+    print("-" * 70)
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"import takes {median_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    if any(run["pysnmp"] for run in runs):
+        failures.append("pysnmp is imported at import time")
+    if any(run["mongo_client"] for run in runs):
+        failures.append("a MongoDB client is created at import time")
+    for failure in failures:
+        print(f"✗ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✓ Import time within budget")
+
+if __name__ == "__main__":
+    main()
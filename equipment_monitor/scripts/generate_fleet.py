@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Synthetic fleet generator
+Bulk-loads N equipment spread over lignes/ateliers, with months of history
+samples and the alerts they raise, to benchmark queries and dashboards on a
+production-sized database. History is generated with NumPy and written with
+unordered bulk inserts by several processes.
+
+Point DB_NAME at a scratch database: with --drop the equipment,
+equipment_history and alerts collections are dropped first.
+
+    DB_NAME=equipment_bench python scripts/generate_fleet.py --devices 50000 --days 90 --drop
+"""
+
+import sys
+import time
+import argparse
+import multiprocessing
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+from bson import ObjectId
+from pymongo import UpdateOne
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database import db_client
+
+EQUIPMENT_TYPES = ("switch", "router", "plc", "hmi", "server", "workstation", "camera", "printer")
+# Share of each type in the fleet
+EQUIPMENT_WEIGHTS = (0.30, 0.05, 0.25, 0.12, 0.03, 0.15, 0.07, 0.03)
+
+def ip_address(index: int) -> str:
+    """Unique address in 10.0.0.0/8 for the index-th device."""
+    index += 1
+    return f"10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}"
+
+def make_equipment(args, rng: np.random.Generator) -> List[Dict]:
+    """Equipment documents with client-side _ids (workers need them before the insert returns)."""
+    now = datetime.utcnow()
+    types = rng.choice(len(EQUIPMENT_TYPES), size=args.devices, p=EQUIPMENT_WEIGHTS)
+    documents = []
+    for i in range(args.devices):
+        ligne = f"ligne{i % args.lignes + 1}"
+        atelier = f"atelier_{(i // args.lignes) % args.ateliers + 1}"
+        equipment_type = EQUIPMENT_TYPES[types[i]]
+        documents.append({
+            "_id": ObjectId(),
+            "name": f"{args.prefix}-{equipment_type.upper()}-{i:06d}",
+            "ip_address": ip_address(i),
+            "ligne": ligne,
+            "atelier": atelier,
+            "description": f"Synthetic {equipment_type} of {ligne}/{atelier}",
+            "location": f"{atelier} - Rack {i % 40 + 1}",
+            "equipment_type": equipment_type,
+            "status": "unknown",
+            "data_rate": 0.0,
+            "response_time": None,
+            "packet_loss": None,
+            "last_checked": now,
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now
+        })
+    return documents
+
+def simulate_device(rng: np.random.Generator, hours: np.ndarray, outage_rate: float) -> Dict[str, np.ndarray]:
+    """Metrics of one device over the sample times.
+
+    Traffic follows the day/night shift pattern around a per-device baseline,
+    latency rises with load, and rare outages (``outage_rate`` starts per
+    sample, a few samples long) take the device offline with full packet loss.
+    """
+    n = len(hours)
+    baseline = rng.lognormal(mean=3.3, sigma=0.5)         # ~27 Mbps median
+    daily = 1 + 0.5 * np.sin((hours - 8) / 24 * 2 * np.pi)  # busy during the day shifts
+    data_rate = np.clip(baseline * daily * rng.lognormal(0, 0.15, n), 0, 100)
+    response_time = rng.gamma(2.0, 1.0 + baseline / 40, n) * (1 + data_rate / 100)
+    packet_loss = np.where(rng.random(n) < 0.01, rng.uniform(1, 30, n), 0.0)
+
+    status = np.zeros(n, dtype=np.int8)  # 0 online, 1 timeout, 2 offline
+    # Outages: random starts, geometric lengths
+    outage_starts = np.flatnonzero(rng.random(n) < outage_rate)
+    for start in outage_starts:
+        length = rng.geometric(0.3)
+        status[start:start + length] = 2
+    status[(status == 0) & (packet_loss > 20)] = 1
+    offline = status == 2
+    data_rate[offline] = 0.0
+    response_time[offline] = np.nan
+    packet_loss[offline] = 100.0
+    return {"data_rate": data_rate, "response_time": response_time, "packet_loss": packet_loss, "status": status}
+
+STATUS_NAMES = ("online", "timeout", "offline")
+
+def alerts_for(equipment_id: ObjectId, name: str, timestamps: List[datetime],
+               metrics: Dict[str, np.ndarray]) -> List[Dict]:
+    """Connectivity alerts for each outage and threshold alerts when traffic stays over 90 Mbps."""
+    alerts = []
+    status = metrics["status"]
+    offline = status == 2
+    changes = np.flatnonzero(np.diff(np.concatenate(([False], offline, [False])).astype(np.int8)))
+    for start, end in zip(changes[::2], changes[1::2]):
+        resolved = end < len(timestamps)
+        alerts.append({
+            "equipment_id": equipment_id,
+            "alert_type": "connectivity",
+            "severity": "critical" if end - start > 3 else "high",
+            "message": f"{name} is offline",
+            "timestamp": timestamps[start],
+            "acknowledged": resolved,
+            "acknowledged_by": None,
+            "acknowledged_at": None,
+            "resolved": resolved,
+            "resolved_at": timestamps[end] if resolved else None
+        })
+    high = np.flatnonzero(metrics["data_rate"] > 90)
+    for i in high[:5]:
+        alerts.append({
+            "equipment_id": equipment_id,
+            "alert_type": "threshold",
+            "severity": "medium",
+            "message": f"{name} data rate {metrics['data_rate'][i]:.1f} Mbps over 90 Mbps",
+            "timestamp": timestamps[i],
+            "acknowledged": True,
+            "acknowledged_by": None,
+            "acknowledged_at": None,
+            "resolved": True,
+            "resolved_at": timestamps[i] + timedelta(minutes=5)
+        })
+    return alerts
+
+def generate_chunk(task: Tuple) -> Tuple[int, int, List[Tuple[ObjectId, Dict]]]:
+    """Generate and insert the history and alerts of a chunk of devices (runs in a worker process).
+
+    Returns (history samples, alerts, (equipment _id, last status) of each device).
+    """
+    devices, seed, start, days, interval_minutes, batch_size = task
+    rng = np.random.default_rng(seed)
+    step = timedelta(minutes=interval_minutes)
+    n = int(days * 24 * 60 // interval_minutes)
+    timestamps = [start + i * step for i in range(n)]
+    hours = np.array([(t.hour + t.minute / 60) for t in timestamps])
+    outage_rate = days / 30 / max(n, 1)  # about one outage a month
+
+    history = db_client.db.equipment_history
+    alerts_collection = db_client.db.alerts
+    batch: List[Dict] = []
+    alerts: List[Dict] = []
+    samples = 0
+    last_status = []
+    for equipment_id, name in devices:
+        metrics = simulate_device(rng, hours, outage_rate)
+        data_rate = np.round(metrics["data_rate"], 2).tolist()
+        response_time = np.round(metrics["response_time"], 2).tolist()
+        packet_loss = np.round(metrics["packet_loss"], 1).tolist()
+        status = metrics["status"].tolist()
+        for i in range(n):
+            batch.append({
+                "equipment_id": equipment_id,
+                "timestamp": timestamps[i],
+                "status": STATUS_NAMES[status[i]],
+                "data_rate": data_rate[i],
+                "response_time": None if response_time[i] != response_time[i] else response_time[i],  # NaN
+                "packet_loss": packet_loss[i],
+                "snmp_data": {}
+            })
+            if len(batch) >= batch_size:
+                history.insert_many(batch, ordered=False)
+                samples += len(batch)
+                batch = []
+        alerts.extend(alerts_for(equipment_id, name, timestamps, metrics))
+        last_status.append((equipment_id, {
+            "status": STATUS_NAMES[status[-1]],
+            "data_rate": data_rate[-1],
+            "response_time": None if response_time[-1] != response_time[-1] else response_time[-1],
+            "packet_loss": packet_loss[-1],
+            "last_checked": timestamps[-1]
+        }))
+    if batch:
+        history.insert_many(batch, ordered=False)
+        samples += len(batch)
+    if alerts:
+        alerts_collection.insert_many(alerts, ordered=False)
+    return samples, len(alerts), last_status
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic fleet with history and alerts")
+    parser.add_argument("--devices", type=int, default=50_000, help="Number of equipment")
+    parser.add_argument("--lignes", type=int, default=20, help="Number of lignes")
+    parser.add_argument("--ateliers", type=int, default=10, help="Ateliers per ligne")
+    parser.add_argument("--days", type=float, default=90, help="Days of history")
+    parser.add_argument("--interval-minutes", type=float, default=240, help="Minutes between history samples")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="Worker processes")
+    parser.add_argument("--chunk", type=int, default=200, help="Devices per worker task")
+    parser.add_argument("--batch", type=int, default=10_000, help="Documents per insert_many")
+    parser.add_argument("--prefix", default="SIM", help="Prefix of the equipment names")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--drop", action="store_true", help="Drop equipment, history and alerts first")
+    parser.add_argument("--no-indexes", action="store_true", help="Don't create the indexes after loading")
+    args = parser.parse_args()
+
+    db_client.connect()
+    db = db_client.db
+    samples_per_device = int(args.days * 24 * 60 // args.interval_minutes)
+    print(f"Generating {args.devices} equipment x {samples_per_device} samples "
+          f"= {args.devices * samples_per_device:,} history documents in {db_client.db_name}")
+    print("-" * 70)
+
+    if args.drop:
+        for name in ("equipment", "equipment_history", "alerts"):
+            db.drop_collection(name)
+        print("✓ Dropped equipment, equipment_history and alerts")
+
+    started = time.perf_counter()
+    rng = np.random.default_rng(args.seed)
+    equipment = make_equipment(args, rng)
+    for i in range(0, len(equipment), args.batch):
+        db.equipment.insert_many(equipment[i:i + args.batch], ordered=False)
+    print(f"✓ Inserted {len(equipment)} equipment in {time.perf_counter() - started:.1f}s")
+
+    start = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(days=args.days)
+    devices = [(doc["_id"], doc["name"]) for doc in equipment]
+    tasks = [
+        (devices[i:i + args.chunk], args.seed + 1 + i, start, args.days, args.interval_minutes, args.batch)
+        for i in range(0, len(devices), args.chunk)
+    ]
+
+    samples = alerts = done = 0
+    statuses = []
+    history_started = time.perf_counter()
+    # spawn: each worker opens its own MongoDB client instead of inheriting the parent's
+    with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+        for chunk_samples, chunk_alerts, chunk_statuses in pool.imap_unordered(generate_chunk, tasks):
+            samples += chunk_samples
+            alerts += chunk_alerts
+            statuses.extend(chunk_statuses)
+            done += 1
+            elapsed = time.perf_counter() - history_started
+            print(f"\r  {done}/{len(tasks)} chunks, {samples:,} samples ({samples / elapsed:,.0f}/s)", end="", flush=True)
+    print()
+    print(f"✓ Inserted {samples:,} history samples and {alerts:,} alerts "
+          f"in {time.perf_counter() - history_started:.1f}s")
+
+    # Current status of each equipment = its last sample
+    updates = [UpdateOne({"_id": equipment_id}, {"$set": fields}) for equipment_id, fields in statuses]
+    for i in range(0, len(updates), args.batch):
+        db.equipment.bulk_write(updates[i:i + args.batch], ordered=False)
+    print(f"✓ Updated the status of {len(updates)} equipment")
+
+    if not args.no_indexes:
+        # Built once at the end: much faster than maintaining them during the load
+        from init_database import create_indexes
+        index_started = time.perf_counter()
+        create_indexes()
+        print(f"✓ Created indexes in {time.perf_counter() - index_started:.1f}s")
+
+    print("-" * 70)
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
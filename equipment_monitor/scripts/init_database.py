@@ -8,37 +8,61 @@ from datetime import datetime
 sys.path.append(str(Path(__file__).parent.parent))
 
 from app.database import db_client
-from app.models.database_models import User, Equipment, SystemConfig, Alert, EquipmentHistory
+from app.models.database_models import User, Equipment, SystemConfig, Alert, EquipmentHistory, USERNAME_COLLATION
 
 def create_indexes():
     """Create database indexes for better performance."""
     print("Creating database indexes...")
     
     # Users collection indexes
-    db_client.db.users.create_index("username", unique=True)
+    # Usernames are unique and looked up case-insensitively
+    if "username_1" in db_client.db.users.index_information():
+        db_client.db.users.drop_index("username_1")
+    db_client.db.users.create_index("username", unique=True, collation=USERNAME_COLLATION, name="username_ci")
     db_client.db.users.create_index("email", unique=True, sparse=True)
     db_client.db.users.create_index([("username", 1), ("domain", 1)])
     
     # Equipment collection indexes
+    # (ligne, atelier) and status alone are prefixes of the pagination indexes below
+    for name in ("ligne_1_atelier_1", "status_1"):
+        if name in db_client.db.equipment.index_information():
+            db_client.db.equipment.drop_index(name)
     db_client.db.equipment.create_index("name", unique=True)
     db_client.db.equipment.create_index("ip_address", unique=True)
-    db_client.db.equipment.create_index([("ligne", 1), ("atelier", 1)])
-    db_client.db.equipment.create_index("status")
+    # Keyset pagination of the filtered equipment list (sorted by name)
+    db_client.db.equipment.create_index([("ligne", 1), ("atelier", 1), ("name", 1)])
+    db_client.db.equipment.create_index([("status", 1), ("name", 1)])
+    # Keyset pagination sorted by status (sort key then _id)
+    db_client.db.equipment.create_index([("status", 1), ("_id", 1)])
     db_client.db.equipment.create_index("is_active")
     
     # Equipment history indexes
-    db_client.db.equipment_history.create_index([("equipment_id", 1), ("timestamp", -1)])
+    # _id breaks timestamp ties for keyset pagination of the history export;
+    # the former (equipment_id, timestamp) index is a prefix of it
+    if "equipment_id_1_timestamp_-1" in db_client.db.equipment_history.index_information():
+        db_client.db.equipment_history.drop_index("equipment_id_1_timestamp_-1")
+    db_client.db.equipment_history.create_index([("equipment_id", 1), ("timestamp", -1), ("_id", -1)])
     db_client.db.equipment_history.create_index("timestamp")
     
     # Alerts indexes
+    # Replaced by the partial active_timestamp index
+    if "resolved_1" in db_client.db.alerts.index_information():
+        db_client.db.alerts.drop_index("resolved_1")
     db_client.db.alerts.create_index([("equipment_id", 1), ("timestamp", -1)])
-    db_client.db.alerts.create_index("resolved")
+    # Active alerts, newest first: only the unresolved alerts are indexed
+    db_client.db.alerts.create_index(
+        [("timestamp", -1)], partialFilterExpression={"resolved": False}, name="active_timestamp"
+    )
     db_client.db.alerts.create_index("severity")
     db_client.db.alerts.create_index("timestamp")
     
     # System config indexes
     db_client.db.system_config.create_index("key", unique=True)
     
+    # Shared sessions (SESSION_BACKEND=mongo): expired sessions are deleted by the server
+    db_client.db.sessions.create_index("expires_at", expireAfterSeconds=0)
+    db_client.db.sessions.create_index("data.email", sparse=True)
+    
     print("✓ Database indexes created successfully")
 
 def create_default_users():
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Dashboard load test
+Simulates N operators with the dashboard open against a running app: each
+virtual user logs in through /login (keeping its session cookie), loads the
+dashboard like the browser does (page, /api/filters, device status and the
+first equipment page, summary, chart), then polls every --interval seconds
+like dashboard.html (status with its ETag, equipment page, summary) and
+reloads the page every --reload-minutes. Reports throughput, latency
+percentiles and errors per endpoint; fails (exit code 1) above
+--max-error-rate.
+
+The users share one account of the app's user directory (--username, the
+johndoe demo admin by default). Login is throttled per client IP and per
+username: raise LOGIN_IP_BURST and LOGIN_USER_BURST on the app for the test.
+The run stops at once if the first login fails.
+
+    python scripts/load_test.py --users 200 --duration 120
+"""
+
+import sys
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+DASHBOARD_INTERVAL = 5.0  # auto-refresh period of dashboard.html
+EQUIPMENT_PAGE_SIZE = 100
+CHART_HOURS = 24
+CHART_POINTS = 300
+
+class LoginFailed(Exception):
+    """The first virtual user could not log in: nothing would be measured."""
+
+class Stats:
+    """Latencies and outcomes per endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.recording = True
+
+    def record(self, endpoint: str, seconds: float, status: Optional[int]):
+        if not self.recording:
+            return
+        self.latencies[endpoint].append(seconds)
+        if status is None or status >= 400:
+            self.errors[endpoint] += 1
+        if status is not None:
+            self.statuses[endpoint][status] += 1
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
+
+class VirtualUser:
+    """One operator with the dashboard open."""
+
+    def __init__(self, client: httpx.AsyncClient, stats: Stats, username: str, password: str, args):
+        self.client = client
+        self.stats = stats
+        self.username = username
+        self.password = password
+        self.args = args
+        self.filters: Dict[str, str] = {}
+        self.status_etag: Optional[str] = None
+        self.equipment_ids: List[str] = []
+        self.login_error: Optional[str] = None
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        """Send a request, recording it under ``endpoint``; None on transport errors."""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.stats.record(endpoint, time.perf_counter() - start, None)
+            return None
+        self.stats.record(endpoint, time.perf_counter() - start, response.status_code)
+        return response
+
+    async def login(self) -> bool:
+        response = await self.request("POST /login", "POST", "/login",
+                                      data={"username": self.username, "password": self.password})
+        if response is None:
+            self.login_error = "no response"
+            return False
+        location = response.headers.get("location", "")
+        if response.status_code != 303 or not location.endswith("/dashboard"):
+            # Failed logins redirect back to /login?error=...
+            if self.stats.recording:
+                self.stats.errors["POST /login"] += 1
+            self.login_error = f"{response.status_code} {location}"
+            if self.args.verbose:
+                print(f"✗ Login of {self.username} failed: {self.login_error}")
+            return False
+        if "session_id" not in self.client.cookies:
+            self.login_error = "no session cookie"
+            return False
+        return True
+
+    def equipment_params(self) -> Dict[str, str]:
+        return {"limit": str(EQUIPMENT_PAGE_SIZE), **self.filters}
+
+    async def fetch_status(self):
+        headers = {"If-None-Match": self.status_etag} if self.status_etag else {}
+        response = await self.request("GET /api/devices/status", "GET", "/api/devices/status", headers=headers)
+        if response is not None and response.status_code in (200, 304):
+            self.status_etag = response.headers.get("etag", self.status_etag)
+
+    async def fetch_equipment(self):
+        response = await self.request("GET /api/equipment", "GET", "/api/equipment", params=self.equipment_params())
+        if response is not None and response.status_code == 200:
+            self.equipment_ids = [item["id"] for item in response.json().get("items", []) if "id" in item]
+
+    async def fetch_summary(self):
+        await self.request("GET /api/devices/summary", "GET", "/api/devices/summary", params=self.filters)
+
+    async def load_dashboard(self):
+        """The requests of a dashboard page load, in the order the page sends them."""
+        await self.request("GET /dashboard", "GET", "/dashboard")
+        response = await self.request("GET /api/filters", "GET", "/api/filters")
+        self.filters = {}
+        if response is not None and response.status_code == 200 and random.random() < self.args.filtered:
+            lignes = response.json().get("lignes") or []
+            if lignes:
+                ligne = random.choice(lignes)
+                self.filters["ligne"] = ligne["value"]
+        self.status_etag = None
+        await asyncio.gather(self.fetch_status(), self.fetch_equipment())
+        await self.fetch_summary()
+        if self.equipment_ids:
+            start = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(time.time() - CHART_HOURS * 3600))
+            await self.request("GET /api/equipment/{id}/chart", "GET", f"/api/equipment/{self.equipment_ids[0]}/chart",
+                               params={"points": CHART_POINTS, "start": start})
+
+    async def run(self, deadline: float):
+        if "session_id" not in self.client.cookies and not await self.login():
+            return
+        reload_every = self.args.reload_minutes * 60
+        while time.perf_counter() < deadline:
+            await self.load_dashboard()
+            reload_at = time.perf_counter() + (reload_every if reload_every > 0 else float("inf"))
+            # setInterval: the next refresh is due one interval after the previous one started
+            next_poll = time.perf_counter() + self.args.interval
+            while True:
+                now = time.perf_counter()
+                if next_poll >= deadline:
+                    await asyncio.sleep(max(0.0, deadline - now))
+                    return
+                await asyncio.sleep(max(0.0, next_poll - now))
+                next_poll += self.args.interval
+                if time.perf_counter() >= reload_at:
+                    break
+                await self.fetch_status()
+                await self.fetch_equipment()
+                await self.fetch_summary()
+
+def report(stats: Stats, elapsed: float, users: int, logged_in: int) -> float:
+    """Print the results per endpoint and return the overall error rate."""
+    print("-" * 100)
+    print(f"{users} users ({logged_in} logged in), {elapsed:.0f}s measured")
+    print(f"{'endpoint':<32} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'errors':>7}  statuses")
+    total = errors = 0
+    all_latencies: List[float] = []
+    for endpoint in sorted(stats.latencies):
+        latencies = sorted(stats.latencies[endpoint])
+        total += len(latencies)
+        errors += stats.errors[endpoint]
+        all_latencies.extend(latencies)
+        statuses = " ".join(f"{code}:{count}" for code, count in sorted(stats.statuses[endpoint].items()))
+        print(f"{endpoint:<32} {len(latencies):9d} {len(latencies) / elapsed:8.1f} "
+              f"{percentile(latencies, 0.50) * 1000:8.1f} {percentile(latencies, 0.95) * 1000:8.1f} "
+              f"{percentile(latencies, 0.99) * 1000:8.1f} {latencies[-1] * 1000:8.1f} "
+              f"{stats.errors[endpoint] / len(latencies):7.1%}  {statuses}")
+    all_latencies.sort()
+    print("-" * 100)
+    error_rate = errors / max(total, 1)
+    print(f"{'total':<32} {total:9d} {total / elapsed:8.1f} {percentile(all_latencies, 0.50) * 1000:8.1f} "
+          f"{percentile(all_latencies, 0.95) * 1000:8.1f} {percentile(all_latencies, 0.99) * 1000:8.1f} "
+          f"{(all_latencies[-1] if all_latencies else 0) * 1000:8.1f} {error_rate:7.1%}")
+    return error_rate
+
+async def run(args) -> Tuple[Stats, float, int]:
+    stats = Stats()
+    stats.recording = args.warmup <= 0
+    limits = httpx.Limits(max_connections=args.connections_per_user, max_keepalive_connections=args.connections_per_user)
+    headers = {"Accept-Encoding": "gzip" if args.gzip else "identity"}
+    clients = [
+        httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits, headers=headers)
+        for _ in range(args.users)
+    ]
+    users = [VirtualUser(client, stats, args.username, args.password, args) for client in clients]
+
+    started = time.perf_counter()
+    deadline = started + args.warmup + args.duration
+    tasks = []
+    try:
+        # Check the credentials once before the ramp-up
+        if users and not await users[0].login():
+            raise LoginFailed(f"Login of {args.username} failed ({users[0].login_error})")
+        for i, user in enumerate(users):
+            # Users arrive evenly over the ramp-up, not all at once
+            delay = args.ramp_up * i / max(len(users), 1)
+            tasks.append(asyncio.create_task(_delayed(user.run(deadline), delay)))
+        if args.warmup > 0:
+            await asyncio.sleep(args.warmup)
+            stats.recording = True
+        measured_from = started + max(args.warmup, 0)
+        await asyncio.gather(*tasks)
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients))
+    logged_in = sum(1 for client in clients if "session_id" in client.cookies)
+    return stats, max(time.perf_counter() - measured_from, 0.001), logged_in
+
+async def _delayed(coroutine, delay: float):
+    await asyncio.sleep(delay)
+    await coroutine
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the dashboard with concurrent operators")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the app")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=10, help="Seconds before measuring")
+    parser.add_argument("--ramp-up", type=float, default=10, help="Seconds over which users log in")
+    parser.add_argument("--interval", type=float, default=DASHBOARD_INTERVAL, help="Seconds between refreshes")
+    parser.add_argument("--reload-minutes", type=float, default=10, help="Minutes between page reloads (0: never)")
+    parser.add_argument("--filtered", type=float, default=0.5, help="Share of users filtering on a ligne")
+    parser.add_argument("--username", default="johndoe", help="Account shared by the users")
+    parser.add_argument("--password", default="admin123", help="Password of the account")
+    parser.add_argument("--no-gzip", dest="gzip", action="store_false", help="Don't accept gzip responses")
+    parser.add_argument("--connections-per-user", type=int, default=2, help="Connections of each browser")
+    parser.add_argument("--timeout", type=float, default=30, help="Request timeout, in seconds")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Fail above this error rate")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--verbose", action="store_true", help="Print failed logins")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    print(f"Load testing {args.url} with {args.users} users, refresh every {args.interval:g}s, "
+          f"{args.warmup:g}s warm-up + {args.duration:g}s measured")
+    try:
+        stats, elapsed, logged_in = asyncio.run(run(args))
+    except LoginFailed as e:
+        print(f"✗ {e}: check --username/--password, and LOGIN_IP_BURST/LOGIN_USER_BURST on the app")
+        sys.exit(1)
+    error_rate = report(stats, elapsed, args.users, logged_in)
+
+    if logged_in < args.users:
+        print(f"✗ {args.users - logged_in} users could not log in (login throttling? raise LOGIN_IP_BURST and LOGIN_USER_BURST)")
+    if error_rate > args.max_error_rate:
+        print(f"✗ Error rate {error_rate:.1%} over {args.max_error_rate:.1%}")
+        sys.exit(1)
+    print(f"✓ Error rate {error_rate:.1%}")
+
+if __name__ == "__main__":
+    main()
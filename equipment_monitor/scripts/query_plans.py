@@ -0,0 +1,119 @@
+# scripts/query_plans.py
+"""Helpers to explain find queries and summarize their plans (used by the benchmark and audit scripts)."""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pymongo import monitoring
+
+# Commands whose plan explain() can show
+QUERY_COMMANDS = ("find", "aggregate", "count", "distinct")
+# Fields the driver adds to the commands it sends; explain() refuses some of them
+DRIVER_FIELDS = ("lsid", "txnNumber", "apiVersion", "apiStrict", "apiDeprecationErrors")
+
+class CommandCapture(monitoring.CommandListener):
+    """Records the query commands the driver sends inside ``capture()``.
+
+    Register it (``pymongo.monitoring.register``) before the client is
+    created, then explain the captured commands: the plan is the one of the
+    query the code actually sends, not of a copy of it.
+    """
+
+    def __init__(self):
+        self.commands: Optional[List[Tuple[str, Dict]]] = None
+
+    @contextmanager
+    def capture(self) -> Iterator[List[Tuple[str, Dict]]]:
+        """Collect the (database name, command) of the queries sent in the block."""
+        self.commands = commands = []
+        try:
+            yield commands
+        finally:
+            self.commands = None
+
+    def started(self, event):
+        if self.commands is not None and event.command_name in QUERY_COMMANDS:
+            command = {
+                key: value for key, value in event.command.items()
+                if not key.startswith("$") and key not in DRIVER_FIELDS
+            }
+            self.commands.append((event.database_name, command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+def explain_command(database, command: Dict) -> Dict[str, Any]:
+    """explain("executionStats") of a captured find/aggregate command."""
+    return database.command("explain", command, verbosity="executionStats")
+
+def explain_find(collection, filter: Dict, projection: Dict = None, sort: List = None, limit: int = 0,
+                 collation: Dict = None) -> Dict[str, Any]:
+    """explain("executionStats") of a find, built like the models build it."""
+    command = {"find": collection.name, "filter": filter}
+    if projection:
+        command["projection"] = projection
+    if sort:
+        command["sort"] = dict(sort)
+    if limit:
+        command["limit"] = limit
+    if collation:
+        command["collation"] = collation
+    return collection.database.command("explain", command, verbosity="executionStats")
+
+def explain_aggregate(collection, pipeline: List[Dict]) -> Dict[str, Any]:
+    return collection.database.command(
+        "explain", {"aggregate": collection.name, "pipeline": pipeline, "cursor": {}}, verbosity="executionStats"
+    )
+
+def _stages(plan: Optional[Dict]) -> Iterator[Dict]:
+    """Every stage of a plan tree (classic and slot-based engine layouts)."""
+    if not plan:
+        return
+    if "queryPlan" in plan:
+        plan = plan["queryPlan"]
+    yield plan
+    for key in ("inputStage", "outerStage", "innerStage"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+def _winning_plan(explain: Dict) -> Optional[Dict]:
+    planner = explain.get("queryPlanner")
+    if planner is None:
+        # Aggregations: the query plan is in the $cursor stage, or in the first shard/stage
+        for stage in explain.get("stages", []):
+            if "$cursor" in stage:
+                planner = stage["$cursor"].get("queryPlanner")
+                break
+    return planner.get("winningPlan") if planner else None
+
+def _execution_stats(explain: Dict) -> Dict:
+    if "executionStats" in explain:
+        return explain["executionStats"]
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            return stage["$cursor"].get("executionStats", {})
+    return {}
+
+def summarize_plan(explain: Dict) -> Dict[str, Any]:
+    """Indexes used, stages, and documents/keys examined of an explain() result."""
+    stages = list(_stages(_winning_plan(explain)))
+    names = [stage.get("stage") for stage in stages]
+    stats = _execution_stats(explain)
+    indexes = sorted({stage["indexName"] for stage in stages if "indexName" in stage})
+    n_returned = stats.get("nReturned", 0)
+    docs_examined = stats.get("totalDocsExamined", 0)
+    return {
+        "stages": names,
+        "indexes": indexes,
+        "collscan": "COLLSCAN" in names,
+        "in_memory_sort": "SORT" in names,
+        "docs_examined": docs_examined,
+        "keys_examined": stats.get("totalKeysExamined", 0),
+        "n_returned": n_returned,
+        "examined_ratio": docs_examined / max(n_returned, 1),
+        "millis": stats.get("executionTimeMillis", 0)
+    }